@@ -0,0 +1,45 @@
+"""LLM response cache
+
+Revision ID: 0003_llm_cache
+Revises: 0002_git_like_fiction_schema
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003_llm_cache"
+down_revision = "0002_git_like_fiction_schema"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create llm_cache_entries table (persistent tier of the LLM response cache)
+    op.create_table(
+        "llm_cache_entries",
+        sa.Column("key", sa.String(length=64), primary_key=True),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("value", sa.Text(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column(
+            "last_accessed_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+        ),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_llm_cache_entries_expires_at", "llm_cache_entries", ["expires_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_llm_cache_entries_expires_at", table_name="llm_cache_entries")
+    op.drop_table("llm_cache_entries")
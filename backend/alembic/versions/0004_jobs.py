@@ -0,0 +1,54 @@
+"""Background job queue
+
+Revision ID: 0004_jobs
+Revises: 0003_llm_cache
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0004_jobs"
+down_revision = "0003_llm_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create jobs table (persistent queue for background LLM work)
+    op.create_table(
+        "jobs",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=True),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        sa.Column("kind", sa.String(length=50), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="5"),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("result", postgresql.JSONB()),
+        sa.Column(
+            "run_after", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column("locked_until", sa.TIMESTAMP(timezone=True)),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column(
+            "updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+    )
+    op.create_index("ix_jobs_status_run_after", "jobs", ["status", "run_after"])
+
+
+def downgrade():
+    op.drop_index("ix_jobs_status_run_after", table_name="jobs")
+    op.drop_table("jobs")
@@ -0,0 +1,44 @@
+"""Semantic diff cache
+
+Revision ID: 0005_semantic_diffs
+Revises: 0004_jobs
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0005_semantic_diffs"
+down_revision = "0004_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create semantic_diffs table (LLM summaries per version pair and model)
+    op.create_table(
+        "semantic_diffs",
+        sa.Column("left_version_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("right_version_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("semantic_summary", sa.Text(), nullable=False),
+        sa.Column("risks", postgresql.JSONB(), nullable=False),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.ForeignKeyConstraint(
+            ["left_version_id"], ["scene_versions.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["right_version_id"], ["scene_versions.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("left_version_id", "right_version_id", "model"),
+    )
+
+
+def downgrade():
+    op.drop_table("semantic_diffs")
@@ -0,0 +1,67 @@
+"""LLM usage ledger and budgets
+
+Revision ID: 0006_llm_usage
+Revises: 0005_semantic_diffs
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006_llm_usage"
+down_revision = "0005_semantic_diffs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create llm_usage table (one row per LLM API call)
+    op.create_table(
+        "llm_usage",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=True),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        sa.Column("repo_id", postgresql.UUID(as_uuid=True)),
+        sa.Column("endpoint", sa.String(length=100)),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "completion_tokens", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("latency_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+    )
+    op.create_index(
+        "ix_llm_usage_repo_id_created_at", "llm_usage", ["repo_id", "created_at"]
+    )
+
+    # Create llm_budgets table
+    op.create_table(
+        "llm_budgets",
+        sa.Column(
+            "repo_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("repositories.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("monthly_token_limit", sa.BigInteger(), nullable=False),
+        sa.Column("fallback_model", sa.String()),
+        sa.Column(
+            "updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+    )
+
+
+def downgrade():
+    op.drop_table("llm_budgets")
+    op.drop_index("ix_llm_usage_repo_id_created_at", table_name="llm_usage")
+    op.drop_table("llm_usage")
@@ -0,0 +1,44 @@
+"""Delta-compressed scene version content
+
+Revision ID: 0007_version_deltas
+Revises: 0006_llm_usage
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007_version_deltas"
+down_revision = "0006_llm_usage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # content_html now only holds keyframes; other versions store a delta
+    op.alter_column("scene_versions", "content_html", nullable=True)
+    op.add_column(
+        "scene_versions", sa.Column("content_delta", sa.LargeBinary(), nullable=True)
+    )
+    op.add_column(
+        "scene_versions",
+        sa.Column("delta_depth", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    # Deltas can't be expanded in SQL; refuse rather than lose content
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM scene_versions WHERE content_html IS NULL) THEN
+                RAISE EXCEPTION 'scene_versions has delta-encoded rows';
+            END IF;
+        END $$
+        """)
+    op.drop_column("scene_versions", "delta_depth")
+    op.drop_column("scene_versions", "content_delta")
+    op.alter_column("scene_versions", "content_html", nullable=False)
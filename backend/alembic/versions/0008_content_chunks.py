@@ -0,0 +1,49 @@
+"""Content-addressed paragraph chunks for scene version keyframes
+
+Revision ID: 0008_content_chunks
+Revises: 0007_version_deltas
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008_content_chunks"
+down_revision = "0007_version_deltas"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "content_chunks",
+        sa.Column("hash", sa.LargeBinary(), nullable=False),
+        sa.Column("repo_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["repo_id"], ["repositories.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("hash", "repo_id"),
+    )
+    op.add_column(
+        "scene_versions", sa.Column("chunk_hashes", sa.LargeBinary(), nullable=True)
+    )
+
+
+def downgrade():
+    # Chunked keyframes can't be joined in SQL; refuse rather than lose content
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM scene_versions
+                WHERE content_html IS NULL AND content_delta IS NULL
+            ) THEN
+                RAISE EXCEPTION 'scene_versions has chunk-stored rows';
+            END IF;
+        END $$
+        """)
+    op.drop_column("scene_versions", "chunk_hashes")
+    op.drop_table("content_chunks")
@@ -0,0 +1,53 @@
+"""Backfilled latest-version pointers per scene and branch
+
+Revision ID: 0009_scene_branch_latest
+Revises: 0008_content_chunks
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0009_scene_branch_latest"
+down_revision = "0008_content_chunks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table may already exist where it was created from the models
+    if not sa.inspect(op.get_bind()).has_table("scene_branch_latest"):
+        op.create_table(
+            "scene_branch_latest",
+            sa.Column("scene_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("branch_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("version_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.ForeignKeyConstraint(["scene_id"], ["scenes.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["branch_id"], ["branches.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(
+                ["version_id"], ["scene_versions.id"], ondelete="CASCADE"
+            ),
+            sa.PrimaryKeyConstraint("scene_id", "branch_id"),
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_scene_branch_latest_branch_id "
+        "ON scene_branch_latest (branch_id)"
+    )
+
+    op.execute("""
+        INSERT INTO scene_branch_latest (scene_id, branch_id, version_id)
+        SELECT DISTINCT ON (scene_id, branch_id) scene_id, branch_id, id
+        FROM scene_versions
+        ORDER BY scene_id, branch_id, created_at DESC
+        ON CONFLICT (scene_id, branch_id)
+        DO UPDATE SET version_id = EXCLUDED.version_id
+        """)
+
+
+def downgrade():
+    op.drop_index("ix_scene_branch_latest_branch_id", table_name="scene_branch_latest")
+    op.drop_table("scene_branch_latest")
@@ -0,0 +1,78 @@
+"""Generation and skip pointer on scene versions
+
+Revision ID: 0010_version_ancestry
+Revises: 0009_scene_branch_latest
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0010_version_ancestry"
+down_revision = "0009_scene_branch_latest"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "scene_versions",
+        sa.Column("generation", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "scene_versions",
+        sa.Column(
+            "jump_version_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("scene_versions.id"),
+            nullable=True,
+        ),
+    )
+
+    # Link existing versions parents first, as app.services.version_ancestry
+    # does on insert
+    bind = op.get_bind()
+    parents = dict(
+        bind.execute(sa.text("SELECT id, parent_version_id FROM scene_versions"))
+    )
+    children = {}
+    for version_id, parent_id in parents.items():
+        children.setdefault(parent_id if parent_id in parents else None, []).append(
+            version_id
+        )
+
+    generation, jump = {}, {}
+    stack = [(version_id, None) for version_id in children.get(None, [])]
+    while stack:
+        version_id, parent_id = stack.pop()
+        if parent_id is None:
+            generation[version_id], jump[version_id] = 0, version_id
+        else:
+            generation[version_id] = generation[parent_id] + 1
+            skip = jump[parent_id]
+            if (
+                generation[parent_id] - generation[skip]
+                == generation[skip] - generation[jump[skip]]
+            ):
+                jump[version_id] = jump[skip]
+            else:
+                jump[version_id] = parent_id
+        stack.extend((child, version_id) for child in children.get(version_id, []))
+
+    if jump:
+        bind.execute(
+            sa.text(
+                "UPDATE scene_versions SET generation = :generation,"
+                " jump_version_id = :jump WHERE id = :id"
+            ),
+            [{"id": i, "generation": generation[i], "jump": jump[i]} for i in jump],
+        )
+
+
+def downgrade():
+    op.drop_column("scene_versions", "jump_version_id")
+    op.drop_column("scene_versions", "generation")
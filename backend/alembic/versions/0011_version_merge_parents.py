@@ -0,0 +1,41 @@
+"""Merge parent on scene versions
+
+Revision ID: 0011_version_merge_parents
+Revises: 0010_version_ancestry
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0011_version_merge_parents"
+down_revision = "0010_version_ancestry"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "scene_versions",
+        sa.Column(
+            "merge_parent_version_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("scene_versions.id"),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_scene_versions_merges",
+        "scene_versions",
+        ["scene_id"],
+        postgresql_where=sa.text("merge_parent_version_id IS NOT NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_scene_versions_merges", table_name="scene_versions")
+    op.drop_column("scene_versions", "merge_parent_version_id")
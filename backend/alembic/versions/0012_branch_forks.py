@@ -0,0 +1,34 @@
+"""Record the branch a branch was forked from
+
+Revision ID: 0012_branch_forks
+Revises: 0011_version_merge_parents
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0012_branch_forks"
+down_revision = "0011_version_merge_parents"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "branches",
+        sa.Column(
+            "forked_from_branch_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("branches.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("branches", "forked_from_branch_id")
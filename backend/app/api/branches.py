@@ -1,11 +1,21 @@
+import json
+import uuid
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.core.db import get_db
+from app.core.db import SessionLocal, get_db
 from app.core.security import verify_api_key
-from app.models.repository import Branch, Repository
+from app.models.repository import Branch, Commit, Repository
+from app.models.story import StoryNode
 from app.schemas.repository import Branch as BranchSchema
 from app.schemas.repository import BranchCreate
+from app.schemas.story import StoryNode as StoryNodeSchema
+from app.services.branch_checkout import iter_checkout
+from app.services.branch_heads import fork_branch_heads
 
 router = APIRouter()
 
@@ -32,10 +42,35 @@ def create_branch(
     if existing_branch:
         raise HTTPException(status_code=400, detail="Branch name already exists")
 
+    # Resolve the branch to fork from, by id or by name within the repository
+    source_branch = None
+    if branch_data.from_branch:
+        try:
+            source_filter = Branch.id == uuid.UUID(branch_data.from_branch)
+        except ValueError:
+            source_filter = Branch.name == branch_data.from_branch
+        source_branch = (
+            db.query(Branch)
+            .filter(Branch.repo_id == branch_data.repo_id, source_filter)
+            .first()
+        )
+        if not source_branch:
+            raise HTTPException(status_code=404, detail="Source branch not found")
+
     # Create new branch
-    new_branch = Branch(repo_id=branch_data.repo_id, name=branch_data.name)
+    new_branch = Branch(
+        repo_id=branch_data.repo_id,
+        name=branch_data.name,
+        forked_from_branch_id=source_branch.id if source_branch else None,
+    )
 
     db.add(new_branch)
+    db.flush()  # Get the branch ID
+
+    # Share the source's scene versions rather than copying them
+    if source_branch:
+        fork_branch_heads(db, source_branch.id, new_branch.id)
+
     db.commit()
     db.refresh(new_branch)
 
@@ -65,3 +100,70 @@ def get_branch(
         raise HTTPException(status_code=404, detail="Branch not found")
 
     return branch
+
+
+@router.get("/branches/{branch_id}/checkout")
+def checkout_branch(
+    branch_id: str,
+    commit_id: str | None = None,
+    at: datetime | None = None,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+) -> StreamingResponse:
+    """Stream a branch's whole manuscript as NDJSON.
+
+    The first line holds the branch and the repository's story nodes; then
+    one line per scene, in story order, with its content at the branch head,
+    as of ``commit_id`` (a commit on the branch), or as of the time ``at``;
+    then a summary line. Scenes without a version in the snapshot have a
+    null ``version_id`` and ``content_html``.
+    """
+
+    if commit_id and at:
+        raise HTTPException(status_code=400, detail="Give commit_id or at, not both")
+
+    branch = db.query(Branch).filter(Branch.id == branch_id).first()
+    if not branch:
+        raise HTTPException(status_code=404, detail="Branch not found")
+
+    commit = None
+    if commit_id:
+        commit = (
+            db.query(Commit)
+            .filter(Commit.id == commit_id, Commit.branch_id == branch.id)
+            .first()
+        )
+        if not commit:
+            raise HTTPException(status_code=404, detail="Commit not found")
+
+    nodes = (
+        db.query(StoryNode)
+        .filter(StoryNode.repo_id == branch.repo_id)
+        .order_by(StoryNode.order_idx)
+        .all()
+    )
+    header = {
+        "branch": BranchSchema.model_validate(branch),
+        "commit_id": commit_id,
+        "at": at,
+        "nodes": [StoryNodeSchema.model_validate(node) for node in nodes],
+    }
+    repo_id = branch.repo_id
+
+    def lines():
+        yield json.dumps(jsonable_encoder(header)) + "\n"
+
+        # The request's session is closed once the response starts
+        scenes = with_content = 0
+        with SessionLocal() as checkout_db:
+            for scene in iter_checkout(checkout_db, repo_id, branch.id, commit, at):
+                scenes += 1
+                if scene["version_id"] is not None:
+                    with_content += 1
+                yield json.dumps(jsonable_encoder(scene)) + "\n"
+
+        yield json.dumps(
+            {"summary": {"scenes": scenes, "with_content": with_content}}
+        ) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
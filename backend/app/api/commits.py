@@ -6,6 +6,8 @@ from app.core.security import verify_api_key
 from app.models.repository import Commit, CommitItem, SceneVersion
 from app.schemas.repository import Commit as CommitSchema
 from app.schemas.repository import CommitCreate
+from app.services.branch_heads import advance_branch_heads
+from app.services.diff_service import enqueue_semantic_diffs
 
 router = APIRouter()
 
@@ -56,6 +58,10 @@ def create_commit(
         commit_item = CommitItem(commit_id=new_commit.id, scene_version_id=version_id)
         db.add(commit_item)
 
+    # Summarize each version against its parent before anyone asks for it
+    enqueue_semantic_diffs(db, scene_versions)
+    advance_branch_heads(db, [v.id for v in scene_versions])
+
     db.commit()
     db.refresh(new_commit)
 
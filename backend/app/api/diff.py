@@ -1,6 +1,7 @@
 import difflib
 import re
 
+from anyio import from_thread
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
@@ -8,7 +9,14 @@ from app.core.db import get_db
 from app.core.security import verify_api_key
 from app.models.repository import SceneVersion
 from app.schemas.repository import DiffResponse
-from app.services.llm_client import LLMClient
+from app.services.diff_service import (
+    compute_semantic_diff,
+    get_cached_semantic_diff,
+    store_semantic_diff,
+)
+from app.services.llm_scheduler import Priority
+from app.services.llm_usage import set_usage_repo
+from app.services.version_store import version_chunks
 
 router = APIRouter()
 
@@ -18,12 +26,12 @@ def strip_html_tags(html_content: str) -> str:
     return re.sub(r"<[^>]+>", "", html_content)
 
 
-def create_html_diff(text_a: str, text_b: str) -> str:
-    """Create an HTML diff between two texts."""
+def create_html_diff(lines_a: list[str], lines_b: list[str]) -> str:
+    """Create an HTML diff between two lists of lines."""
     differ = difflib.HtmlDiff()
     return differ.make_file(
-        text_a.splitlines(),
-        text_b.splitlines(),
+        lines_a,
+        lines_b,
         fromdesc="Version A",
         todesc="Version B",
         context=True,
@@ -51,47 +59,45 @@ def get_diff(
     if not left_version or not right_version:
         raise HTTPException(status_code=404, detail="One or both versions not found")
 
-    # Extract plain text
-    left_text = strip_html_tags(left_version.content_html)
-    right_text = strip_html_tags(right_version.content_html)
-
-    # Create raw HTML diff
-    raw_diff_html = create_html_diff(left_text, right_text)
-
-    # Generate semantic diff using LLM
-    llm_client = LLMClient()
-
-    semantic_prompt = f"""
-Compare these two scene versions and summarize the story changes in ≤120 words, then list 3 bullets of risks.
-
-Version A:
-{left_text}
-
-Version B:
-{right_text}
-
-Return JSON with fields: semantic_summary, risks[]
-"""
-
-    try:
-        semantic_result = llm_client.respond_json(
-            semantic_prompt,
-            {
-                "type": "object",
-                "properties": {
-                    "semantic_summary": {"type": "string"},
-                    "risks": {"type": "array", "items": {"type": "string"}},
-                },
-                "required": ["semantic_summary", "risks"],
-            },
-        )
-
-        semantic_summary = semantic_result.get(
-            "semantic_summary", "No significant changes detected."
-        )
+    # Diff paragraph by paragraph, as plain text
+    left_chunks = version_chunks(db, left_version)
+    right_chunks = version_chunks(db, right_version)
+    raw_diff_html = create_html_diff(
+        [strip_html_tags(chunk).strip() for _, chunk in left_chunks],
+        [strip_html_tags(chunk).strip() for _, chunk in right_chunks],
+    )
 
-    except Exception:
-        semantic_summary = "Unable to generate semantic analysis."
+    # Identical paragraph hashes mean identical content, which needs no
+    # summary; version content is immutable, so a stored summary stays valid
+    unchanged = [h for h, _ in left_chunks] == [h for h, _ in right_chunks]
+    cached = (
+        None
+        if unchanged
+        else get_cached_semantic_diff(db, left_version_id, right_version_id)
+    )
+    if unchanged:
+        semantic_summary, risks = "No changes.", []
+    elif cached:
+        semantic_summary, risks = cached.semantic_summary, cached.risks
+    else:
+        set_usage_repo(right_version.branch.repo_id)
+        try:
+            semantic_result, model = from_thread.run(
+                compute_semantic_diff,
+                left_version.content_html,
+                right_version.content_html,
+                Priority.INTERACTIVE,
+            )
+            semantic_summary = semantic_result["semantic_summary"]
+            risks = semantic_result["risks"]
+            store_semantic_diff(
+                db, left_version_id, right_version_id, semantic_result, model
+            )
+
+        except Exception:
+            # Failures are not stored, so the next request tries again
+            semantic_summary = "Unable to generate semantic analysis."
+            risks = []
 
     # Simple entity change detection (placeholder)
     entity_changes = {"added": [], "removed": [], "modified": []}
@@ -99,5 +105,6 @@ Return JSON with fields: semantic_summary, risks[]
     return DiffResponse(
         raw_diff_html=raw_diff_html,
         semantic_summary=semantic_summary,
+        risks=risks,
         entity_changes=entity_changes,
     )
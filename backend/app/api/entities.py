@@ -5,10 +5,21 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from typing import List
 
+from app.core.config import settings
 from app.core.db import get_db
 from app.core.security import verify_api_key
 from app.models.entity import Entity
-from app.schemas.entity import Entity as EntitySchema, EntityCreate, EntityUpdate
+from app.schemas.entity import (
+    DuplicateCluster,
+    Entity as EntitySchema,
+    EntityCreate,
+    EntityMerge,
+    EntityMergeResult,
+    EntityUpdate,
+)
+from app.services.entity_merge import EntityNotFoundError, merge_entities
+from app.services.mention_index import mention_index
+from app.services.similarity_index import similarity_index
 
 router = APIRouter()
 
@@ -26,6 +37,50 @@ def get_entities(
     return entities
 
 
+@router.get("/entities/duplicates", response_model=list[DuplicateCluster])
+def get_duplicate_entities(
+    threshold: float = settings.entity_dedup_threshold,
+    entity_type: str | None = None,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    x_api_key: str = Header(..., alias="X-API-Key"),
+):
+    """Find clusters of likely duplicate entities.
+
+    Entities of the same type are grouped when a name or alias of one has a
+    trigram similarity of at least ``threshold`` with a name or alias of
+    another, transitively; ``entity_type`` limits this to one type.
+    Candidates come from a MinHash LSH index, so very low thresholds (below
+    about 0.3) miss matches.
+    """
+    # Verify API key
+    verify_api_key(type("Credentials", (), {"credentials": x_api_key})())
+
+    if not 0 < threshold <= 1:
+        raise HTTPException(status_code=400, detail="threshold must be in (0, 1]")
+
+    similarity_index.ensure_loaded(db)
+    clusters = similarity_index.duplicate_clusters(threshold, entity_type)[:limit]
+
+    entity_ids = {entity_id for cluster in clusters for entity_id in cluster.entity_ids}
+    entities = {
+        entity.id: entity
+        for entity in (
+            db.query(Entity).filter(Entity.id.in_(entity_ids)).all()
+            if entity_ids
+            else []
+        )
+    }
+
+    return [
+        DuplicateCluster(
+            similarity=cluster.similarity,
+            entities=[entities[i] for i in cluster.entity_ids if i in entities],
+        )
+        for cluster in clusters
+    ]
+
+
 @router.get("/entities/{entity_id}", response_model=EntitySchema)
 def get_entity(
     entity_id: str,
@@ -63,6 +118,13 @@ def create_entity(
     db.commit()
     db.refresh(new_entity)
 
+    mention_index.upsert_entity(
+        new_entity.id, new_entity.type, new_entity.name, new_entity.aliases
+    )
+    similarity_index.upsert_entity(
+        new_entity.id, new_entity.type, new_entity.name, new_entity.aliases
+    )
+
     return new_entity
 
 
@@ -89,6 +151,9 @@ def update_entity(
     db.commit()
     db.refresh(entity)
 
+    mention_index.upsert_entity(entity.id, entity.type, entity.name, entity.aliases)
+    similarity_index.upsert_entity(entity.id, entity.type, entity.name, entity.aliases)
+
     return entity
 
 
@@ -109,4 +174,31 @@ def delete_entity(
     db.delete(entity)
     db.commit()
 
+    mention_index.remove_entity(entity_id)
+    similarity_index.remove_entity(entity_id)
+
     return {"message": "Entity deleted successfully"}
+
+
+@router.post("/entities/merge", response_model=EntityMergeResult)
+def merge_duplicate_entities(
+    merge_data: EntityMerge,
+    db: Session = Depends(get_db),
+    x_api_key: str = Header(..., alias="X-API-Key"),
+):
+    """Merge duplicate entities into a canonical one.
+
+    The duplicates' names and aliases become aliases of the canonical entity,
+    their relationships and provenance are repointed to it, and they are
+    deleted, all in one transaction.
+    """
+    # Verify API key
+    verify_api_key(type("Credentials", (), {"credentials": x_api_key})())
+
+    if not merge_data.duplicate_ids:
+        raise HTTPException(status_code=400, detail="duplicate_ids is required")
+
+    try:
+        return merge_entities(db, merge_data.canonical_id, merge_data.duplicate_ids)
+    except EntityNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from None
@@ -1,29 +1,359 @@
 """Entity extraction API routes."""
 
+import asyncio
+import json
+import uuid
 from typing import Any
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from ..core.config import settings
+from ..core.db import SessionLocal, get_db
 from ..core.security import verify_api_key
-from ..services.extraction_service import ExtractionService
+from ..models.repository import Branch, SceneVersion
+from ..models.story import Scene
+from ..services.branch_heads import branch_head_versions
+from ..services.entity_resolver import persist_extraction
+from ..services.extraction_service import ExtractionService, split_paragraphs
+from ..services.html_text import html_to_text
+from ..services.llm_usage import set_usage_repo
+from ..services.version_store import preload_version_texts
 
 router = APIRouter()
 
 
+class ExtractBatchRequest(BaseModel):
+    branch_id: str
+    scene_ids: list[str] | None = None  # defaults to every scene on the branch
+    concurrency: int | None = None
+    persist: bool = False  # also upsert entities, relationships and provenance
+
+
+def _version_inputs(
+    version: SceneVersion, parent: SceneVersion | None
+) -> tuple[str, str | None, dict[str, Any] | None]:
+    """Return a version's text plus its parent's text and stored extraction."""
+    parent_extraction = (parent.meta or {}).get("extraction") if parent else None
+    if not parent_extraction:
+        return html_to_text(version.content_html), None, None
+
+    return (
+        html_to_text(version.content_html),
+        html_to_text(parent.content_html),
+        parent_extraction["result"],
+    )
+
+
+def _load_version_texts(
+    db: Session, version_id: str
+) -> tuple[str, str, tuple[str, str | None, dict[str, Any] | None]]:
+    """Load a version's repository and scene ids and its extraction inputs."""
+    version = db.query(SceneVersion).filter(SceneVersion.id == version_id).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Scene version not found")
+
+    return (
+        version.branch.repo_id,
+        str(version.scene_id),
+        _version_inputs(version, version.parent_version),
+    )
+
+
+async def _extract_version(
+    extraction_service: ExtractionService,
+    scene_text: str,
+    parent_text: str | None,
+    parent_result: dict[str, Any] | None,
+) -> tuple[dict[str, Any], dict[str, int]]:
+    """Extract a version, incrementally when the parent has a stored result."""
+    if parent_result is not None:
+        return await extraction_service.extract_incremental(
+            scene_text, parent_text, parent_result
+        )
+
+    result = await extraction_service.extract_entities(scene_text)
+    paragraphs = len(split_paragraphs(scene_text))
+    stats = {
+        "paragraphs": paragraphs,
+        "reused_paragraphs": 0,
+        "reextracted_paragraphs": paragraphs,
+    }
+    return result, stats
+
+
+def _store_extraction(
+    db: Session,
+    version_id: str,
+    result: dict[str, Any],
+    stats: dict[str, int],
+    persist_scene_id: str | None = None,
+) -> dict[str, int] | None:
+    """Store a result in the version's meta, persisting it first if asked.
+
+    Both are committed together, so the stored result carries the resolved
+    entity ids.
+    """
+    persisted = None
+    if persist_scene_id is not None:
+        persisted = persist_extraction(db, persist_scene_id, result)
+
+    # Locked and re-read so concurrent writers of other meta keys, such as
+    # the sentiment job, aren't overwritten
+    version = (
+        db.query(SceneVersion)
+        .filter(SceneVersion.id == version_id)
+        .populate_existing()
+        .with_for_update()
+        .first()
+    )
+    version.meta = {
+        **(version.meta or {}),
+        "extraction": {"result": result, "stats": stats},
+    }
+    db.commit()
+    return persisted
+
+
+def _check_scene(db: Session, scene_id: str) -> None:
+    try:
+        uuid.UUID(str(scene_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="scene_id must be a UUID") from None
+    if db.get(Scene, scene_id) is None:
+        raise HTTPException(status_code=404, detail="Scene not found")
+
+
+def _persist_scene_extraction(
+    db: Session, scene_id: str, result: dict[str, Any]
+) -> dict[str, int]:
+    persisted = persist_extraction(db, scene_id, result)
+    db.commit()
+    return persisted
+
+
 @router.post("/extract")
 async def extract_entities(
-    request: dict[str, Any], x_api_key: str = Header(..., alias="X-API-Key")
+    request: dict[str, Any],
+    db: Session = Depends(get_db),
+    x_api_key: str = Header(..., alias="X-API-Key"),
 ) -> dict[str, Any]:
-    """Extract entities from scene text."""
+    """Extract entities from scene text or from a saved scene version.
+
+    With ``version_id``, the version's content is extracted and the result is
+    stored in its meta. If the parent version already has a stored result,
+    only the paragraphs that changed since the parent are sent to the LLM.
+    With ``scene_text``, an optional ``repo_id`` attributes the LLM usage.
+
+    With ``persist: true`` the result is also written to the world: extracted
+    entities are matched to existing ones by name or alias (or created),
+    relationships are added and the scene's provenance is replaced, all in one
+    transaction. ``scene_text`` mode then needs the ``scene_id`` the text
+    belongs to. The response gains a ``persisted`` summary of the writes.
+    """
 
     # Verify API key
     verify_api_key(type("Credentials", (), {"credentials": x_api_key})())
 
+    extraction_service = ExtractionService()
+
+    persist = bool(request.get("persist"))
+
+    version_id = request.get("version_id")
+    if version_id:
+        repo_id, scene_id, inputs = await run_in_threadpool(
+            _load_version_texts, db, version_id
+        )
+        set_usage_repo(repo_id)
+        result, stats = await _extract_version(extraction_service, *inputs)
+        persisted = await run_in_threadpool(
+            _store_extraction,
+            db,
+            version_id,
+            result,
+            stats,
+            scene_id if persist else None,
+        )
+        if persist:
+            return {**result, "persisted": persisted}
+        return result
+
     scene_text = request.get("scene_text")
     if not scene_text:
         raise HTTPException(status_code=400, detail="scene_text is required")
 
-    extraction_service = ExtractionService()
-    result = extraction_service.extract_entities(scene_text)
+    scene_id = request.get("scene_id")
+    if persist:
+        if not scene_id:
+            raise HTTPException(
+                status_code=400, detail="scene_id is required to persist scene_text"
+            )
+        await run_in_threadpool(_check_scene, db, scene_id)
+
+    try:
+        set_usage_repo(request.get("repo_id"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="repo_id must be a UUID") from None
+
+    result = await extraction_service.extract_entities(scene_text)
+
+    if persist:
+        persisted = await run_in_threadpool(
+            _persist_scene_extraction, db, scene_id, result
+        )
+        return {**result, "persisted": persisted}
 
     return result
+
+
+def _load_branch_heads(
+    db: Session, branch_id: str, scene_ids: list[uuid.UUID] | None
+) -> tuple[str, list[tuple[str, str, tuple[str, str | None, dict[str, Any] | None]]]]:
+    """Load the branch's repository id and the latest version of each scene."""
+    branch = db.query(Branch).filter(Branch.id == branch_id).first()
+    if not branch:
+        raise HTTPException(status_code=404, detail="Branch not found")
+
+    versions = branch_head_versions(db, branch_id, scene_ids).all()
+
+    parent_ids = {v.parent_version_id for v in versions if v.parent_version_id}
+    parents = {
+        parent.id: parent
+        for parent in (
+            db.query(SceneVersion).filter(SceneVersion.id.in_(parent_ids)).all()
+            if parent_ids
+            else []
+        )
+    }
+    preload_version_texts(db, [*versions, *parents.values()])
+
+    return branch.repo_id, [
+        (
+            str(version.scene_id),
+            str(version.id),
+            _version_inputs(version, parents.get(version.parent_version_id)),
+        )
+        for version in versions
+    ]
+
+
+def _store_batch_extraction(
+    version_id: str,
+    result: dict[str, Any],
+    stats: dict[str, int],
+    persist_scene_id: str | None,
+) -> dict[str, int] | None:
+    with SessionLocal() as db:
+        return _store_extraction(db, version_id, result, stats, persist_scene_id)
+
+
+@router.post("/extract/batch")
+async def extract_batch(
+    request: ExtractBatchRequest,
+    db: Session = Depends(get_db),
+    x_api_key: str = Header(..., alias="X-API-Key"),
+) -> StreamingResponse:
+    """Extract entities for many scenes on a branch, streamed as NDJSON.
+
+    Each scene's latest version on the branch is extracted (incrementally
+    where possible) and stored in its meta. One JSON line is written per scene
+    as it completes, with ``status`` ``ok`` or ``error``, followed by a final
+    summary line. Failures do not stop the rest of the batch. With
+    ``persist``, each scene's result is also persisted as in ``/extract`` and
+    its line carries a ``persisted`` summary.
+    """
+
+    # Verify API key
+    verify_api_key(type("Credentials", (), {"credentials": x_api_key})())
+
+    scene_ids = None
+    if request.scene_ids is not None:
+        try:
+            scene_ids = [uuid.UUID(scene_id) for scene_id in request.scene_ids]
+        except ValueError:
+            raise HTTPException(
+                status_code=422, detail="scene_ids must be UUIDs"
+            ) from None
+
+    repo_id, heads = await run_in_threadpool(
+        _load_branch_heads, db, request.branch_id, scene_ids
+    )
+    set_usage_repo(repo_id)
+    if scene_ids is not None:
+        found = {uuid.UUID(scene_id) for scene_id, _, _ in heads}
+        missing = [
+            str(scene_id)
+            for scene_id in dict.fromkeys(scene_ids)
+            if scene_id not in found
+        ]
+    else:
+        missing = []
+
+    concurrency = min(
+        request.concurrency or settings.extraction_batch_concurrency,
+        settings.extraction_batch_max_concurrency,
+    )
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    extraction_service = ExtractionService()
+
+    async def run(scene_id: str, version_id: str, inputs) -> dict[str, Any]:
+        try:
+            async with semaphore:
+                result, stats = await _extract_version(extraction_service, *inputs)
+            persisted = await run_in_threadpool(
+                _store_batch_extraction,
+                version_id,
+                result,
+                stats,
+                scene_id if request.persist else None,
+            )
+        except Exception as exc:
+            return {
+                "scene_id": scene_id,
+                "version_id": version_id,
+                "status": "error",
+                "error": str(exc),
+            }
+        item = {
+            "scene_id": scene_id,
+            "version_id": version_id,
+            "status": "ok",
+            "stats": stats,
+            "result": result,
+        }
+        if request.persist:
+            item["persisted"] = persisted
+        return item
+
+    async def lines():
+        failed = len(missing)
+        for scene_id in missing:
+            yield json.dumps(
+                {
+                    "scene_id": scene_id,
+                    "version_id": None,
+                    "status": "error",
+                    "error": "No version found for this scene and branch",
+                }
+            ) + "\n"
+
+        tasks = [asyncio.create_task(run(*head)) for head in heads]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                if item["status"] == "error":
+                    failed += 1
+                yield json.dumps(item) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        total = len(heads) + len(missing)
+        yield json.dumps(
+            {"summary": {"total": total, "succeeded": total - failed, "failed": failed}}
+        ) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
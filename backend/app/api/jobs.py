@@ -0,0 +1,25 @@
+"""Background job API routes."""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.core.security import verify_api_key
+from app.models.job import Job
+from app.schemas.job import Job as JobSchema
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=JobSchema)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Get the status of a background job."""
+
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,118 @@
+"""Entity mention API routes."""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.core.security import verify_api_key
+from app.models.provenance import EntityProvenance as EntityProvenanceModel
+from app.models.repository import SceneVersion
+from app.schemas.mention import Mention, SceneMentions
+from app.services.branch_heads import latest_version
+from app.services.html_text import html_to_text
+from app.services.mention_index import mention_index
+
+router = APIRouter()
+
+
+def _load_scene_version(
+    db: Session, scene_id: str, branch_id: str | None, version_id: str | None
+) -> SceneVersion:
+    """Load the given version of a scene, or its latest version on a branch."""
+    if version_id:
+        version = (
+            db.query(SceneVersion)
+            .filter(SceneVersion.id == version_id, SceneVersion.scene_id == scene_id)
+            .first()
+        )
+    elif branch_id:
+        version = latest_version(db, scene_id, branch_id)
+    else:
+        raise HTTPException(
+            status_code=400, detail="branch_id or version_id is required"
+        )
+
+    if not version:
+        raise HTTPException(status_code=404, detail="Scene version not found")
+    return version
+
+
+def _find_mentions(db: Session, version: SceneVersion) -> list[Mention]:
+    mention_index.ensure_loaded(db)
+    return [
+        Mention(
+            entity_ids=list(mention.entity_ids),
+            start_idx=mention.start,
+            end_idx=mention.end,
+            text=mention.text,
+        )
+        for mention in mention_index.find(html_to_text(version.content_html))
+    ]
+
+
+@router.get("/scenes/{scene_id}/mentions", response_model=SceneMentions)
+def get_scene_mentions(
+    scene_id: str,
+    branch_id: str | None = None,
+    version_id: str | None = None,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Find mentions of known entities in a scene version.
+
+    Matches entity names and aliases case-insensitively on word boundaries.
+    Offsets refer to the version's plain text, as extraction spans do.
+    """
+
+    version = _load_scene_version(db, scene_id, branch_id, version_id)
+    return SceneMentions(
+        scene_id=scene_id,
+        version_id=str(version.id),
+        mentions=_find_mentions(db, version),
+    )
+
+
+@router.post("/scenes/{scene_id}/mentions", response_model=SceneMentions)
+def write_scene_mentions(
+    scene_id: str,
+    branch_id: str | None = None,
+    version_id: str | None = None,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Find mentions in a scene version and store them as entity provenance.
+
+    Replaces the scene's provenance records. A mention of a name shared by
+    several entities is recorded for each of them, with confidence split
+    evenly between them.
+    """
+
+    version = _load_scene_version(db, scene_id, branch_id, version_id)
+    mentions = _find_mentions(db, version)
+
+    rows = [
+        {
+            "entity_id": entity_id,
+            "scene_id": scene_id,
+            "start_idx": mention.start_idx,
+            "end_idx": mention.end_idx,
+            "confidence": 1.0 / len(mention.entity_ids),
+        }
+        for mention in mentions
+        for entity_id in mention.entity_ids
+    ]
+
+    db.execute(
+        delete(EntityProvenanceModel).where(EntityProvenanceModel.scene_id == scene_id)
+    )
+    if rows:
+        db.execute(insert(EntityProvenanceModel), rows)
+    db.commit()
+
+    return SceneMentions(
+        scene_id=scene_id,
+        version_id=str(version.id),
+        mentions=mentions,
+        provenance_written=len(rows),
+    )
@@ -0,0 +1,146 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.core.security import verify_api_key
+from app.models.repository import Branch, PullRequest
+from app.schemas.repository import (
+    MergePreview,
+    MergeResult,
+    PullRequestCreate,
+    SceneMerge,
+)
+from app.schemas.repository import PullRequest as PullRequestSchema
+from app.services.merge_service import (
+    MergeConflictError,
+    PullRequestNotFoundError,
+    PullRequestNotOpenError,
+    merge_pull_request,
+    plan_merge,
+)
+
+router = APIRouter()
+
+
+@router.post("/pull_requests", response_model=PullRequestSchema)
+def create_pull_request(
+    pull_request_data: PullRequestCreate,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Open a pull request from one branch of a repository into another."""
+
+    branch_ids = {
+        pull_request_data.source_branch_id,
+        pull_request_data.target_branch_id,
+    }
+    if len(branch_ids) != 2:
+        raise HTTPException(
+            status_code=400, detail="Source and target branches must differ"
+        )
+
+    branches = (
+        db.query(Branch)
+        .filter(Branch.id.in_(branch_ids), Branch.repo_id == pull_request_data.repo_id)
+        .count()
+    )
+    if branches != 2:
+        raise HTTPException(status_code=404, detail="Branch not found")
+
+    new_pull_request = PullRequest(**pull_request_data.model_dump())
+
+    db.add(new_pull_request)
+    db.commit()
+    db.refresh(new_pull_request)
+
+    return new_pull_request
+
+
+@router.get(
+    "/repositories/{repo_id}/pull_requests", response_model=list[PullRequestSchema]
+)
+def list_pull_requests(
+    repo_id: str,
+    status: str | None = None,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """List a repository's pull requests, optionally filtered by status."""
+
+    query = db.query(PullRequest).filter(PullRequest.repo_id == repo_id)
+    if status:
+        query = query.filter(PullRequest.status == status)
+
+    return query.order_by(PullRequest.created_at.desc()).all()
+
+
+@router.get("/pull_requests/{pull_request_id}", response_model=PullRequestSchema)
+def get_pull_request(
+    pull_request_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Get a specific pull request by ID."""
+
+    pull_request = db.get(PullRequest, pull_request_id)
+    if not pull_request:
+        raise HTTPException(status_code=404, detail="Pull request not found")
+
+    return pull_request
+
+
+@router.get(
+    "/pull_requests/{pull_request_id}/merge-preview", response_model=MergePreview
+)
+def preview_merge(
+    pull_request_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Report how each scene changed on the source branch would merge.
+
+    Nothing is written; conflicting paragraphs are listed per scene.
+    """
+
+    pull_request = db.get(PullRequest, pull_request_id)
+    if not pull_request:
+        raise HTTPException(status_code=404, detail="Pull request not found")
+
+    scenes, _ = plan_merge(db, pull_request)
+    return MergePreview(
+        pull_request_id=pull_request.id,
+        mergeable=not any(scene["status"] == "conflict" for scene in scenes),
+        scenes=scenes,
+    )
+
+
+@router.post("/pull_requests/{pull_request_id}/merge", response_model=MergeResult)
+def merge(
+    pull_request_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Merge a pull request if every scene merges cleanly.
+
+    Responds 409 with the merge preview's scenes if any conflict.
+    """
+
+    try:
+        return merge_pull_request(db, pull_request_id)
+    except PullRequestNotFoundError:
+        raise HTTPException(status_code=404, detail="Pull request not found") from None
+    except PullRequestNotOpenError as exc:
+        raise HTTPException(
+            status_code=400, detail=f"Pull request is {exc.args[0]}"
+        ) from None
+    except MergeConflictError as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": str(exc),
+                "scenes": jsonable_encoder(
+                    [SceneMerge(**scene) for scene in exc.scenes]
+                ),
+            },
+        ) from None
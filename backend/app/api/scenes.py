@@ -1,10 +1,14 @@
 """Scene generation API routes."""
 
+import json
+
 from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
 
 from ..core.security import verify_api_key
 from ..schemas.scene import SceneGenerateRequest
 from ..services.generation_service import GenerationService
+from ..services.llm_usage import set_usage_repo
 
 router = APIRouter()
 
@@ -18,9 +22,57 @@ async def generate_scenes(
     # Verify API key
     verify_api_key(type("Credentials", (), {"credentials": x_api_key})())
 
+    set_usage_repo(request.repo_id)
     generation_service = GenerationService()
-    variants = generation_service.generate_scenes(
-        pov=request.pov, location=request.location, keywords=request.keywords
+    variants = await generation_service.generate_scenes(
+        pov=request.pov,
+        location=request.location,
+        keywords=request.keywords,
+        candidates=request.candidates,
     )
 
     return variants
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/scenes/generate/stream")
+async def stream_scenes(
+    request: SceneGenerateRequest, x_api_key: str = Header(..., alias="X-API-Key")
+) -> StreamingResponse:
+    """Stream 3 scene variants as Server-Sent Events.
+
+    Emits ``delta`` events with ``{"variant", "text"}`` as tokens arrive, a
+    ``done`` event per finished variant, and a final ``end`` event. Failures
+    are reported as an ``error`` event before the stream closes.
+    """
+
+    # Verify API key
+    verify_api_key(type("Credentials", (), {"credentials": x_api_key})())
+
+    set_usage_repo(request.repo_id)
+    generation_service = GenerationService()
+
+    async def events():
+        try:
+            async for variant, text in generation_service.stream_scenes(
+                pov=request.pov, location=request.location, keywords=request.keywords
+            ):
+                if text is None:
+                    yield _sse_event("done", {"variant": variant})
+                else:
+                    yield _sse_event("delta", {"variant": variant, "text": text})
+        except Exception as exc:
+            yield _sse_event("error", {"detail": str(exc)})
+            return
+
+        yield _sse_event("end", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,21 +1,31 @@
-
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.db import get_db
 from app.core.security import verify_api_key
 from app.models.repository import SceneVersion
+from app.services.local_sentiment import score_texts
+from app.services.version_store import preload_version_texts
+
+BACKFILL_BATCH_SIZE = 500
 
 router = APIRouter()
 
 
 class SentimentPoint(BaseModel):
     version_id: str
-    score: float
+    score: float | None
+    status: str  # done, provisional, pending, failed, estimated or unscored
     created_at: str
 
 
+class SentimentBackfillResponse(BaseModel):
+    scored: int
+    skipped: int
+
+
 @router.get("/sentiment/series", response_model=list[SentimentPoint])
 def get_sentiment_series(
     scene_id: str,
@@ -23,7 +33,11 @@ def get_sentiment_series(
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_api_key),
 ):
-    """Get sentiment series for a scene across all versions."""
+    """Get sentiment series for a scene across all versions.
+
+    Versions without a stored score are estimated with the local scorer in a
+    single batch, unless sentiment_mode is ``llm``.
+    """
 
     versions = (
         db.query(SceneVersion)
@@ -35,13 +49,83 @@ def get_sentiment_series(
 
     sentiment_points = []
     for version in versions:
-        sentiment = version.meta.get("sentiment", 0.0) if version.meta else 0.0
+        meta = version.meta or {}
+        sentiment = meta.get("sentiment")
+        status = meta.get("sentiment_status") or (
+            "done" if sentiment is not None else "unscored"
+        )
         sentiment_points.append(
             SentimentPoint(
                 version_id=str(version.id),
                 score=sentiment,
+                status=status,
                 created_at=version.created_at.isoformat(),
             )
         )
 
+    unscored = [
+        (point, version)
+        for point, version in zip(sentiment_points, versions, strict=True)
+        if point.status == "unscored"
+    ]
+    if unscored and settings.sentiment_mode != "llm":
+        preload_version_texts(db, [version for _, version in unscored])
+        scores = score_texts([version.content_html for _, version in unscored])
+        for (point, _), score in zip(unscored, scores, strict=True):
+            point.score = score
+            point.status = "estimated"
+
     return sentiment_points
+
+
+@router.post("/sentiment/backfill", response_model=SentimentBackfillResponse)
+def backfill_sentiment(
+    scene_id: str | None = None,
+    branch_id: str | None = None,
+    overwrite: bool = False,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Store local sentiment scores for historical versions in batches.
+
+    Versions that already have a score are skipped unless ``overwrite`` is set.
+    """
+
+    query = db.query(SceneVersion)
+    if scene_id:
+        query = query.filter(SceneVersion.scene_id == scene_id)
+    if branch_id:
+        query = query.filter(SceneVersion.branch_id == branch_id)
+
+    # Page by primary key so each batch is committed independently
+    scored = skipped = 0
+    last_id = None
+    while True:
+        page_query = query.order_by(SceneVersion.id)
+        if last_id is not None:
+            page_query = page_query.filter(SceneVersion.id > last_id)
+        page = page_query.limit(BACKFILL_BATCH_SIZE).all()
+        if not page:
+            break
+        last_id = page[-1].id
+
+        batch = [
+            version
+            for version in page
+            if overwrite or (version.meta or {}).get("sentiment") is None
+        ]
+        skipped += len(page) - len(batch)
+
+        preload_version_texts(db, batch)
+        scores = score_texts([version.content_html for version in batch])
+        for version, score in zip(batch, scores, strict=True):
+            version.meta = {
+                **(version.meta or {}),
+                "sentiment": score,
+                "sentiment_source": "local",
+                "sentiment_status": "done",
+            }
+        db.commit()
+        scored += len(batch)
+
+    return SentimentBackfillResponse(scored=scored, skipped=skipped)
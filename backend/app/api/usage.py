@@ -0,0 +1,166 @@
+"""LLM usage and budget API routes."""
+
+from datetime import UTC, datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.core.security import verify_api_key
+from app.models.llm_usage import LLMBudget, LLMUsage
+from app.models.repository import Repository
+from app.schemas.usage import Budget, BudgetUpdate, UsageReport, UsageRow
+from app.services.llm_client import get_llm_client
+from app.services.llm_usage import month_start, month_to_date_tokens, token_cost
+
+router = APIRouter()
+
+
+@router.get("/usage", response_model=UsageReport)
+def get_usage(
+    repo_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    group_by: Literal["repo", "endpoint", "model", "day"] = "endpoint",
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Aggregate recorded LLM usage and cost.
+
+    Defaults to the current month. Calls still buffered in memory appear after
+    the next ledger flush.
+    """
+
+    until = until or datetime.now(UTC)
+    since = since or month_start(until)
+
+    key = {
+        "repo": LLMUsage.repo_id,
+        "endpoint": LLMUsage.endpoint,
+        "model": LLMUsage.model,
+        "day": func.date_trunc("day", LLMUsage.created_at),
+    }[group_by]
+
+    # Group by model as well, so cost can be priced per model
+    query = db.query(
+        key,
+        LLMUsage.model,
+        func.count(),
+        func.sum(LLMUsage.prompt_tokens),
+        func.sum(LLMUsage.completion_tokens),
+        func.sum(LLMUsage.latency_ms),
+    ).filter(LLMUsage.created_at >= since, LLMUsage.created_at < until)
+    if repo_id:
+        query = query.filter(LLMUsage.repo_id == repo_id)
+
+    groups: dict[str | None, dict] = {}
+    for group, model, calls, prompt, completion, latency in query.group_by(
+        key, LLMUsage.model
+    ):
+        label = group.date().isoformat() if group_by == "day" else group
+        row = groups.setdefault(
+            str(label) if label is not None else None,
+            {"calls": 0, "prompt": 0, "completion": 0, "latency": 0, "cost": 0.0},
+        )
+        cost = token_cost(model, prompt, completion)
+        row["calls"] += calls
+        row["prompt"] += prompt
+        row["completion"] += completion
+        row["latency"] += latency
+        row["cost"] = (
+            None if cost is None or row["cost"] is None else row["cost"] + cost
+        )
+
+    rows = [
+        UsageRow(
+            key=label,
+            calls=row["calls"],
+            prompt_tokens=row["prompt"],
+            completion_tokens=row["completion"],
+            total_tokens=row["prompt"] + row["completion"],
+            avg_latency_ms=round(row["latency"] / row["calls"], 1),
+            cost_usd=round(row["cost"], 6) if row["cost"] is not None else None,
+        )
+        for label, row in groups.items()
+    ]
+    rows.sort(key=lambda row: row.total_tokens, reverse=True)
+
+    return UsageReport(since=since, until=until, group_by=group_by, rows=rows)
+
+
+def _budget_response(db: Session, budget: LLMBudget) -> Budget:
+    spent = month_to_date_tokens(db, str(budget.repo_id))
+    return Budget(
+        repo_id=str(budget.repo_id),
+        monthly_token_limit=budget.monthly_token_limit,
+        fallback_model=budget.fallback_model,
+        spent_tokens=spent,
+        exceeded=spent >= budget.monthly_token_limit,
+    )
+
+
+@router.get("/repositories/{repo_id}/budget", response_model=Budget)
+def get_budget(
+    repo_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Get a repository's LLM budget and its spend this month."""
+
+    budget = db.get(LLMBudget, repo_id)
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    return _budget_response(db, budget)
+
+
+@router.put("/repositories/{repo_id}/budget", response_model=Budget)
+def set_budget(
+    repo_id: str,
+    budget_data: BudgetUpdate,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Create or replace a repository's monthly LLM token budget.
+
+    Once the month's usage reaches the limit, calls for the repository use
+    ``fallback_model``; without one they fail, and work with a local
+    fallback (such as sentiment) uses it instead.
+    """
+
+    if not db.get(Repository, repo_id):
+        raise HTTPException(status_code=404, detail="Repository not found")
+
+    budget = db.get(LLMBudget, repo_id) or LLMBudget(repo_id=repo_id)
+    budget.monthly_token_limit = budget_data.monthly_token_limit
+    budget.fallback_model = budget_data.fallback_model
+    db.add(budget)
+    db.commit()
+    db.refresh(budget)
+
+    if budgets := get_llm_client().budgets:
+        budgets.invalidate(repo_id)
+
+    return _budget_response(db, budget)
+
+
+@router.delete("/repositories/{repo_id}/budget")
+def delete_budget(
+    repo_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Remove a repository's LLM budget."""
+
+    budget = db.get(LLMBudget, repo_id)
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+
+    db.delete(budget)
+    db.commit()
+
+    if budgets := get_llm_client().budgets:
+        budgets.invalidate(repo_id)
+
+    return {"message": "Budget deleted successfully"}
@@ -12,7 +12,20 @@ from app.schemas.repository import (
 from app.schemas.repository import (
     SceneVersionCreate,
 )
-from app.services.llm_client import LLMClient
+from app.services.branch_heads import advance_branch_heads, latest_version
+from app.services.diff_service import enqueue_semantic_diffs
+from app.services.job_queue import enqueue
+from app.services.sentiment_service import (
+    SENTIMENT_JOB,
+    html_to_sentiment_text,
+    initial_sentiment_meta,
+)
+from app.services.version_ancestry import (
+    common_ancestor,
+    is_ancestor,
+    version_history,
+)
+from app.services.version_store import preload_version_texts
 
 router = APIRouter()
 
@@ -28,28 +41,7 @@ class VersionSaveRequest(BaseModel):
 
 class VersionSaveResponse(BaseModel):
     version_id: str
-
-
-def analyze_sentiment(text: str) -> float:
-    """Analyze sentiment of text using OpenAI."""
-    try:
-        llm_client = LLMClient()
-        prompt = f"Return a single float between -1 and 1 representing the emotional valence of this passage. -1 is very negative, 0 is neutral, 1 is very positive.\n\nText: {text}"
-
-        result = llm_client.respond_json(
-            prompt,
-            {
-                "type": "object",
-                "properties": {
-                    "sentiment": {"type": "number", "minimum": -1, "maximum": 1}
-                },
-                "required": ["sentiment"],
-            },
-        )
-
-        return result.get("sentiment", 0.0)
-    except Exception:
-        return 0.0
+    sentiment_job_id: str | None = None
 
 
 @router.post("/scene_versions", response_model=SceneVersionSchema)
@@ -89,6 +81,8 @@ def save_version(
     )
 
     db.add(new_version)
+    db.flush()
+    advance_branch_heads(db, [new_version.id])
     db.commit()
     db.refresh(new_version)
 
@@ -110,6 +104,7 @@ def list_scene_versions(
         query = query.filter(SceneVersion.branch_id == branch_id)
 
     versions = query.order_by(SceneVersion.created_at.desc()).all()
+    preload_version_texts(db, versions)
     return versions
 
 
@@ -128,7 +123,60 @@ def get_version(
     return version
 
 
-@router.get("/versions/latest")
+@router.get(
+    "/scene_versions/{version_id}/history", response_model=list[SceneVersionSchema]
+)
+def get_version_history(
+    version_id: str,
+    limit: int = 100,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """List a version and its ancestors, newest first."""
+
+    versions = version_history(db, version_id, limit=min(limit, 1000), offset=offset)
+    if not versions and offset == 0:
+        raise HTTPException(status_code=404, detail="Scene version not found")
+
+    preload_version_texts(db, versions)
+    return versions
+
+
+@router.get("/versions/common_ancestor", response_model=SceneVersionSchema)
+def get_common_ancestor(
+    left_version_id: str,
+    right_version_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Get the most recent version both versions descend from."""
+
+    ancestor_id = common_ancestor(db, left_version_id, right_version_id)
+    if ancestor_id is None:
+        raise HTTPException(status_code=404, detail="No common ancestor found")
+
+    return db.get(SceneVersion, ancestor_id)
+
+
+@router.get("/versions/is_ancestor")
+def check_ancestor(
+    ancestor_version_id: str,
+    version_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """Check whether one version is another or one of its ancestors."""
+
+    ancestor = db.get(SceneVersion, ancestor_version_id)
+    version = db.get(SceneVersion, version_id)
+    if not ancestor or not version:
+        raise HTTPException(status_code=404, detail="One or both versions not found")
+
+    return {"is_ancestor": is_ancestor(db, ancestor, version)}
+
+
+@router.get("/versions/latest", response_model=SceneVersionSchema)
 def get_latest_version(
     scene_id: str,
     branch_id: str,
@@ -137,14 +185,7 @@ def get_latest_version(
 ):
     """Get the latest version of a scene for a specific branch."""
 
-    version = (
-        db.query(SceneVersion)
-        .filter(SceneVersion.scene_id == scene_id)
-        .filter(SceneVersion.branch_id == branch_id)
-        .order_by(SceneVersion.created_at.desc())
-        .first()
-    )
-
+    version = latest_version(db, scene_id, branch_id)
     if not version:
         raise HTTPException(
             status_code=404, detail="No version found for this scene and branch"
@@ -170,13 +211,11 @@ def save_version_with_commit(
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
 
-    # Analyze sentiment
-    text_content = request.content_html.replace("<", " <").replace(">", "> ")
-    sentiment = analyze_sentiment(text_content)
+    text_content = html_to_sentiment_text(request.content_html)
 
-    # Update meta with sentiment
-    meta = request.meta.copy()
-    meta["sentiment"] = sentiment
+    # Score locally now and/or leave it to a background job, per sentiment_mode
+    sentiment_meta, needs_sentiment_job = initial_sentiment_meta(request.content_html)
+    meta = {**request.meta, **sentiment_meta}
 
     # Create new version
     new_version = SceneVersion(
@@ -209,6 +248,18 @@ def save_version_with_commit(
     commit_item = CommitItem(commit_id=commit.id, scene_version_id=new_version.id)
 
     db.add(commit_item)
+
+    # Enqueue LLM sentiment analysis in the same transaction as the save
+    sentiment_job_id = None
+    if needs_sentiment_job:
+        sentiment_job = enqueue(db, SENTIMENT_JOB, {"version_id": str(new_version.id)})
+        sentiment_job_id = str(sentiment_job.id)
+
+    enqueue_semantic_diffs(db, [new_version])
+    advance_branch_heads(db, [new_version.id])
+
     db.commit()
 
-    return VersionSaveResponse(version_id=str(new_version.id))
+    return VersionSaveResponse(
+        version_id=str(new_version.id), sentiment_job_id=sentiment_job_id
+    )
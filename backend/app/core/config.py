@@ -1,5 +1,7 @@
 """Application configuration."""
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -11,6 +13,103 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-4o-mini"
     api_key: str = "dev-key"
 
+    # LLM client
+    llm_max_connections: int = 20
+    llm_timeout_seconds: float = 60.0
+
+    # LLM backend: the OpenAI API, or a local stand-in for offline load tests.
+    # With openai, responses are appended to llm_recordings_path if set; with
+    # fake, requests matching a recording there are replayed.
+    llm_backend: Literal["openai", "fake"] = "openai"
+    llm_recordings_path: str | None = None
+    llm_fake_latency: Literal["none", "fixed", "uniform", "lognormal"] = "lognormal"
+    llm_fake_latency_ms: float = 800.0  # mean, or median for lognormal
+    llm_fake_latency_spread: float = 0.5  # uniform: +/- fraction; lognormal: sigma
+    llm_fake_stream_interval_ms: float = 20.0
+    llm_fake_error_rate: float = 0.0
+    llm_fake_text_words: int = 300
+    llm_fake_seed: int | None = None
+
+    # LLM scheduler: provider rate limits, retries and circuit breaker
+    llm_requests_per_minute: int = 500
+    llm_tokens_per_minute: int = 200_000
+    llm_completion_token_estimate: int = 500
+    llm_max_retries: int = 4
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 30.0
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_reset_seconds: float = 30.0
+
+    # LLM response cache
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 24 * 60 * 60
+    llm_cache_memory_entries: int = 1024
+    llm_cache_memory_bytes: int = 64 * 1024 * 1024
+    llm_cache_persistent: bool = True
+    llm_cache_persistent_max_bytes: int = 512 * 1024 * 1024
+    llm_cache_prune_every: int = 100
+
+    # LLM usage ledger and per-repository budgets
+    llm_usage_enabled: bool = True
+    llm_usage_flush_size: int = 200
+    llm_usage_flush_interval_seconds: float = 5.0
+    llm_budget_refresh_seconds: float = 30.0
+    # USD per million (prompt, completion) tokens, for usage reports
+    llm_prices_per_million_tokens: dict[str, tuple[float, float]] = {
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4.1-mini": (0.40, 1.60),
+        "gpt-4.1-nano": (0.10, 0.40),
+    }
+
+    # Background jobs
+    job_workers: int = 4
+    job_poll_interval_seconds: float = 1.0
+    job_max_attempts: int = 5
+    job_retry_base_seconds: float = 5.0
+    job_lock_seconds: int = 300
+
+    # Sentiment: local lexicon scorer, LLM, or local now refined by LLM later
+    sentiment_mode: Literal["local", "llm", "hybrid"] = "hybrid"
+
+    # Entity extraction
+    extraction_window_chars: int = 6000
+    extraction_window_overlap: int = 1  # paragraphs shared by adjacent windows
+    extraction_concurrency: int = 4
+    extraction_batch_concurrency: int = 4  # scenes extracted at once
+    extraction_batch_max_concurrency: int = 16
+    extraction_gazetteer: bool = True  # only ask the LLM for unknown entities
+
+    # Entity mention index
+    mention_index_reload_seconds: float = 300.0  # to pick up other processes' edits
+    mention_min_length: int = 2
+
+    # Near-duplicate entity index: MinHash LSH over name trigrams
+    entity_dedup_bands: int = 32
+    entity_dedup_rows: int = 3  # minhashes per band; bands * rows permutations
+    entity_dedup_threshold: float = 0.5  # trigram Jaccard similarity
+    entity_fuzzy_match_threshold: float = 0.8  # extraction resolves above this
+
+    # Scene generation
+    generation_candidates: int = 3
+    generation_max_candidates: int = 8
+
+    # Scene version storage: deltas against the parent, full text every N
+    version_keyframe_interval: int = 50  # 1 stores every version in full
+    version_chunk_store: bool = True  # keyframes as shared paragraph chunks
+    version_chunk_cache_size: int = 8192  # decompressed chunks kept in memory
+    version_text_cache_size: int = 512  # reconstructed texts kept in memory
+
+    # Branch checkout: scenes read from the cursor and reconstructed per batch
+    checkout_batch_size: int = 200
+
+    # Pull request merges: scenes are merged in worker processes when many
+    merge_workers: int = 4  # 1 merges every scene in the request's process
+    merge_parallel_min_scenes: int = 16
+
+    # Semantic diffs: summarize each committed version against its parent
+    semantic_diff_precompute: bool = True
+
     class Config:
         env_file = ".env"
         case_sensitive = False
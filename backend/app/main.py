@@ -1,7 +1,10 @@
 """FastAPI main application."""
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from .api import (
     branches,
@@ -10,20 +13,73 @@ from .api import (
     entities,
     episodes,
     extract,
+    jobs,
+    mentions,
     provenance,
+    pull_requests,
     relationships,
     repositories,
     scenes,
     sentiment,
+    usage,
     versions,
 )
+from .core.config import settings
+from .services.job_queue import JobWorkerPool
+from .services.llm_client import close_llm_client, get_llm_client
+from .services.llm_scheduler import LLMUnavailableError
+from .services.llm_usage import LLMBudgetExceededError, set_usage_endpoint
+from .services.merge_service import shutdown_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared clients and workers on startup, release them on shutdown."""
+    get_llm_client()
+    workers = JobWorkerPool()
+    if settings.job_workers > 0:
+        workers.start()
+    yield
+    await workers.stop()
+    await close_llm_client()
+    shutdown_pool()
+
+
+async def llm_usage_endpoint(request: Request):
+    """Attribute LLM calls made while handling a request to its route."""
+    route = request.scope.get("route")
+    set_usage_endpoint(getattr(route, "path", request.url.path))
+
 
 app = FastAPI(
     title="World Operation API",
     description="API for entity extraction and scene generation",
     version="0.1.0",
+    lifespan=lifespan,
+    dependencies=[Depends(llm_usage_endpoint)],
 )
 
+
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailableError):
+    """Fail fast with 503 while the LLM circuit breaker is open."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
+@app.exception_handler(LLMBudgetExceededError)
+async def llm_budget_exceeded_handler(request: Request, exc: LLMBudgetExceededError):
+    """Reject LLM work for a repository over budget until the budget resets."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,13 +95,17 @@ app.include_router(scenes.router, prefix="/api", tags=["scenes"])
 app.include_router(entities.router, prefix="/api", tags=["entities"])
 app.include_router(relationships.router, prefix="/api", tags=["relationships"])
 app.include_router(provenance.router, prefix="/api", tags=["provenance"])
+app.include_router(mentions.router, prefix="/api", tags=["mentions"])
 app.include_router(repositories.router, prefix="/api", tags=["repositories"])
 app.include_router(branches.router, prefix="/api", tags=["branches"])
 app.include_router(commits.router, prefix="/api", tags=["commits"])
 app.include_router(versions.router, prefix="/api", tags=["versions"])
 app.include_router(diff.router, prefix="/api", tags=["diff"])
+app.include_router(pull_requests.router, prefix="/api", tags=["pull_requests"])
 app.include_router(episodes.router, prefix="/api", tags=["episodes"])
 app.include_router(sentiment.router, prefix="/api", tags=["sentiment"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(usage.router, prefix="/api", tags=["usage"])
 
 
 @app.get("/")
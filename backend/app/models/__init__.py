@@ -1,6 +1,10 @@
 """Database models."""
 
+from .content_chunk import ContentChunk
 from .entity import Entity
+from .job import Job
+from .llm_cache import LLMCacheEntry
+from .llm_usage import LLMBudget, LLMUsage
 from .provenance import EntityProvenance
 from .relationship import Relationship
 from .repository import (
@@ -11,6 +15,7 @@ from .repository import (
     Repository,
     SceneVersion,
 )
+from .semantic_diff import SemanticDiff
 from .story import StoryNode, Scene, SceneBranchLatest
 
 __all__ = [
@@ -26,4 +31,10 @@ __all__ = [
     "StoryNode",
     "Scene",
     "SceneBranchLatest",
+    "LLMCacheEntry",
+    "Job",
+    "SemanticDiff",
+    "LLMUsage",
+    "LLMBudget",
+    "ContentChunk",
 ]
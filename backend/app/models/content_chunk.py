@@ -0,0 +1,21 @@
+"""Content chunk model."""
+
+from sqlalchemy import Column, ForeignKey, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..core.db import Base
+
+
+class ContentChunk(Base):
+    """Compressed paragraph of scene content, shared within a repository."""
+
+    __tablename__ = "content_chunks"
+
+    # Leading on the hash so chunks can be read by hash alone
+    hash = Column(LargeBinary, primary_key=True)
+    repo_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("repositories.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed UTF-8
@@ -0,0 +1,34 @@
+"""Background job model."""
+
+import uuid
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from ..core.db import Base
+
+
+class Job(Base):
+    """Persistent background job, claimed and run by the worker pool."""
+
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String(50), nullable=False)  # e.g. 'sentiment'
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(
+        String(20), nullable=False, default="pending"
+    )  # pending, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    last_error = Column(Text)
+    result = Column(JSON)
+    run_after = Column(DateTime(timezone=True), server_default=func.now())
+    locked_until = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
@@ -0,0 +1,20 @@
+"""LLM response cache model."""
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.sql import func
+
+from ..core.db import Base
+
+
+class LLMCacheEntry(Base):
+    """Persistent tier of the content-addressed LLM response cache."""
+
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String(64), primary_key=True)  # sha256 of model/messages/schema
+    model = Column(String(100), nullable=False)
+    value = Column(Text, nullable=False)  # serialized JSON payload
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,54 @@
+"""LLM usage ledger and per-repository budget models."""
+
+import uuid
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from ..core.db import Base
+
+
+class LLMUsage(Base):
+    """One LLM API call, attributed to the repository and endpoint behind it."""
+
+    __tablename__ = "llm_usage"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    repo_id = Column(UUID(as_uuid=True))  # None for calls outside any repository
+    endpoint = Column(String(100))  # route path, or 'job:<kind>'
+    model = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_llm_usage_repo_id_created_at", "repo_id", "created_at"),
+    )
+
+
+class LLMBudget(Base):
+    """Monthly token budget for a repository."""
+
+    __tablename__ = "llm_budgets"
+
+    repo_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("repositories.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    monthly_token_limit = Column(BigInteger, nullable=False)
+    # Model used once the limit is reached; None means local fallbacks only
+    fallback_model = Column(String)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
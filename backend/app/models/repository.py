@@ -1,6 +1,15 @@
 import uuid
 
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -40,6 +49,13 @@ class Branch(Base):
         nullable=False,
     )
     name = Column(String, nullable=False)
+    # The branch this one was forked from; it inherits that branch's scenes
+    # as of created_at
+    forked_from_branch_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("branches.id", ondelete="SET NULL"),
+        nullable=True,
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -77,18 +93,52 @@ class SceneVersion(Base):
     parent_version_id = Column(
         UUID(as_uuid=True), ForeignKey("scene_versions.id"), nullable=True
     )
-    content_html = Column(Text, nullable=False)
+    # Keyframes hold their full content, or the hashes of its chunks in the
+    # content chunk store; other versions a delta against the parent version
+    keyframe_html = Column("content_html", Text, nullable=True)
+    chunk_hashes = Column(LargeBinary, nullable=True)
+    content_delta = Column(LargeBinary, nullable=True)
+    delta_depth = Column(Integer, nullable=False, default=0, server_default="0")
+    # Ancestry: distance from the root version, and a skip pointer to an
+    # ancestor chosen so any ancestor is reachable in O(log n) hops
+    generation = Column(Integer, nullable=False, default=0, server_default="0")
+    jump_version_id = Column(
+        UUID(as_uuid=True), ForeignKey("scene_versions.id"), nullable=True
+    )
+    # Second parent of a merge version: the source branch's head it merged
+    merge_parent_version_id = Column(
+        UUID(as_uuid=True), ForeignKey("scene_versions.id"), nullable=True
+    )
     meta = Column(JSON, default=dict)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     scene = relationship("Scene", back_populates="versions")
     branch = relationship("Branch", back_populates="scene_versions")
-    parent_version = relationship("SceneVersion", remote_side=[id])
+    parent_version = relationship(
+        "SceneVersion", remote_side=[id], foreign_keys=[parent_version_id]
+    )
     commit_items = relationship(
         "CommitItem", back_populates="scene_version", cascade="all, delete-orphan"
     )
 
+    @property
+    def content_html(self) -> str:
+        if self.keyframe_html is not None:
+            return self.keyframe_html
+        # Imported here as the version store depends on this module
+        from app.services.version_store import version_text
+
+        return version_text(self)
+
+    @content_html.setter
+    def content_html(self, value: str) -> None:
+        # Stored as a delta, if worthwhile, when the version is flushed
+        self.keyframe_html = value
+        self.chunk_hashes = None
+        self.content_delta = None
+        self.delta_depth = 0
+
 
 class Commit(Base):
     __tablename__ = "commits"
@@ -0,0 +1,28 @@
+"""Semantic diff cache model."""
+
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from ..core.db import Base
+
+
+class SemanticDiff(Base):
+    """LLM summary of the changes between two immutable scene versions."""
+
+    __tablename__ = "semantic_diffs"
+
+    left_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("scene_versions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    right_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("scene_versions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    model = Column(String(100), primary_key=True)
+    semantic_summary = Column(Text, nullable=False)
+    risks = Column(JSON, nullable=False, default=list)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
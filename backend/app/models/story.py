@@ -71,6 +71,7 @@ class SceneBranchLatest(Base):
         UUID(as_uuid=True),
         ForeignKey("branches.id", ondelete="CASCADE"),
         primary_key=True,
+        index=True,
     )
     version_id = Column(
         UUID(as_uuid=True),
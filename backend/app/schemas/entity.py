@@ -31,3 +31,28 @@ class Entity(EntityBase):
 
     class Config:
         from_attributes = True
+
+
+class DuplicateCluster(BaseModel):
+    """Entities whose names or aliases are similar enough to be duplicates."""
+
+    similarity: float  # lowest name similarity that joined the cluster
+    entities: list[Entity]
+
+
+class EntityMerge(BaseModel):
+    """Entity merge request schema."""
+
+    canonical_id: str
+    duplicate_ids: list[str]
+
+
+class EntityMergeResult(BaseModel):
+    """Entity merge response schema."""
+
+    entity: Entity
+    merged: int
+    relationships_repointed: int
+    relationships_removed: int
+    provenance_repointed: int
+    provenance_removed: int
@@ -0,0 +1,25 @@
+"""Background job schemas."""
+
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class Job(BaseModel):
+    """Job status response schema."""
+
+    id: UUID
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    last_error: str | None = None
+    result: dict[str, Any] | None = None
+    run_after: datetime | None = None
+    created_at: datetime
+    updated_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
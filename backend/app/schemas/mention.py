@@ -0,0 +1,21 @@
+"""Entity mention schemas."""
+
+from pydantic import BaseModel
+
+
+class Mention(BaseModel):
+    """A known-entity mention in scene text."""
+
+    entity_ids: list[str]  # more than one when a name is shared
+    start_idx: int
+    end_idx: int
+    text: str
+
+
+class SceneMentions(BaseModel):
+    """Mentions found in one scene version."""
+
+    scene_id: str
+    version_id: str
+    mentions: list[Mention]
+    provenance_written: int | None = None
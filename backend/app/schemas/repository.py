@@ -37,6 +37,7 @@ class BranchCreate(BranchBase):
 class Branch(BranchBase):
     id: UUID
     repo_id: UUID
+    forked_from_branch_id: UUID | None = None
     created_at: datetime
 
     class Config:
@@ -93,6 +94,8 @@ class SceneVersion(SceneVersionBase):
     scene_id: UUID
     branch_id: UUID
     parent_version_id: UUID | None = None
+    merge_parent_version_id: UUID | None = None
+    generation: int = 0
     created_at: datetime
 
     class Config:
@@ -143,6 +146,36 @@ class PullRequest(PullRequestBase):
         from_attributes = True
 
 
+class MergeConflict(BaseModel):
+    """Paragraphs changed differently on both branches."""
+
+    base: list[str]
+    target: list[str]
+    source: list[str]
+
+
+class SceneMerge(BaseModel):
+    scene_id: UUID
+    status: str  # 'added', 'fast_forward', 'merged' or 'conflict'
+    base_version_id: UUID | None = None
+    target_version_id: UUID | None = None
+    source_version_id: UUID
+    merged_version_id: UUID | None = None
+    conflicts: list[MergeConflict] = []
+
+
+class MergePreview(BaseModel):
+    pull_request_id: UUID
+    mergeable: bool
+    scenes: list[SceneMerge]
+
+
+class MergeResult(BaseModel):
+    pull_request: PullRequest
+    commit_id: UUID | None = None
+    scenes: list[SceneMerge]
+
+
 class DiffRequest(BaseModel):
     left_version_id: UUID
     right_version_id: UUID
@@ -151,4 +184,5 @@ class DiffRequest(BaseModel):
 class DiffResponse(BaseModel):
     raw_diff_html: str
     semantic_summary: str
+    risks: list[str] = []
     entity_changes: dict[str, list[str]]
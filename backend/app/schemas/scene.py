@@ -1,5 +1,7 @@
 """Scene schemas."""
 
+from uuid import UUID
+
 from pydantic import BaseModel
 
 
@@ -33,3 +35,5 @@ class SceneGenerateRequest(BaseModel):
     pov: str
     location: str
     keywords: str
+    candidates: int | None = None
+    repo_id: UUID | None = None  # for LLM usage attribution and budgets
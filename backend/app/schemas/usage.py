@@ -0,0 +1,43 @@
+"""LLM usage and budget schemas."""
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class UsageRow(BaseModel):
+    """Aggregated LLM usage for one group."""
+
+    key: str | None  # repository, endpoint, model or day, per group_by
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    avg_latency_ms: float
+    cost_usd: float | None = None  # None if any model in the group is unpriced
+
+
+class UsageReport(BaseModel):
+    """LLM usage report response schema."""
+
+    since: datetime
+    until: datetime
+    group_by: str
+    rows: list[UsageRow]
+
+
+class BudgetUpdate(BaseModel):
+    """Budget create/update request schema."""
+
+    monthly_token_limit: int
+    fallback_model: str | None = None
+
+
+class Budget(BaseModel):
+    """Budget response schema, with spend for the current month."""
+
+    repo_id: str
+    monthly_token_limit: int
+    fallback_model: str | None = None
+    spent_tokens: int
+    exceeded: bool
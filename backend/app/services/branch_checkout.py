@@ -0,0 +1,169 @@
+"""Whole-branch snapshots: every scene's content at head, a commit or a time."""
+
+import uuid
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import Select, and_, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.repository import Branch, Commit, CommitItem, SceneVersion
+from ..models.story import Scene, SceneBranchLatest, StoryNode
+from .version_store import load_version_texts
+
+
+def _fork_lineage(
+    db: Session, branch_id: uuid.UUID, until: datetime
+) -> list[tuple[uuid.UUID, datetime]]:
+    """A branch and the branches it was forked from, each with a cutoff.
+
+    A fork inherits its source's state at the moment it was created, so each
+    source is cut off at the earlier of ``until`` and that moment. Naive
+    times are taken as UTC.
+    """
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=UTC)
+    lineage = []
+    branch = db.get(Branch, branch_id)
+    while branch is not None:
+        lineage.append((branch.id, until))
+        if branch.forked_from_branch_id is None:
+            break
+        until = min(until, branch.created_at)
+        branch = db.get(Branch, branch.forked_from_branch_id)
+    return lineage
+
+
+def snapshot_versions(
+    db: Session,
+    branch_id: uuid.UUID,
+    commit: Commit | None = None,
+    at: datetime | None = None,
+) -> Select:
+    """Select ``(scene_id, version_id)`` for each scene in a branch snapshot.
+
+    At head this reads the branch's pointers. As of a commit it takes each
+    scene's version from the branch's latest commit up to that one that
+    includes the scene. As of a time it takes each scene's latest version
+    saved on the branch by then, or brought in from another branch by one of
+    its commits by then. Scenes a
+    forked branch inherited and hasn't changed come from the branch it was
+    forked from, as of the fork, and so on up the fork chain.
+    """
+    if commit is not None:
+        lineage = _fork_lineage(db, branch_id, commit.created_at)
+        return (
+            select(SceneVersion.scene_id, SceneVersion.id.label("version_id"))
+            .join(CommitItem, CommitItem.scene_version_id == SceneVersion.id)
+            .join(Commit, Commit.id == CommitItem.commit_id)
+            .where(
+                or_(
+                    *(
+                        and_(Commit.branch_id == b, Commit.created_at <= cutoff)
+                        for b, cutoff in lineage
+                    )
+                )
+            )
+            .distinct(SceneVersion.scene_id)
+            .order_by(
+                SceneVersion.scene_id,
+                Commit.created_at.desc(),
+                SceneVersion.created_at.desc(),
+            )
+        )
+
+    if at is not None:
+        lineage = _fork_lineage(db, branch_id, at)
+        saved = select(
+            SceneVersion.scene_id,
+            SceneVersion.id.label("version_id"),
+            SceneVersion.created_at.label("since"),
+        ).where(
+            or_(
+                *(
+                    and_(SceneVersion.branch_id == b, SceneVersion.created_at <= cutoff)
+                    for b, cutoff in lineage
+                )
+            )
+        )
+        # Versions from other branches, e.g. fast-forwarded by a merge, count
+        # from the commit that brought them in, not from when they were saved
+        shared = (
+            select(
+                SceneVersion.scene_id,
+                SceneVersion.id.label("version_id"),
+                Commit.created_at.label("since"),
+            )
+            .join(CommitItem, CommitItem.scene_version_id == SceneVersion.id)
+            .join(Commit, Commit.id == CommitItem.commit_id)
+            .where(
+                SceneVersion.branch_id != Commit.branch_id,
+                or_(
+                    *(
+                        and_(Commit.branch_id == b, Commit.created_at <= cutoff)
+                        for b, cutoff in lineage
+                    )
+                ),
+            )
+        )
+        candidates = union_all(saved, shared).subquery()
+        return (
+            select(candidates.c.scene_id, candidates.c.version_id)
+            .distinct(candidates.c.scene_id)
+            .order_by(candidates.c.scene_id, candidates.c.since.desc())
+        )
+
+    return select(SceneBranchLatest.scene_id, SceneBranchLatest.version_id).where(
+        SceneBranchLatest.branch_id == branch_id
+    )
+
+
+def iter_checkout(
+    db: Session,
+    repo_id: uuid.UUID,
+    branch_id: uuid.UUID,
+    commit: Commit | None = None,
+    at: datetime | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield every scene of a repository with its content in a branch snapshot.
+
+    Scenes come in story order with ``version_id`` and ``content_html`` of
+    ``None`` where the snapshot has no version. Rows are read through a
+    server-side cursor in batches of ``settings.checkout_batch_size``, and
+    each batch's content is reconstructed with one query.
+    """
+    snapshot = snapshot_versions(db, branch_id, commit, at).subquery()
+    rows = db.execute(
+        select(
+            Scene.id,
+            Scene.node_id,
+            Scene.title,
+            Scene.order_idx,
+            SceneVersion.id.label("version_id"),
+            SceneVersion.parent_version_id,
+            SceneVersion.created_at,
+        )
+        .join(StoryNode, StoryNode.id == Scene.node_id)
+        .outerjoin(snapshot, snapshot.c.scene_id == Scene.id)
+        .outerjoin(SceneVersion, SceneVersion.id == snapshot.c.version_id)
+        .where(StoryNode.repo_id == repo_id)
+        .order_by(StoryNode.order_idx, Scene.node_id, Scene.order_idx, Scene.id)
+        .execution_options(yield_per=settings.checkout_batch_size)
+    )
+    for batch in rows.partitions():
+        texts = load_version_texts(
+            db, [row.version_id for row in batch if row.version_id is not None]
+        )
+        for row in batch:
+            yield {
+                "scene_id": row.id,
+                "node_id": row.node_id,
+                "title": row.title,
+                "order_idx": row.order_idx,
+                "version_id": row.version_id,
+                "parent_version_id": row.parent_version_id,
+                "created_at": row.created_at,
+                "content_html": texts.get(row.version_id),
+            }
@@ -0,0 +1,115 @@
+"""Latest version of each scene on each branch, kept in SceneBranchLatest."""
+
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Query, Session
+
+from ..models.repository import SceneVersion
+from ..models.story import SceneBranchLatest
+
+
+def advance_branch_heads(db: Session, version_ids: Iterable[uuid.UUID]) -> None:
+    """Point each version's scene and branch at it, unless a newer one is there.
+
+    Runs in the caller's transaction, so the pointer commits with the
+    version or commit that moved it.
+    """
+    version_ids = list(version_ids)
+    if not version_ids:
+        return
+    db.flush()
+
+    # One row per scene and branch, as ON CONFLICT can't update a row twice
+    newest = (
+        select(SceneVersion.scene_id, SceneVersion.branch_id, SceneVersion.id)
+        .where(SceneVersion.id.in_(version_ids))
+        .distinct(SceneVersion.scene_id, SceneVersion.branch_id)
+        .order_by(
+            SceneVersion.scene_id,
+            SceneVersion.branch_id,
+            SceneVersion.created_at.desc(),
+        )
+    )
+    stmt = insert(SceneBranchLatest).from_select(
+        ["scene_id", "branch_id", "version_id"], newest
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["scene_id", "branch_id"],
+            set_={"version_id": stmt.excluded.version_id},
+            where=text(
+                "(SELECT created_at FROM scene_versions"
+                " WHERE id = scene_branch_latest.version_id)"
+                " <= (SELECT created_at FROM scene_versions"
+                " WHERE id = excluded.version_id)"
+            ),
+        )
+    )
+
+
+def fork_branch_heads(
+    db: Session, source_branch_id: uuid.UUID, branch_id: uuid.UUID
+) -> int:
+    """Copy a branch's head pointers to a new branch; return how many.
+
+    The new branch shares the source's versions until its scenes are saved,
+    so forking writes one row per scene and copies no content.
+    """
+    heads = select(
+        SceneBranchLatest.scene_id,
+        literal(branch_id, SceneBranchLatest.branch_id.type),
+        SceneBranchLatest.version_id,
+    ).where(SceneBranchLatest.branch_id == source_branch_id)
+    return db.execute(
+        insert(SceneBranchLatest).from_select(
+            ["scene_id", "branch_id", "version_id"], heads
+        )
+    ).rowcount
+
+
+def set_branch_heads(
+    db: Session, branch_id: uuid.UUID, heads: dict[uuid.UUID, uuid.UUID]
+) -> None:
+    """Point scenes on a branch at the given versions, from any branch."""
+    if not heads:
+        return
+    stmt = insert(SceneBranchLatest).values(
+        [
+            {"scene_id": scene_id, "branch_id": branch_id, "version_id": version_id}
+            for scene_id, version_id in heads.items()
+        ]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["scene_id", "branch_id"],
+            set_={"version_id": stmt.excluded.version_id},
+        )
+    )
+
+
+def branch_head_versions(
+    db: Session, branch_id: uuid.UUID | str, scene_ids: Iterable[str] | None = None
+) -> Query:
+    """Query the latest version of every scene, or of ``scene_ids``, on a branch."""
+    query = (
+        db.query(SceneVersion)
+        .join(SceneBranchLatest, SceneBranchLatest.version_id == SceneVersion.id)
+        .filter(SceneBranchLatest.branch_id == branch_id)
+    )
+    if scene_ids is not None:
+        query = query.filter(SceneBranchLatest.scene_id.in_(scene_ids))
+    return query
+
+
+def latest_version(
+    db: Session, scene_id: uuid.UUID | str, branch_id: uuid.UUID | str
+) -> SceneVersion | None:
+    """The latest version of a scene on a branch, by primary key lookup."""
+    return (
+        branch_head_versions(db, branch_id)
+        .filter(SceneBranchLatest.scene_id == scene_id)
+        .first()
+    )
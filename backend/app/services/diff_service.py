@@ -0,0 +1,165 @@
+"""Semantic diff service with a persistent per-version-pair cache."""
+
+from typing import Any
+
+from anyio import to_thread
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..models.llm_usage import LLMBudget
+from ..models.repository import Branch, SceneVersion
+from ..models.semantic_diff import SemanticDiff
+from .html_text import html_to_text
+from .job_queue import enqueue, register_handler
+from .llm_client import get_llm_client
+from .llm_scheduler import Priority
+from .llm_usage import set_usage_repo
+
+SEMANTIC_DIFF_JOB = "semantic_diff"
+
+SEMANTIC_DIFF_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "semantic_summary": {"type": "string"},
+        "risks": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["semantic_summary", "risks"],
+    "additionalProperties": False,
+}
+
+
+async def compute_semantic_diff(
+    left_html: str, right_html: str, priority: Priority = Priority.BACKGROUND
+) -> tuple[dict[str, Any], str]:
+    """Summarize the story changes between two versions using the LLM.
+
+    Returns the summary and the model that wrote it, which is the
+    repository's fallback model once its budget is spent. Precomputation
+    runs at background priority; callers serving a user pass
+    ``Priority.INTERACTIVE``.
+    """
+    semantic_prompt = f"""
+Compare these two scene versions and summarize the story changes in ≤120 words, then list 3 bullets of risks.
+
+Version A:
+{html_to_text(left_html)}
+
+Version B:
+{html_to_text(right_html)}
+
+Return JSON with fields: semantic_summary, risks[]
+"""
+
+    return await get_llm_client().respond_json_with_model(
+        [{"role": "user", "content": semantic_prompt}],
+        SEMANTIC_DIFF_SCHEMA,
+        priority=priority,
+    )
+
+
+def get_cached_semantic_diff(
+    db: Session, left_version_id: str, right_version_id: str
+) -> SemanticDiff | None:
+    """Return the stored summary for a version pair under the current model.
+
+    A summary written by the repository's fallback model is returned if
+    there is none from the current model.
+    """
+    cached = db.get(
+        SemanticDiff, (left_version_id, right_version_id, settings.openai_model)
+    )
+    if cached is not None:
+        return cached
+
+    fallback_model = db.scalar(
+        select(LLMBudget.fallback_model)
+        .join(Branch, Branch.repo_id == LLMBudget.repo_id)
+        .join(SceneVersion, SceneVersion.branch_id == Branch.id)
+        .where(SceneVersion.id == right_version_id)
+    )
+    if fallback_model is None:
+        return None
+    return db.get(SemanticDiff, (left_version_id, right_version_id, fallback_model))
+
+
+def store_semantic_diff(
+    db: Session,
+    left_version_id: str,
+    right_version_id: str,
+    result: dict[str, Any],
+    model: str,
+) -> None:
+    """Persist a summary; versions are immutable, so the first write wins."""
+    db.execute(
+        insert(SemanticDiff)
+        .values(
+            left_version_id=left_version_id,
+            right_version_id=right_version_id,
+            model=model,
+            semantic_summary=result["semantic_summary"],
+            risks=result["risks"],
+        )
+        .on_conflict_do_nothing()
+    )
+    db.commit()
+
+
+def enqueue_semantic_diffs(db: Session, versions: list[SceneVersion]) -> None:
+    """Queue summaries against the parent of each version being committed."""
+    if not settings.semantic_diff_precompute:
+        return
+
+    for version in versions:
+        if version.parent_version_id:
+            enqueue(
+                db,
+                SEMANTIC_DIFF_JOB,
+                {
+                    "left_version_id": str(version.parent_version_id),
+                    "right_version_id": str(version.id),
+                },
+            )
+
+
+def _load_uncached_pair(
+    left_version_id: str, right_version_id: str
+) -> tuple[str, str, str] | None:
+    with SessionLocal() as db:
+        if get_cached_semantic_diff(db, left_version_id, right_version_id):
+            return None
+
+        left = db.get(SceneVersion, left_version_id)
+        right = db.get(SceneVersion, right_version_id)
+        if left is None or right is None:
+            return None
+        return left.content_html, right.content_html, right.branch.repo_id
+
+
+def _store(
+    left_version_id: str, right_version_id: str, result: dict[str, Any], model: str
+):
+    with SessionLocal() as db:
+        store_semantic_diff(db, left_version_id, right_version_id, result, model)
+
+
+async def run_semantic_diff_job(payload: dict[str, Any]) -> dict[str, Any]:
+    """Precompute and store the summary for a version pair."""
+    left_id, right_id = payload["left_version_id"], payload["right_version_id"]
+
+    pair = await to_thread.run_sync(_load_uncached_pair, left_id, right_id)
+    if pair is None:
+        return {"skipped": "cached or versions not found"}
+
+    left_html, right_html, repo_id = pair
+    if left_html == right_html:
+        return {"skipped": "content unchanged"}
+    set_usage_repo(repo_id)
+    result, model = await compute_semantic_diff(left_html, right_html)
+    await to_thread.run_sync(_store, left_id, right_id, result, model)
+    return {"stored": True}
+
+
+register_handler(SEMANTIC_DIFF_JOB, run_semantic_diff_job)
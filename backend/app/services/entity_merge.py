@@ -0,0 +1,173 @@
+"""Merge duplicate entities into a canonical one with set-based statements."""
+
+from typing import Any
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from ..models.entity import Entity
+from ..models.provenance import EntityProvenance
+from ..models.relationship import Relationship
+from .entity_resolver import RESOLUTION_LOCK_KEY
+from .mention_index import mention_index, normalize_name
+from .similarity_index import similarity_index
+
+
+class EntityNotFoundError(Exception):
+    """Raised when an entity to merge does not exist."""
+
+    def __init__(self, entity_ids: list[str]):
+        super().__init__(f"Entities not found: {', '.join(entity_ids)}")
+        self.entity_ids = entity_ids
+
+
+def merged_aliases(canonical: Entity, duplicates: list[Entity]) -> list[str]:
+    """The canonical entity's aliases plus the duplicates' names and aliases.
+
+    Names equal to the canonical name, or to an alias already kept, after
+    normalization are dropped; order is otherwise preserved.
+    """
+    seen = {normalize_name(canonical.name)}
+    aliases = []
+    names = list(canonical.aliases or [])
+    for duplicate in duplicates:
+        names += [duplicate.name, *(duplicate.aliases or [])]
+    for name in names:
+        normalized = normalize_name(name or "")
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            aliases.append(name.strip())
+    return aliases
+
+
+def _delete_duplicate_relationships(db: Session, canonical_id: str) -> int:
+    """Delete repeated (source, target, type) triples touching the entity."""
+    kept = aliased(Relationship)
+    result = db.execute(
+        delete(Relationship).where(
+            or_(
+                Relationship.source_entity_id == canonical_id,
+                Relationship.target_entity_id == canonical_id,
+            ),
+            kept.source_entity_id == Relationship.source_entity_id,
+            kept.target_entity_id == Relationship.target_entity_id,
+            kept.relation_type == Relationship.relation_type,
+            kept.id < Relationship.id,
+        )
+    )
+    return result.rowcount
+
+
+def _delete_duplicate_provenance(db: Session, canonical_id: str) -> int:
+    """Delete repeated spans of the entity, keeping the most confident."""
+    kept = aliased(EntityProvenance)
+    result = db.execute(
+        delete(EntityProvenance).where(
+            EntityProvenance.entity_id == canonical_id,
+            kept.entity_id == canonical_id,
+            kept.scene_id == EntityProvenance.scene_id,
+            kept.start_idx == EntityProvenance.start_idx,
+            kept.end_idx == EntityProvenance.end_idx,
+            or_(
+                kept.confidence > EntityProvenance.confidence,
+                and_(
+                    kept.confidence == EntityProvenance.confidence,
+                    kept.id < EntityProvenance.id,
+                ),
+            ),
+        )
+    )
+    return result.rowcount
+
+
+def merge_entities(
+    db: Session, canonical_id: str, duplicate_ids: list[str]
+) -> dict[str, Any]:
+    """Fold ``duplicate_ids`` into ``canonical_id`` and delete them.
+
+    The canonical entity gains the duplicates' names and aliases as aliases,
+    and their description if it has none. Relationships and provenance are
+    repointed with one UPDATE per column; relationships that become
+    self-loops or repeat an existing triple, and provenance spans that
+    repeat one of the canonical entity's, are deleted. Everything happens in
+    one transaction, committed here, after which the in-process indexes are
+    updated.
+
+    Raises ``EntityNotFoundError`` if any entity does not exist.
+    """
+    duplicate_ids = sorted(set(duplicate_ids) - {canonical_id})
+
+    # Keep extraction from resolving names to entities being merged away
+    db.execute(select(func.pg_advisory_xact_lock(RESOLUTION_LOCK_KEY)))
+
+    entities = {
+        entity.id: entity
+        for entity in db.scalars(
+            select(Entity)
+            .where(Entity.id.in_([canonical_id, *duplicate_ids]))
+            .with_for_update()
+        )
+    }
+    missing = [i for i in [canonical_id, *duplicate_ids] if i not in entities]
+    if missing:
+        db.rollback()
+        raise EntityNotFoundError(missing)
+
+    canonical = entities[canonical_id]
+    duplicates = [entities[i] for i in duplicate_ids]
+    canonical.aliases = merged_aliases(canonical, duplicates)
+    if not canonical.description:
+        canonical.description = next(
+            (d.description for d in duplicates if d.description), None
+        )
+
+    relationships_repointed = 0
+    for column in (Relationship.source_entity_id, Relationship.target_entity_id):
+        relationships_repointed += db.execute(
+            update(Relationship)
+            .where(column.in_(duplicate_ids))
+            .values({column: canonical_id})
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    relationships_removed = db.execute(
+        delete(Relationship).where(
+            Relationship.source_entity_id == canonical_id,
+            Relationship.target_entity_id == canonical_id,
+        )
+    ).rowcount
+    relationships_removed += _delete_duplicate_relationships(db, canonical_id)
+
+    provenance_repointed = db.execute(
+        update(EntityProvenance)
+        .where(EntityProvenance.entity_id.in_(duplicate_ids))
+        .values(entity_id=canonical_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    provenance_removed = _delete_duplicate_provenance(db, canonical_id)
+
+    db.execute(
+        delete(Entity)
+        .where(Entity.id.in_(duplicate_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(canonical)
+
+    for entity_id in duplicate_ids:
+        mention_index.remove_entity(entity_id)
+        similarity_index.remove_entity(entity_id)
+    mention_index.upsert_entity(
+        canonical.id, canonical.type, canonical.name, canonical.aliases
+    )
+    similarity_index.upsert_entity(
+        canonical.id, canonical.type, canonical.name, canonical.aliases
+    )
+
+    return {
+        "entity": canonical,
+        "merged": len(duplicate_ids),
+        "relationships_repointed": relationships_repointed,
+        "relationships_removed": relationships_removed,
+        "provenance_repointed": provenance_repointed,
+        "provenance_removed": provenance_removed,
+    }
@@ -0,0 +1,261 @@
+"""Resolve extracted entities against the world and persist them in bulk."""
+
+import uuid
+from typing import Any
+
+from sqlalchemy import delete, event, exists, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.entity import Entity
+from ..models.provenance import EntityProvenance
+from ..models.relationship import Relationship
+from .extraction_service import CATEGORY_TYPES, ENTITY_CATEGORIES
+from .mention_index import mention_index, normalize_name
+from .similarity_index import similarity_index
+
+# Advisory lock key held while resolving and inserting entities
+RESOLUTION_LOCK_KEY = 7_020_001
+
+# Session.info key of entities created in the open transaction, which are
+# added to the in-memory indexes only once it commits
+_UNINDEXED_KEY = "unindexed_entities"
+
+
+def _sql_normalize_name(column):
+    """SQL equivalent of ``normalize_name``."""
+    return func.lower(func.regexp_replace(func.trim(column), r"\s+", " ", "g"))
+
+
+class EntityResolver:
+    """Matches extracted names to existing entities of the same type.
+
+    A name matches an entity whose normalized name or alias is equal to it.
+    Candidates for a whole extraction are fetched in a single query. Failing
+    that, it matches the one entity whose name or alias is at least
+    ``fuzzy_threshold`` similar in the similarity index, if any.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        fuzzy_threshold: float = settings.entity_fuzzy_match_threshold,
+    ):
+        self.db = db
+        self.fuzzy_threshold = fuzzy_threshold
+        # (type, normalized name or alias) -> entity id
+        self._by_name: dict[tuple[str, str], str] = {}
+        self._has_description: dict[str, bool] = {}
+
+    def load(self, names: set[str]) -> None:
+        """Fetch every entity whose name or an alias is in ``names``."""
+        if not names:
+            return
+
+        alias = func.unnest(Entity.aliases).table_valued("alias").render_derived()
+        rows = self.db.execute(
+            select(
+                Entity.id, Entity.type, Entity.name, Entity.aliases, Entity.description
+            )
+            .where(
+                or_(
+                    _sql_normalize_name(Entity.name).in_(names),
+                    exists(
+                        select(1)
+                        .select_from(alias)
+                        .where(_sql_normalize_name(alias.c.alias).in_(names))
+                    ),
+                )
+            )
+            .order_by(Entity.id)
+        ).all()
+
+        # Names take precedence over aliases, then the lowest id
+        for entity_id, type, name, _, description in rows:
+            self._by_name.setdefault((type, normalize_name(name)), str(entity_id))
+            self._has_description[str(entity_id)] = bool(description)
+        for entity_id, type, _, aliases, _ in rows:
+            for alias_name in aliases or []:
+                self._by_name.setdefault(
+                    (type, normalize_name(alias_name)), str(entity_id)
+                )
+
+    def resolve(self, type: str, name: str) -> str | None:
+        entity_id = self._by_name.get((type, normalize_name(name)))
+        if entity_id is None and self.fuzzy_threshold < 1:
+            similarity_index.ensure_loaded(self.db)
+            entity_id = similarity_index.best_match(type, name, self.fuzzy_threshold)
+        return entity_id
+
+    def add(self, entity_id: str, type: str, name: str) -> None:
+        self._by_name[(type, normalize_name(name))] = entity_id
+        self._has_description[entity_id] = True
+
+    def has_description(self, entity_id: str) -> bool:
+        return self._has_description.get(entity_id, True)
+
+    def mark_described(self, entity_id: str) -> None:
+        self._has_description[entity_id] = True
+
+
+def persist_extraction(
+    db: Session, scene_id: str, result: dict[str, list[dict[str, Any]]]
+) -> dict[str, int]:
+    """Upsert an extraction's entities, relationships and provenance.
+
+    Extracted entities are resolved to existing ones by type and normalized
+    name or alias, or created. Existing entities without a description get
+    the extracted one. Relationships are added unless the same triple
+    already exists, and the scene's provenance is replaced by the extracted
+    spans. Everything is written with bulk statements in the caller's
+    transaction, which the caller commits; the mention index learns about new
+    entities once it does. ``result`` is annotated in place with the resolved
+    ``entity_id``s.
+    """
+    # Serialize resolution so concurrent extractions can't both create the
+    # same new entity; the lock is released when the transaction ends
+    db.execute(select(func.pg_advisory_xact_lock(RESOLUTION_LOCK_KEY)))
+
+    extracted = [
+        (CATEGORY_TYPES[category], entity)
+        for category in ENTITY_CATEGORIES
+        for entity in result.get(category) or []
+        if (entity.get("name") or "").strip()
+    ]
+
+    # Ids from a stored result or another process's mention index can refer
+    # to entities merged away or deleted since; resolve those by name instead
+    relationships = result.get("relationships") or []
+    supplied = {e["entity_id"] for _, e in extracted if e.get("entity_id")} | {
+        r[key]
+        for r in relationships
+        for key in ("source_entity_id", "target_entity_id")
+        if r.get(key)
+    }
+    existing = (
+        set(db.scalars(select(Entity.id).where(Entity.id.in_(supplied))))
+        if supplied
+        else set()
+    )
+    for item in [*(entity for _, entity in extracted), *relationships]:
+        for key in ("entity_id", "source_entity_id", "target_entity_id"):
+            if item.get(key) and item[key] not in existing:
+                del item[key]
+
+    resolver = EntityResolver(db)
+    resolver.load(
+        {
+            normalize_name(entity["name"])
+            for _, entity in extracted
+            if not entity.get("entity_id")
+        }
+    )
+
+    new_entities: list[dict[str, Any]] = []
+    descriptions: list[dict[str, Any]] = []
+    matched = 0
+    for type, entity in extracted:
+        entity_id = entity.get("entity_id") or resolver.resolve(type, entity["name"])
+        if entity_id is None:
+            entity_id = str(uuid.uuid4())
+            new_entities.append(
+                {
+                    "id": entity_id,
+                    "type": type,
+                    "name": entity["name"].strip()[:255],
+                    "description": entity.get("description") or None,
+                    "aliases": [],
+                }
+            )
+            resolver.add(entity_id, type, entity["name"])
+        else:
+            matched += 1
+            if entity.get("description") and not resolver.has_description(entity_id):
+                descriptions.append(
+                    {"id": entity_id, "description": entity["description"]}
+                )
+                resolver.mark_described(entity_id)
+        entity["entity_id"] = entity_id
+
+    if new_entities:
+        db.execute(insert(Entity), new_entities)
+    if descriptions:
+        db.execute(update(Entity), descriptions)
+
+    # Relationship endpoints may be named with any entity of the extraction
+    ids_by_name = {
+        normalize_name(entity["name"]): entity["entity_id"] for _, entity in extracted
+    }
+    triples = set()
+    for relationship in relationships:
+        source_id = relationship.get("source_entity_id") or ids_by_name.get(
+            normalize_name(relationship.get("source") or "")
+        )
+        target_id = relationship.get("target_entity_id") or ids_by_name.get(
+            normalize_name(relationship.get("target") or "")
+        )
+        relation_type = (relationship.get("relation_type") or "").strip()[:100]
+        if source_id and target_id and source_id != target_id and relation_type:
+            triples.add((source_id, target_id, relation_type))
+
+    new_relationships = []
+    if triples:
+        existing = set(
+            db.execute(
+                select(
+                    Relationship.source_entity_id,
+                    Relationship.target_entity_id,
+                    Relationship.relation_type,
+                ).where(
+                    Relationship.source_entity_id.in_({s for s, _, _ in triples}),
+                    Relationship.target_entity_id.in_({t for _, t, _ in triples}),
+                )
+            ).all()
+        )
+        new_relationships = [
+            {
+                "source_entity_id": source_id,
+                "target_entity_id": target_id,
+                "relation_type": relation_type,
+            }
+            for source_id, target_id, relation_type in sorted(triples - existing)
+        ]
+        if new_relationships:
+            db.execute(insert(Relationship), new_relationships)
+
+    provenance = [
+        {
+            "entity_id": entity["entity_id"],
+            "scene_id": scene_id,
+            "start_idx": span["start_idx"],
+            "end_idx": span["end_idx"],
+            "confidence": entity.get("confidence") or 0.0,
+        }
+        for _, entity in extracted
+        for span in entity.get("spans") or []
+    ]
+    db.execute(delete(EntityProvenance).where(EntityProvenance.scene_id == scene_id))
+    if provenance:
+        db.execute(insert(EntityProvenance), provenance)
+
+    db.info.setdefault(_UNINDEXED_KEY, []).extend(new_entities)
+
+    return {
+        "entities_created": len(new_entities),
+        "entities_matched": matched,
+        "relationships_created": len(new_relationships),
+        "provenance_written": len(provenance),
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _index_new_entities(db: Session) -> None:
+    for row in db.info.pop(_UNINDEXED_KEY, []):
+        mention_index.upsert_entity(row["id"], row["type"], row["name"], [])
+        similarity_index.upsert_entity(row["id"], row["type"], row["name"], [])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_entities(db: Session) -> None:
+    # Their rows were never committed
+    db.info.pop(_UNINDEXED_KEY, None)
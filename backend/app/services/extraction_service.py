@@ -1,150 +1,469 @@
 """Entity extraction service."""
 
+import asyncio
+import logging
+import re
+from difflib import SequenceMatcher
 from typing import Any
 
-from .llm_client import LLMClient
+from anyio import to_thread
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from .llm_client import LLMClient, get_llm_client
+from .mention_index import MentionIndex, mention_index
+
+logger = logging.getLogger(__name__)
+
+ENTITY_CATEGORIES = ("characters", "places", "events", "objects")
+
+# Entity.type values for each result category
+CATEGORY_TYPES = {
+    "characters": "character",
+    "places": "place",
+    "events": "event",
+    "objects": "object",
+}
+
+# Where known entities of any other type are listed
+FALLBACK_CATEGORY = "objects"
+
+_SPAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "start_idx": {"type": "integer"},
+        "end_idx": {"type": "integer"},
+    },
+    "required": ["start_idx", "end_idx"],
+    "additionalProperties": False,
+}
+
+_ENTITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "description": {"type": "string"},
+        "spans": {"type": "array", "items": _SPAN_SCHEMA},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+    },
+    "required": ["name", "description", "spans", "confidence"],
+    "additionalProperties": False,
+}
+
+_RELATIONSHIP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "source": {"type": "string"},
+        "target": {"type": "string"},
+        "relation_type": {"type": "string"},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+    },
+    "required": ["source", "target", "relation_type", "confidence"],
+    "additionalProperties": False,
+}
+
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **{
+            category: {"type": "array", "items": _ENTITY_SCHEMA}
+            for category in ENTITY_CATEGORIES
+        },
+        "relationships": {"type": "array", "items": _RELATIONSHIP_SCHEMA},
+    },
+    "required": [*ENTITY_CATEGORIES, "relationships"],
+    "additionalProperties": False,
+}
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n+")
+
+
+def split_paragraphs(text: str) -> list[tuple[int, int]]:
+    """Return the ``(start, end)`` offsets of each non-empty paragraph."""
+    spans = []
+    start = 0
+    for match in _PARAGRAPH_BREAK_RE.finditer(text):
+        if text[start : match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def make_windows(
+    text: str, max_chars: int, overlap_paragraphs: int
+) -> list[tuple[int, int]]:
+    """Group paragraphs into windows of at most ``max_chars``.
+
+    Consecutive windows share ``overlap_paragraphs`` paragraphs so entities
+    that straddle a boundary are seen whole at least once. A paragraph longer
+    than ``max_chars`` gets a window of its own.
+    """
+    paragraphs = split_paragraphs(text)
+    windows: list[tuple[int, int]] = []
+    first = 0
+    while first < len(paragraphs):
+        last = first
+        while (
+            last + 1 < len(paragraphs)
+            and paragraphs[last + 1][1] - paragraphs[first][0] <= max_chars
+        ):
+            last += 1
+        windows.append((paragraphs[first][0], paragraphs[last][1]))
+        if last + 1 >= len(paragraphs):
+            break
+        # Step back for the overlap, but only as far as still leaves room for
+        # the next new paragraph so windows never repeat each other.
+        first = max(last + 1 - overlap_paragraphs, first + 1)
+        while (
+            first <= last and paragraphs[last + 1][1] - paragraphs[first][0] > max_chars
+        ):
+            first += 1
+    return windows
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def shift_spans(
+    result: dict[str, list[dict[str, Any]]], offset: int, length: int
+) -> dict[str, list[dict[str, Any]]]:
+    """Move spans from window-relative to document offsets.
+
+    Spans outside the ``length`` characters the window covered are dropped.
+    """
+    for category in ENTITY_CATEGORIES:
+        for entity in result.get(category) or []:
+            entity["spans"] = [
+                {
+                    "start_idx": span["start_idx"] + offset,
+                    "end_idx": span["end_idx"] + offset,
+                }
+                for span in entity.get("spans") or []
+                if isinstance(span.get("start_idx"), int)
+                and isinstance(span.get("end_idx"), int)
+                and 0 <= span["start_idx"] < span["end_idx"] <= length
+            ]
+    return result
+
+
+def merge_results(
+    results: list[dict[str, list[dict[str, Any]]]],
+) -> dict[str, list[dict[str, Any]]]:
+    """Merge per-window extractions into one response.
+
+    Entities are combined by category and normalized name: their spans are
+    unioned, the highest confidence and the longest description are kept.
+    Relationships are combined by normalized (source, target, type).
+    """
+    merged: dict[str, list[dict[str, Any]]] = {}
+    for category in ENTITY_CATEGORIES:
+        by_name: dict[str, dict[str, Any]] = {}
+        for result in results:
+            for entity in result.get(category) or []:
+                key = _normalize_name(entity.get("name") or "")
+                if not key:
+                    continue
+
+                existing = by_name.get(key)
+                if existing is None:
+                    by_name[key] = {**entity, "spans": list(entity.get("spans") or [])}
+                    continue
+
+                existing["spans"].extend(entity.get("spans") or [])
+                if entity.get("entity_id") and not existing.get("entity_id"):
+                    existing["entity_id"] = entity["entity_id"]
+                existing["confidence"] = max(
+                    existing.get("confidence") or 0, entity.get("confidence") or 0
+                )
+                if len(entity.get("description") or "") > len(
+                    existing.get("description") or ""
+                ):
+                    existing["description"] = entity["description"]
+
+        for entity in by_name.values():
+            unique_spans = {(s["start_idx"], s["end_idx"]) for s in entity["spans"]}
+            entity["spans"] = [
+                {"start_idx": start, "end_idx": end}
+                for start, end in sorted(unique_spans)
+            ]
+        merged[category] = list(by_name.values())
+
+    relationships: dict[tuple[str, str, str], dict[str, Any]] = {}
+    for result in results:
+        for relationship in result.get("relationships") or []:
+            key = (
+                _normalize_name(relationship.get("source") or ""),
+                _normalize_name(relationship.get("target") or ""),
+                _normalize_name(relationship.get("relation_type") or ""),
+            )
+            existing = relationships.get(key)
+            if existing is None or (relationship.get("confidence") or 0) > (
+                existing.get("confidence") or 0
+            ):
+                relationships[key] = relationship
+    merged["relationships"] = list(relationships.values())
+
+    return merged
+
+
+def project_result(
+    result: dict[str, list[dict[str, Any]]],
+    moves: list[tuple[int, int, int]],
+) -> dict[str, list[dict[str, Any]]]:
+    """Carry spans over from an old text to a new one.
+
+    ``moves`` lists ``(old_start, old_end, delta)`` ranges of the old text that
+    survive unchanged. Spans inside one of them are shifted by its delta;
+    other spans are dropped, as are entities left with no spans.
+    """
+    projected: dict[str, list[dict[str, Any]]] = {}
+    for category in ENTITY_CATEGORIES:
+        projected[category] = []
+        for entity in result.get(category) or []:
+            spans = [
+                {
+                    "start_idx": span["start_idx"] + delta,
+                    "end_idx": span["end_idx"] + delta,
+                }
+                for span in entity.get("spans") or []
+                for old_start, old_end, delta in moves
+                if old_start <= span["start_idx"] < span["end_idx"] <= old_end
+            ]
+            if spans:
+                projected[category].append({**entity, "spans": spans})
+
+    projected["relationships"] = list(result.get("relationships") or [])
+    return projected
+
+
+def _add_known_entities(
+    result: dict[str, list[dict[str, Any]]], refs: dict[str, dict[str, Any]]
+) -> dict[str, list[dict[str, Any]]]:
+    """Add gazetteer matches to an LLM result and resolve their references.
+
+    Known entities carry their ``entity_id`` and an empty ``description``,
+    and are listed under ``FALLBACK_CATEGORY`` if their type has no category
+    of its own; relationship endpoints given as a reference are replaced by
+    the entity's name plus ``source_entity_id``/``target_entity_id``.
+    """
+    # The model may describe a known entity anyway; the gazetteer's copy wins
+    known_names = {_normalize_name(entity["name"]) for entity in refs.values()}
+    for category in ENTITY_CATEGORIES:
+        result[category] = [
+            entity
+            for entity in result.get(category) or []
+            if _normalize_name(entity.get("name") or "") not in known_names
+        ]
+
+    types = {type: category for category, type in CATEGORY_TYPES.items()}
+    for entity in refs.values():
+        category = types.get((entity["type"] or "").lower(), FALLBACK_CATEGORY)
+        result.setdefault(category, []).append(
+            {
+                "entity_id": entity["entity_id"],
+                "name": entity["name"],
+                "description": "",
+                "spans": entity["spans"],
+                "confidence": entity["confidence"],
+            }
+        )
+
+    for relationship in result.get("relationships") or []:
+        for end in ("source", "target"):
+            entity = refs.get((relationship.get(end) or "").strip())
+            if entity is not None:
+                relationship[end] = entity["name"]
+                relationship[f"{end}_entity_id"] = entity["entity_id"]
+    return result
+
+
+def _load_gazetteer(gazetteer: MentionIndex) -> None:
+    with SessionLocal() as db:
+        gazetteer.ensure_loaded(db)
 
 
 class ExtractionService:
     """Service for extracting entities from text."""
 
-    def __init__(self):
-        self.llm_client = LLMClient()
-
-    def extract_entities(self, scene_text: str) -> dict[str, list[dict[str, Any]]]:
-        """Extract entities from scene text using OpenAI structured outputs."""
-
-        json_schema = {
-            "type": "object",
-            "properties": {
-                "characters": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "spans": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "start_idx": {"type": "integer"},
-                                        "end_idx": {"type": "integer"},
-                                    },
-                                },
-                            },
-                            "confidence": {
-                                "type": "number",
-                                "minimum": 0,
-                                "maximum": 1,
-                            },
-                        },
-                    },
-                },
-                "places": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "spans": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "start_idx": {"type": "integer"},
-                                        "end_idx": {"type": "integer"},
-                                    },
-                                },
-                            },
-                            "confidence": {
-                                "type": "number",
-                                "minimum": 0,
-                                "maximum": 1,
-                            },
-                        },
-                    },
-                },
-                "events": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "spans": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "start_idx": {"type": "integer"},
-                                        "end_idx": {"type": "integer"},
-                                    },
-                                },
-                            },
-                            "confidence": {
-                                "type": "number",
-                                "minimum": 0,
-                                "maximum": 1,
-                            },
-                        },
-                    },
-                },
-                "objects": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "spans": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "start_idx": {"type": "integer"},
-                                        "end_idx": {"type": "integer"},
-                                    },
-                                },
-                            },
-                            "confidence": {
-                                "type": "number",
-                                "minimum": 0,
-                                "maximum": 1,
-                            },
-                        },
-                    },
-                },
-                "relationships": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "source": {"type": "string"},
-                            "target": {"type": "string"},
-                            "relation_type": {"type": "string"},
-                            "confidence": {
-                                "type": "number",
-                                "minimum": 0,
-                                "maximum": 1,
-                            },
-                        },
-                    },
-                },
-            },
+    def __init__(
+        self,
+        llm_client: LLMClient | None = None,
+        gazetteer: MentionIndex | None = None,
+    ):
+        self.llm_client = llm_client or get_llm_client()
+        if gazetteer is None and settings.extraction_gazetteer:
+            gazetteer = mention_index
+        self.gazetteer = gazetteer
+
+    async def _prepare_gazetteer(self) -> None:
+        if self.gazetteer is None:
+            return
+        try:
+            await to_thread.run_sync(_load_gazetteer, self.gazetteer)
+        except SQLAlchemyError:
+            # Extraction still works without it, just less cheaply
+            logger.exception("Failed to load the entity gazetteer")
+
+    async def extract_entities(
+        self, scene_text: str
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Extract entities from scene text.
+
+        Text longer than one window is split into overlapping windows on
+        paragraph boundaries, which are extracted concurrently and merged
+        back with spans shifted to whole-document offsets.
+        """
+        await self._prepare_gazetteer()
+        semaphore = asyncio.Semaphore(settings.extraction_concurrency)
+        return await self._extract_text(scene_text, semaphore)
+
+    async def _extract_text(
+        self, scene_text: str, semaphore: asyncio.Semaphore
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Extract text window by window, each LLM call under ``semaphore``."""
+        if len(scene_text) <= settings.extraction_window_chars:
+            async with semaphore:
+                return await self._extract_window(scene_text)
+
+        windows = make_windows(
+            scene_text,
+            settings.extraction_window_chars,
+            settings.extraction_window_overlap,
+        )
+
+        async def extract(start: int, end: int) -> dict[str, list[dict[str, Any]]]:
+            async with semaphore:
+                result = await self._extract_window(scene_text[start:end])
+            return shift_spans(result, start, end - start)
+
+        results = await asyncio.gather(*(extract(s, e) for s, e in windows))
+        return merge_results(list(results))
+
+    async def extract_incremental(
+        self,
+        scene_text: str,
+        parent_text: str,
+        parent_result: dict[str, list[dict[str, Any]]],
+    ) -> tuple[dict[str, list[dict[str, Any]]], dict[str, int]]:
+        """Re-extract only the paragraphs that changed since the parent version.
+
+        Paragraphs are diffed against the parent text. Results for unchanged
+        paragraphs are reused with their spans shifted to the new offsets;
+        each run of changed or added paragraphs is extracted on its own.
+        Returns the merged result and paragraph counts for the run.
+        """
+        old_paragraphs = split_paragraphs(parent_text)
+        new_paragraphs = split_paragraphs(scene_text)
+        matcher = SequenceMatcher(
+            None,
+            [parent_text[start:end] for start, end in old_paragraphs],
+            [scene_text[start:end] for start, end in new_paragraphs],
+            autojunk=False,
+        )
+
+        moves: list[tuple[int, int, int]] = []
+        changed: list[tuple[int, int]] = []
+        reextracted = 0
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                for old, new in zip(
+                    old_paragraphs[i1:i2], new_paragraphs[j1:j2], strict=True
+                ):
+                    moves.append((old[0], old[1], new[0] - old[0]))
+            elif j2 > j1:
+                changed.append((new_paragraphs[j1][0], new_paragraphs[j2 - 1][1]))
+                reextracted += j2 - j1
+
+        # One gazetteer load and one concurrency limit for all changed runs
+        await self._prepare_gazetteer()
+        semaphore = asyncio.Semaphore(settings.extraction_concurrency)
+
+        async def extract(start: int, end: int) -> dict[str, list[dict[str, Any]]]:
+            result = await self._extract_text(scene_text[start:end], semaphore)
+            return shift_spans(result, start, end - start)
+
+        changed_results = await asyncio.gather(*(extract(s, e) for s, e in changed))
+        reused = project_result(parent_result, moves)
+
+        # Keep reused relationships only while both endpoints still appear
+        names = {
+            _normalize_name(entity.get("name") or "")
+            for result in (reused, *changed_results)
+            for category in ENTITY_CATEGORIES
+            for entity in result.get(category) or []
+        }
+        reused["relationships"] = [
+            relationship
+            for relationship in reused["relationships"]
+            if _normalize_name(relationship.get("source") or "") in names
+            and _normalize_name(relationship.get("target") or "") in names
+        ]
+
+        merged = merge_results([reused, *changed_results])
+
+        stats = {
+            "paragraphs": len(new_paragraphs),
+            "reused_paragraphs": len(moves),
+            "reextracted_paragraphs": reextracted,
         }
+        return merged, stats
+
+    async def _extract_window(self, scene_text: str) -> dict[str, list[dict[str, Any]]]:
+        """Extract entities from scene text using OpenAI structured outputs.
+
+        Entities already in the gazetteer are located locally and listed to
+        the model by short reference, so it only describes new ones.
+        """
+        known = self._known_entities(scene_text)
+        refs = {f"K{index}": entity for index, entity in enumerate(known, start=1)}
+
+        user_content = f"Extract entities from this scene text:\n\n{scene_text}"
+        if refs:
+            known_lines = "\n".join(
+                f"{ref}|{entity['type']}|{entity['name']}"
+                for ref, entity in refs.items()
+            )
+            user_content = (
+                f"Known entities (REF|type|name):\n{known_lines}\n\n{user_content}"
+            )
 
         messages = [
             {
                 "role": "system",
-                "content": "You are an expert at extracting entities from narrative text. Extract characters, places, events, objects, and relationships from the given scene text. For each entity, provide the name, description, character spans (start and end indices), and confidence score.",
-            },
-            {
-                "role": "user",
-                "content": f"Extract entities from this scene text:\n\n{scene_text}",
+                "content": "You are an expert at extracting entities from narrative text. Extract characters, places, events, objects, and relationships from the given scene text. For each entity, provide the name, description, character spans (start and end indices), and confidence score. If known entities are listed, they are already recorded: do not return them as characters, places, events or objects, only entities that are not listed. In relationships, refer to a known entity by its REF.",
             },
+            {"role": "user", "content": user_content},
         ]
 
-        return self.llm_client.respond_json(messages, json_schema)
+        result = await self.llm_client.respond_json(messages, EXTRACTION_SCHEMA)
+        return _add_known_entities(result, refs)
+
+    def _known_entities(self, scene_text: str) -> list[dict[str, Any]]:
+        """Find gazetteer entities mentioned in the text, with exact spans."""
+        if self.gazetteer is None:
+            return []
+
+        known: dict[str, dict[str, Any]] = {}
+        for mention in self.gazetteer.find(scene_text):
+            for entity_id in mention.entity_ids:
+                info = self.gazetteer.entity(entity_id)
+                if info is None:
+                    continue
+                entity = known.setdefault(
+                    entity_id,
+                    {
+                        "entity_id": entity_id,
+                        "type": info[0],
+                        "name": info[1],
+                        "spans": [],
+                        "confidence": 1.0 / len(mention.entity_ids),
+                    },
+                )
+                entity["spans"].append(
+                    {"start_idx": mention.start, "end_idx": mention.end}
+                )
+        return list(known.values())
@@ -1,35 +1,150 @@
 """Scene generation service."""
 
-from .llm_client import LLMClient
+import re
+from collections.abc import AsyncIterator
+
+from ..core.config import settings
+from .llm_client import LLMClient, get_llm_client
+
+VARIANT_COUNT = 3
+
+SYSTEM_PROMPT = """You are a creative writer. Generate engaging narrative scenes in present tense, 250-400 words each. Focus on vivid descriptions, character emotions, and immersive details."""
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def _shingles(words: list[str], size: int = 3) -> set[tuple[str, ...]]:
+    return {tuple(words[i : i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def lexical_diversity(words: list[str], window: int = 50) -> float:
+    """Moving-average type-token ratio, which is robust to text length."""
+    if not words:
+        return 0.0
+    if len(words) <= window:
+        return len(set(words)) / len(words)
+
+    ratios = [
+        len(set(words[i : i + window])) / window for i in range(len(words) - window + 1)
+    ]
+    return sum(ratios) / len(ratios)
+
+
+def rank_by_diversity(
+    texts: list[str], k: int, duplicate_threshold: float = 0.5
+) -> list[str]:
+    """Pick ``k`` candidates that are lexically rich and distinct from each other.
+
+    Candidates are chosen greedily by lexical diversity, penalised by their
+    word-trigram overlap with the candidates already picked. Near-duplicates
+    (overlap at or above ``duplicate_threshold``) are only used as a last
+    resort to fill the result up to ``k``.
+    """
+    candidates = []
+    for text in texts:
+        words = _words(text or "")
+        if words:
+            candidates.append((text, lexical_diversity(words), _shingles(words)))
+
+    selected: list[tuple[str, float, set]] = []
+    duplicates: list[tuple[str, float, set]] = []
+    while candidates and len(selected) < k:
+        best = max(
+            candidates,
+            key=lambda c: c[1]
+            - max((_similarity(c[2], s[2]) for s in selected), default=0.0),
+        )
+        candidates.remove(best)
+        if any(_similarity(best[2], s[2]) >= duplicate_threshold for s in selected):
+            duplicates.append(best)
+        else:
+            selected.append(best)
+
+    selected.extend(duplicates[: k - len(selected)])
+    return [text for text, _, _ in selected]
 
 
 class GenerationService:
     """Service for generating scene variants."""
 
-    def __init__(self):
-        self.llm_client = LLMClient()
+    def __init__(self, llm_client: LLMClient | None = None):
+        self.llm_client = llm_client or get_llm_client()
 
-    def generate_scenes(self, pov: str, location: str, keywords: str) -> list[str]:
-        """Generate 3 scene variants based on POV, location, and keywords."""
+    def _scene_parameters(self, pov: str, location: str, keywords: str) -> str:
+        return f"""- Point of View: {pov}
+- Location: {location}
+- Keywords: {keywords}"""
 
-        system_prompt = """You are a creative writer. Generate engaging narrative scenes in present tense, 250-400 words each. Focus on vivid descriptions, character emotions, and immersive details."""
+    def _scene_messages(
+        self, pov: str, location: str, keywords: str
+    ) -> list[dict[str, str]]:
+        """Build the chat messages asking for one scene, sampled per variant."""
 
-        user_prompt = f"""Generate 3 different scene variants with these parameters:
-- Point of View: {pov}
-- Location: {location}
-- Keywords: {keywords}
-
-Each scene should be 250-400 words, written in present tense, and focus on different aspects or moods while incorporating the given elements."""
-
-        # Generate 3 variants by calling the API 3 times
-        variants = []
-        for i in range(3):
-            variant_prompt = f"{user_prompt}\n\nGenerate variant {i+1}:"
-            variant_messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": variant_prompt},
-            ]
-            variant = self.llm_client.respond_text(variant_messages)
-            variants.append(variant)
-
-        return variants
+        user_prompt = f"""Write one scene with these parameters:
+{self._scene_parameters(pov, location, keywords)}
+
+The scene should be 250-400 words, written in present tense, and choose its own distinct angle or mood while incorporating the given elements."""
+
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    async def generate_scenes(
+        self,
+        pov: str,
+        location: str,
+        keywords: str,
+        candidates: int | None = None,
+    ) -> list[str]:
+        """Generate 3 scene variants based on POV, location, and keywords.
+
+        All candidates come from one completion with ``n`` choices, so the
+        prompt is sent and billed once. They are then deduplicated and ranked
+        locally by lexical diversity, and the top 3 are returned.
+        """
+
+        n = min(
+            max(candidates or settings.generation_candidates, VARIANT_COUNT),
+            settings.generation_max_candidates,
+        )
+        messages = self._scene_messages(pov, location, keywords)
+
+        # Bypass the response cache so that regenerating yields fresh variants
+        texts = await self.llm_client.respond_texts(messages, n=n, use_cache=False)
+        return rank_by_diversity(texts, VARIANT_COUNT)
+
+    async def stream_scenes(
+        self, pov: str, location: str, keywords: str
+    ) -> AsyncIterator[tuple[int, str | None]]:
+        """Stream tokens for all 3 scene variants as they arrive.
+
+        The variants are the choices of one streamed completion, prompted as
+        in ``generate_scenes`` but not ranked. Yields ``(variant_index, text)``
+        pairs in arrival order, interleaved across variants. A variant is
+        finished when it yields ``text=None``.
+        """
+        finished = set()
+        async for index, text in self.llm_client.stream_texts(
+            self._scene_messages(pov, location, keywords), n=VARIANT_COUNT
+        ):
+            if text is None:
+                if index in finished:
+                    continue
+                finished.add(index)
+            yield index, text
+
+        # A stream may end without marking every choice finished
+        for index in range(VARIANT_COUNT):
+            if index not in finished:
+                yield index, None
@@ -0,0 +1,17 @@
+"""Plain-text conversion for scene HTML."""
+
+import html
+import re
+
+_BLOCK_END_RE = re.compile(r"</(?:p|div|h[1-6]|li|blockquote)\s*>|<br\s*/?>", re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def html_to_text(content_html: str) -> str:
+    """Strip tags from scene HTML, keeping one line per block element.
+
+    Offsets into the returned text are what extraction spans and entity
+    provenance refer to.
+    """
+    text = _BLOCK_END_RE.sub("\n", content_html)
+    return html.unescape(_TAG_RE.sub("", text)).strip("\n")
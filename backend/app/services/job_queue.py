@@ -0,0 +1,212 @@
+"""Persistent background job queue and worker pool."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from anyio import to_thread
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..models.job import Job
+from .llm_usage import set_usage_endpoint, set_usage_repo
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[dict[str, Any] | None]]
+GiveUpHandler = Callable[[dict[str, Any], str], Awaitable[None]]
+
+
+@dataclass
+class _Registration:
+    handler: JobHandler
+    on_give_up: GiveUpHandler | None = None
+
+
+_handlers: dict[str, _Registration] = {}
+
+
+def register_handler(
+    kind: str, handler: JobHandler, on_give_up: GiveUpHandler | None = None
+) -> None:
+    """Register the coroutine that runs jobs of ``kind``.
+
+    ``on_give_up`` is awaited with the payload and last error once a job has
+    exhausted its attempts.
+    """
+    _handlers[kind] = _Registration(handler, on_give_up)
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict[str, Any],
+    max_attempts: int | None = None,
+) -> Job:
+    """Add a job to the caller's session.
+
+    The job becomes visible to workers when the caller commits, so it is
+    enqueued atomically with whatever else the transaction writes.
+    """
+    job = Job(
+        kind=kind,
+        payload=payload,
+        status="pending",
+        attempts=0,
+        max_attempts=max_attempts or settings.job_max_attempts,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def _claim_job() -> tuple[str, str, dict[str, Any], int, int] | None:
+    """Lock the next runnable job and mark it running."""
+    now = datetime.now(UTC)
+    with SessionLocal() as db:
+        job = db.execute(
+            select(Job)
+            .where(
+                or_(
+                    (Job.status == "pending") & (Job.run_after <= now),
+                    # Running jobs' locks are extended by a heartbeat, so only
+                    # those whose worker died become claimable again
+                    (Job.status == "running") & (Job.locked_until < now),
+                )
+            )
+            .order_by(Job.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if job is None:
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_until = now + timedelta(seconds=settings.job_lock_seconds)
+        db.commit()
+
+        return str(job.id), job.kind, job.payload, job.attempts, job.max_attempts
+
+
+def _extend_lock(job_id: str) -> None:
+    """Push back a running job's lock so it isn't claimed again meanwhile."""
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        if job is not None and job.status == "running":
+            job.locked_until = datetime.now(UTC) + timedelta(
+                seconds=settings.job_lock_seconds
+            )
+            db.commit()
+
+
+async def _heartbeat(job_id: str) -> None:
+    while True:
+        await asyncio.sleep(settings.job_lock_seconds / 3)
+        try:
+            await to_thread.run_sync(_extend_lock, job_id)
+        except Exception:
+            logger.exception("Failed to extend the lock of job %s", job_id)
+
+
+def _finish_job(job_id: str, result: dict[str, Any] | None) -> None:
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        job.status = "succeeded"
+        job.result = result
+        job.last_error = None
+        job.locked_until = None
+        db.commit()
+
+
+def _fail_job(job_id: str, error: str, give_up: bool, attempts: int) -> None:
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        job.last_error = error
+        job.locked_until = None
+        if give_up:
+            job.status = "failed"
+        else:
+            # Exponential backoff between attempts
+            delay = settings.job_retry_base_seconds * 2 ** (attempts - 1)
+            job.status = "pending"
+            job.run_after = datetime.now(UTC) + timedelta(seconds=delay)
+        db.commit()
+
+
+class JobWorkerPool:
+    """Pool of asyncio workers that poll the ``jobs`` table."""
+
+    def __init__(
+        self,
+        concurrency: int = settings.job_workers,
+        poll_interval: float = settings.job_poll_interval_seconds,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        self._tasks = [
+            asyncio.create_task(self._work()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs are retried after their lock expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                claimed = await to_thread.run_sync(_claim_job)
+            except Exception:
+                logger.exception("Failed to claim job")
+                claimed = None
+
+            if claimed is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            await self._run(*claimed)
+
+    async def _run(
+        self,
+        job_id: str,
+        kind: str,
+        payload: dict[str, Any],
+        attempts: int,
+        max_attempts: int,
+    ) -> None:
+        registration = _handlers.get(kind)
+        # Handlers attribute their LLM usage to a repository themselves
+        set_usage_endpoint(f"job:{kind}")
+        set_usage_repo(None)
+        try:
+            if registration is None:
+                raise LookupError(f"No handler registered for job kind '{kind}'")
+            # Keeps the job locked for as long as the handler runs
+            heartbeat = asyncio.create_task(_heartbeat(job_id))
+            try:
+                result = await registration.handler(payload)
+            finally:
+                heartbeat.cancel()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Job %s (%s) failed", job_id, kind, exc_info=True)
+            give_up = registration is None or attempts >= max_attempts
+            await to_thread.run_sync(_fail_job, job_id, str(exc), give_up, attempts)
+            if give_up and registration and registration.on_give_up:
+                await registration.on_give_up(payload, str(exc))
+            return
+
+        await to_thread.run_sync(_finish_job, job_id, result)
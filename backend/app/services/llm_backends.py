@@ -0,0 +1,367 @@
+"""Pluggable chat completion backends for the LLM client.
+
+A backend is any object exposing the subset of the ``AsyncOpenAI`` surface the
+client uses: ``chat.completions.create(...)`` and ``close()``. Besides the real
+OpenAI client there is a local stand-in that replays recorded responses or
+synthesizes schema-valid ones, with injected latency and errors, so the API
+can be load-tested with no network; and a wrapper that records real responses
+for later replay.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from ..core.config import settings
+from .llm_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "the a she he they it was had not her his into over under through "
+    "light dark door window river road city forest night morning voice hand "
+    "eyes silence storm letter stranger memory fire stone ship wind "
+    "walked turned waited whispered watched remembered opened fell ran "
+    "quiet cold bright old broken distant heavy sudden"
+).split()
+
+
+def request_key(
+    model: str,
+    messages: list[dict[str, str]],
+    response_format: dict[str, Any] | None = None,
+    n: int = 1,
+) -> str:
+    """Key a request the same way the response cache does."""
+    json_schema = (response_format or {}).get("json_schema", {}).get("schema")
+    return make_cache_key(model, messages, json_schema, {"n": n} if n > 1 else None)
+
+
+def synthesize_json(schema: dict[str, Any], rng: random.Random) -> Any:
+    """Generate a value that validates against a (strict-mode) JSON schema."""
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "const" in schema:
+        return schema["const"]
+    if "anyOf" in schema:
+        return synthesize_json(rng.choice(schema["anyOf"]), rng)
+
+    schema_type = schema.get("type", "string")
+    if isinstance(schema_type, list):
+        schema_type = rng.choice([t for t in schema_type if t != "null"] or ["null"])
+
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        return {
+            name: synthesize_json(properties[name], rng)
+            for name in schema.get("required", list(properties))
+        }
+    if schema_type == "array":
+        low = schema.get("minItems", 1)
+        high = max(low, min(schema.get("maxItems", 3), 3))
+        return [
+            synthesize_json(schema.get("items", {}), rng)
+            for _ in range(rng.randint(low, high))
+        ]
+    if schema_type in ("number", "integer"):
+        low = schema.get("minimum", 0 if schema_type == "integer" else -1)
+        high = schema.get("maximum", 100 if schema_type == "integer" else 1)
+        if schema_type == "integer":
+            return rng.randint(math.ceil(low), math.floor(high))
+        return round(rng.uniform(low, high), 4)
+    if schema_type == "boolean":
+        return rng.random() < 0.5
+    if schema_type == "null":
+        return None
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4))).title()
+
+
+def synthesize_text(rng: random.Random, words: int) -> str:
+    """Generate prose-shaped filler text of about ``words`` words."""
+    paragraphs, sentences, sentence = [], [], []
+    for _ in range(words):
+        sentence.append(rng.choice(_WORDS))
+        if len(sentence) >= rng.randint(6, 18):
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            sentence = []
+            if len(sentences) >= rng.randint(3, 6):
+                paragraphs.append(" ".join(sentences))
+                sentences = []
+    if sentence:
+        sentences.append(" ".join(sentence).capitalize() + ".")
+    if sentences:
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def _usage(messages: list[dict[str, str]], contents: list[str]) -> dict[str, int]:
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    completion_tokens = sum(len(content) for content in contents) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _completion(
+    model: str, messages: list[dict[str, str]], contents: list[str]
+) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": f"chatcmpl-fake-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": index,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+                for index, content in enumerate(contents)
+            ],
+            "usage": _usage(messages, contents),
+        }
+    )
+
+
+def _chunk(
+    model: str,
+    completion_id: str,
+    content: str | None,
+    usage: dict[str, int] | None = None,
+    index: int = 0,
+) -> ChatCompletionChunk:
+    choices = [
+        {
+            "index": index,
+            "delta": {"content": content},
+            "finish_reason": None if content is not None else "stop",
+        }
+    ]
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            # As with OpenAI, the usage chunk carries no choices
+            "choices": choices if usage is None else [],
+            "usage": usage,
+        }
+    )
+
+
+def load_recordings(path: str | None) -> dict[str, list[str]]:
+    """Load recorded responses, keyed by request key, from a JSONL file."""
+    if not path or not Path(path).exists():
+        return {}
+
+    recordings = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recordings[entry["key"]] = entry["contents"]
+    return recordings
+
+
+class FakeChatBackend:
+    """Local stand-in for the OpenAI chat completions API.
+
+    Recorded responses are replayed when a request matches one exactly;
+    anything else gets synthetic output, schema-valid JSON for structured
+    requests and filler prose otherwise, seeded by the request so repeated
+    requests get the same answer. Every call sleeps for a latency drawn from
+    the configured distribution and fails with a 429 or 500 at the configured
+    error rate, so the scheduler's retry and breaker paths are exercised too.
+    """
+
+    def __init__(
+        self,
+        recordings: dict[str, list[str]] | None = None,
+        latency: str = settings.llm_fake_latency,
+        latency_ms: float = settings.llm_fake_latency_ms,
+        latency_spread: float = settings.llm_fake_latency_spread,
+        stream_interval_ms: float = settings.llm_fake_stream_interval_ms,
+        error_rate: float = settings.llm_fake_error_rate,
+        text_words: int = settings.llm_fake_text_words,
+        seed: int | None = settings.llm_fake_seed,
+    ):
+        self.recordings = recordings or {}
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_spread = latency_spread
+        self.stream_interval_ms = stream_interval_ms
+        self.error_rate = error_rate
+        self.text_words = text_words
+        self.rng = random.Random(seed)
+        self.chat = SimpleNamespace(completions=self)
+
+    def _delay(self) -> float:
+        if self.latency == "none":
+            return 0.0
+        if self.latency == "fixed":
+            return self.latency_ms / 1000
+        if self.latency == "uniform":
+            spread = self.latency_ms * self.latency_spread
+            return max(0.0, self.rng.uniform(-spread, spread) + self.latency_ms) / 1000
+        # lognormal: latency_ms is the median, latency_spread the sigma
+        return (
+            self.rng.lognormvariate(math.log(self.latency_ms), self.latency_spread)
+            / 1000
+        )
+
+    def _maybe_fail(self) -> None:
+        if self.rng.random() >= self.error_rate:
+            return
+
+        status_code, error = self.rng.choice(
+            [(429, openai.RateLimitError), (500, openai.InternalServerError)]
+        )
+        response = httpx.Response(
+            status_code,
+            request=httpx.Request("POST", "http://fake-llm/v1/chat/completions"),
+        )
+        raise error(f"Injected {status_code} error", response=response, body=None)
+
+    def _contents(
+        self,
+        key: str,
+        messages: list[dict[str, str]],
+        response_format: dict[str, Any] | None,
+        n: int,
+    ) -> list[str]:
+        if key in self.recordings:
+            return self.recordings[key]
+
+        rng = random.Random(key)
+        json_schema = (response_format or {}).get("json_schema", {}).get("schema")
+        if json_schema is not None:
+            return [json.dumps(synthesize_json(json_schema, rng)) for _ in range(n)]
+        return [synthesize_text(rng, self.text_words) for _ in range(n)]
+
+    async def create(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        response_format: dict[str, Any] | None = None,
+        n: int = 1,
+        stream: bool = False,
+        stream_options: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ):
+        await asyncio.sleep(self._delay())
+        self._maybe_fail()
+
+        key = request_key(model, messages, response_format, n)
+        contents = self._contents(key, messages, response_format, n)
+        if stream:
+            include_usage = bool((stream_options or {}).get("include_usage"))
+            return self._stream(model, messages, contents, include_usage)
+        return _completion(model, messages, contents)
+
+    async def _stream(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        contents: list[str],
+        include_usage: bool,
+    ) -> AsyncIterator:
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex}"
+        # Split after each space so the pieces join back into the full text;
+        # choices are interleaved, as OpenAI streams them
+        pieces = [re.split(r"(?<= )", content) for content in contents]
+        for step in range(max(len(p) for p in pieces)):
+            if step:
+                await asyncio.sleep(self.stream_interval_ms / 1000)
+            for index, choice_pieces in enumerate(pieces):
+                if step < len(choice_pieces):
+                    yield _chunk(model, completion_id, choice_pieces[step], index=index)
+        for index in range(len(contents)):
+            yield _chunk(model, completion_id, None, index=index)
+        if include_usage:
+            yield _chunk(model, completion_id, None, usage=_usage(messages, contents))
+
+    async def close(self) -> None:
+        pass
+
+
+class RecordingBackend:
+    """Wraps a backend and appends every response to a JSONL file for replay."""
+
+    def __init__(self, backend, path: str):
+        self.backend = backend
+        self.path = path
+        self.chat = SimpleNamespace(completions=self)
+        self._lock = threading.Lock()
+
+    def _record(self, key: str, contents: list[str]) -> None:
+        line = json.dumps({"key": key, "contents": contents}, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def create(self, **kwargs: Any):
+        key = request_key(
+            kwargs["model"],
+            kwargs["messages"],
+            kwargs.get("response_format"),
+            kwargs.get("n", 1),
+        )
+        response = await self.backend.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._recorded_stream(key, response)
+
+        self._record(key, [choice.message.content for choice in response.choices])
+        return response
+
+    async def _recorded_stream(self, key: str, stream) -> AsyncIterator:
+        pieces: dict[int, list[str]] = {}
+        async for chunk in stream:
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    pieces.setdefault(choice.index, []).append(choice.delta.content)
+            yield chunk
+        self._record(key, ["".join(pieces[index]) for index in sorted(pieces)])
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_backend():
+    """Build the chat backend selected by ``settings.llm_backend``."""
+    if settings.llm_backend == "fake":
+        recordings = load_recordings(settings.llm_recordings_path)
+        logger.info("Using fake LLM backend with %d recordings", len(recordings))
+        return FakeChatBackend(recordings)
+
+    backend = AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        max_retries=0,  # retries are handled by the scheduler
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_connections,
+            ),
+            timeout=settings.llm_timeout_seconds,
+        ),
+    )
+    if settings.llm_recordings_path:
+        return RecordingBackend(backend, settings.llm_recordings_path)
+    return backend
@@ -0,0 +1,213 @@
+"""Content-addressed cache for LLM responses."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from anyio import to_thread
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..models.llm_cache import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model: str,
+    messages: list[dict[str, str]],
+    json_schema: dict[str, Any] | None = None,
+    options: dict[str, Any] | None = None,
+) -> str:
+    """Hash the model, messages, schema and request options into a cache key."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "schema": json_schema,
+            "options": options or {},
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier LLM response cache with in-flight request coalescing.
+
+    The memory tier is an LRU bounded by entry count and total bytes. The
+    persistent tier lives in the ``llm_cache_entries`` table so that cached
+    responses survive restarts; it is pruned by TTL and total size. Values are
+    stored serialized, so every hit hands the caller a fresh object.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.llm_cache_ttl_seconds,
+        max_entries: int = settings.llm_cache_memory_entries,
+        max_bytes: int = settings.llm_cache_memory_bytes,
+        persistent: bool = settings.llm_cache_persistent,
+        persistent_max_bytes: int = settings.llm_cache_persistent_max_bytes,
+        prune_every: int = settings.llm_cache_prune_every,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persistent = persistent
+        self.persistent_max_bytes = persistent_max_bytes
+        self.prune_every = prune_every
+
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._writes_since_prune = 0
+
+    async def get(self, key: str) -> Any:
+        """Return the cached value for ``key``, or None without calling out."""
+        cached = self._memory_get(key)
+        if cached is None and self.persistent:
+            cached = await to_thread.run_sync(self._persistent_get, key)
+            if cached is not None:
+                self._memory_put(key, cached)
+        return json.loads(cached) if cached is not None else None
+
+    async def get_or_call(
+        self, key: str, model: str, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached value for ``key`` or compute it with ``call``.
+
+        Concurrent callers with the same key share a single upstream call. The
+        call runs in its own task so that one caller being cancelled does not
+        cancel it for everyone else waiting on it.
+        """
+        cached = self._memory_get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, model, call))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return json.loads(await asyncio.shield(task))
+
+    async def _fill(
+        self, key: str, model: str, call: Callable[[], Awaitable[Any]]
+    ) -> str:
+        if self.persistent:
+            stored = await to_thread.run_sync(self._persistent_get, key)
+            if stored is not None:
+                self._memory_put(key, stored)
+                return stored
+
+        payload = json.dumps(await call(), ensure_ascii=False)
+        self._memory_put(key, payload)
+
+        if self.persistent:
+            await to_thread.run_sync(self._persistent_put, key, model, payload)
+
+        return payload
+
+    def _memory_get(self, key: str) -> str | None:
+        item = self._memory.get(key)
+        if item is None:
+            return None
+
+        expires_at, payload = item
+        if expires_at <= time.monotonic():
+            self._memory_evict(key)
+            return None
+
+        self._memory.move_to_end(key)
+        return payload
+
+    def _memory_put(self, key: str, payload: str) -> None:
+        if key in self._memory:
+            self._memory_evict(key)
+
+        self._memory[key] = (time.monotonic() + self.ttl_seconds, payload)
+        self._memory_bytes += len(payload)
+
+        while self._memory and (
+            len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes
+        ):
+            self._memory_evict(next(iter(self._memory)))
+
+    def _memory_evict(self, key: str) -> None:
+        _, payload = self._memory.pop(key)
+        self._memory_bytes -= len(payload)
+
+    def _persistent_get(self, key: str) -> str | None:
+        try:
+            with SessionLocal() as db:
+                now = datetime.now(UTC)
+                entry = db.execute(
+                    select(LLMCacheEntry).where(
+                        LLMCacheEntry.key == key, LLMCacheEntry.expires_at > now
+                    )
+                ).scalar_one_or_none()
+                if entry is None:
+                    return None
+
+                entry.last_accessed_at = now
+                db.commit()
+                return entry.value
+        except SQLAlchemyError:
+            logger.warning("LLM cache lookup failed", exc_info=True)
+            return None
+
+    def _persistent_put(self, key: str, model: str, payload: str) -> None:
+        now = datetime.now(UTC)
+        try:
+            with SessionLocal() as db:
+                db.merge(
+                    LLMCacheEntry(
+                        key=key,
+                        model=model,
+                        value=payload,
+                        size_bytes=len(payload.encode("utf-8")),
+                        created_at=now,
+                        last_accessed_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl_seconds),
+                    )
+                )
+                db.commit()
+
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self.prune_every:
+                    self._writes_since_prune = 0
+                    self._prune(db)
+        except SQLAlchemyError:
+            logger.warning("LLM cache write failed", exc_info=True)
+
+    def _prune(self, db) -> None:
+        """Drop expired rows, then least recently used rows over the size cap."""
+        db.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= datetime.now(UTC))
+        )
+        db.execute(
+            text("""
+                DELETE FROM llm_cache_entries WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size_bytes) OVER (
+                            ORDER BY last_accessed_at DESC, key
+                        ) AS running_bytes
+                        FROM llm_cache_entries
+                    ) ranked
+                    WHERE running_bytes > :max_bytes
+                )
+                """),
+            {"max_bytes": self.persistent_max_bytes},
+        )
+        db.commit()
@@ -1,26 +1,225 @@
 """OpenAI LLM client with Responses API support."""
 
 import json
+import time
+from collections.abc import AsyncIterator
 from typing import Any
 
-from openai import OpenAI
-
 from ..core.config import settings
+from .llm_backends import create_backend
+from .llm_cache import LLMCache, make_cache_key
+from .llm_scheduler import LLMScheduler, Priority, estimate_tokens
+from .llm_usage import BudgetGuard, UsageLedger, current_usage_repo
 
 
 class LLMClient:
-    """OpenAI client with structured outputs support."""
+    """Async OpenAI client with structured outputs support.
+
+    One instance is shared for the lifetime of the app so that the underlying
+    HTTP connection pool is reused across requests. The chat backend is
+    selected by ``settings.llm_backend`` (see ``llm_backends``). When a cache
+    is attached, identical requests are answered from it instead of calling
+    the API, even over budget. Calls that do reach the API are admitted,
+    retried and prioritised by the scheduler, recorded in the usage ledger,
+    and routed to the model the repository's budget allows.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        cache: LLMCache | None = None,
+        scheduler: LLMScheduler | None = None,
+        ledger: UsageLedger | None = None,
+        budgets: BudgetGuard | None = None,
+    ):
+        self.cache = cache
+        self.ledger = ledger
+        self.budgets = budgets
+        self.scheduler = scheduler or LLMScheduler()
+        self.client = client or create_backend()
+
+    async def _model(self) -> str:
+        if self.budgets is None:
+            return settings.openai_model
+        return await self.budgets.model_for(current_usage_repo())
+
+    async def _cached(
+        self, messages, json_schema, call, use_cache: bool, options=None
+    ) -> tuple[Any, str]:
+        """Run ``call(model)`` unless the cache has the answer; return both.
 
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        The cache is checked under the default model before the budget, so
+        a cached answer is served even once the budget is spent; only a
+        real upstream call is routed by the budget.
+        """
+        if self.cache is None or not use_cache:
+            model = await self._model()
+            return await call(model), model
 
-    def respond_json(
-        self, messages: list[dict[str, str]], json_schema: dict[str, Any]
+        model = settings.openai_model
+        key = make_cache_key(model, messages, json_schema, options)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached, model
+
+        budget_model = await self._model()
+        if budget_model != model:
+            model = budget_model
+            key = make_cache_key(model, messages, json_schema, options)
+        return await self.cache.get_or_call(key, model, lambda: call(model)), model
+
+    async def respond_json(
+        self,
+        messages: list[dict[str, str]],
+        json_schema: dict[str, Any],
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
     ) -> dict[str, Any]:
         """Get structured JSON response using OpenAI's structured outputs."""
-        response = self.client.chat.completions.create(
-            model=settings.openai_model,
-            messages=messages,
+        result, _ = await self.respond_json_with_model(
+            messages, json_schema, use_cache, priority
+        )
+        return result
+
+    async def respond_json_with_model(
+        self,
+        messages: list[dict[str, str]],
+        json_schema: dict[str, Any],
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> tuple[dict[str, Any], str]:
+        """Like ``respond_json``, also returning the model that answered."""
+        return await self._cached(
+            messages,
+            json_schema,
+            lambda model: self._respond_json(model, messages, json_schema, priority),
+            use_cache,
+        )
+
+    async def respond_text(
+        self,
+        messages: list[dict[str, str]],
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> str:
+        """Get text response from OpenAI."""
+        result, _ = await self._cached(
+            messages,
+            None,
+            lambda model: self._respond_text(model, messages, priority),
+            use_cache,
+        )
+        return result
+
+    async def respond_texts(
+        self,
+        messages: list[dict[str, str]],
+        n: int,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> list[str]:
+        """Get ``n`` alternative text responses from a single OpenAI call."""
+        result, _ = await self._cached(
+            messages,
+            None,
+            lambda model: self._respond_texts(model, messages, n, priority),
+            use_cache,
+            options={"n": n},
+        )
+        return result
+
+    async def stream_text(
+        self,
+        messages: list[dict[str, str]],
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncIterator[str]:
+        """Stream a text response from OpenAI as it is generated.
+
+        Only opening the stream is scheduled and retried; a stream that fails
+        midway raises to the caller.
+        """
+        async for _, text in self.stream_texts(messages, 1, priority):
+            if text is not None:
+                yield text
+
+    async def stream_texts(
+        self,
+        messages: list[dict[str, str]],
+        n: int,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncIterator[tuple[int, str | None]]:
+        """Stream ``n`` alternative responses from a single OpenAI call.
+
+        Yields ``(choice_index, text)`` pairs in arrival order, and
+        ``(choice_index, None)`` once a choice is finished. Scheduling and
+        retries are as for ``stream_text``.
+        """
+        model = await self._model()
+        started = time.perf_counter()
+        stream = await self._create(
+            model,
+            messages,
+            priority,
+            completions=n,
+            n=n,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+        async for chunk in stream:
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    yield choice.index, choice.delta.content
+                if choice.finish_reason is not None:
+                    yield choice.index, None
+            if chunk.usage is not None:
+                self._record(model, chunk.usage, started)
+
+    async def _create(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        priority: Priority,
+        completions: int = 1,
+        **kwargs: Any,
+    ):
+        started = time.perf_counter()
+        response = await self.scheduler.run(
+            lambda: self.client.chat.completions.create(
+                model=model, messages=messages, **kwargs
+            ),
+            priority,
+            estimate_tokens(messages, completions),
+        )
+        if not kwargs.get("stream"):
+            self._record(model, response.usage, started)
+        return response
+
+    def _record(self, model: str, usage, started: float) -> None:
+        if usage is None:
+            return
+
+        if self.ledger is not None:
+            self.ledger.record(
+                model,
+                usage.prompt_tokens,
+                usage.completion_tokens,
+                int((time.perf_counter() - started) * 1000),
+            )
+        if self.budgets is not None:
+            self.budgets.add(current_usage_repo(), usage.total_tokens)
+
+    async def _respond_json(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        json_schema: dict[str, Any],
+        priority: Priority,
+    ) -> dict[str, Any]:
+        response = await self._create(
+            model,
+            messages,
+            priority,
             response_format={
                 "type": "json_schema",
                 "json_schema": {
@@ -34,10 +233,45 @@ class LLMClient:
         content = response.choices[0].message.content
         return json.loads(content)
 
-    def respond_text(self, messages: list[dict[str, str]]) -> str:
-        """Get text response from OpenAI."""
-        response = self.client.chat.completions.create(
-            model=settings.openai_model, messages=messages
-        )
+    async def _respond_text(
+        self, model: str, messages: list[dict[str, str]], priority: Priority
+    ) -> str:
+        response = await self._create(model, messages, priority)
 
         return response.choices[0].message.content
+
+    async def _respond_texts(
+        self, model: str, messages: list[dict[str, str]], n: int, priority: Priority
+    ) -> list[str]:
+        response = await self._create(model, messages, priority, completions=n, n=n)
+
+        return [choice.message.content for choice in response.choices]
+
+    async def aclose(self) -> None:
+        """Flush the usage ledger and close the backend's connection pool."""
+        if self.ledger is not None:
+            await self.ledger.aclose()
+        await self.client.close()
+
+
+_llm_client: LLMClient | None = None
+
+
+def get_llm_client() -> LLMClient:
+    """Get the shared LLM client, creating it on first use."""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient(
+            cache=LLMCache() if settings.llm_cache_enabled else None,
+            ledger=UsageLedger() if settings.llm_usage_enabled else None,
+            budgets=BudgetGuard() if settings.llm_usage_enabled else None,
+        )
+    return _llm_client
+
+
+async def close_llm_client() -> None:
+    """Close the shared LLM client, if one was created."""
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
@@ -0,0 +1,229 @@
+"""Rate-limit-aware scheduler for LLM calls."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from enum import IntEnum
+from typing import TypeVar
+
+import openai
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Scheduling priority; lower values are served first."""
+
+    INTERACTIVE = 0  # a user is waiting on the response
+    BACKGROUND = 1  # jobs, precomputation
+
+
+class LLMUnavailableError(Exception):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("LLM provider is temporarily unavailable")
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Whether a failed call is worth retrying: 429s, 5xx and network errors."""
+    if isinstance(exc, openai.APIConnectionError):
+        return True
+    status_code = getattr(exc, "status_code", None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+def _retry_after(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate_per_minute``."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be consumed (0 if it can be now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """Take ``amount`` from the bucket; negative amounts refund."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class CircuitBreaker:
+    """Fails fast after repeated provider failures.
+
+    After ``failure_threshold`` consecutive retryable failures the breaker
+    opens and rejects calls for ``reset_seconds``. It then lets a single trial
+    call through; success closes it, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+
+    def before_call(self) -> bool:
+        """Admit a call or raise; return whether it is the trial call."""
+        if self.opened_at is None:
+            return False
+
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if remaining > 0 or self.trial_in_flight:
+            raise LLMUnavailableError(retry_after=max(remaining, 1.0))
+        self.trial_in_flight = True
+        return True
+
+    def release_trial(self) -> None:
+        """Let another call make the trial when this one ends without a result."""
+        self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning("LLM circuit breaker opened")
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+class LLMScheduler:
+    """Admits LLM calls under request and token rate limits, by priority.
+
+    Waiting calls are served strictly in priority order, then FIFO. Failed
+    calls that are retryable are retried with exponential backoff and jitter
+    (honouring ``Retry-After``), and feed the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = settings.llm_requests_per_minute,
+        tokens_per_minute: int = settings.llm_tokens_per_minute,
+        max_retries: int = settings.llm_max_retries,
+        backoff_base: float = settings.llm_backoff_base_seconds,
+        backoff_max: float = settings.llm_backoff_max_seconds,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(
+            settings.llm_breaker_failure_threshold, settings.llm_breaker_reset_seconds
+        )
+
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = asyncio.Condition()
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.INTERACTIVE,
+        estimated_tokens: int = 0,
+    ) -> T:
+        """Run ``call`` once admitted, retrying retryable failures."""
+        for attempt in range(self.max_retries + 1):
+            is_trial = self.breaker.before_call()
+            try:
+                await self._acquire(priority, estimated_tokens)
+                result = await call()
+            except Exception as exc:
+                if not is_retryable(exc):
+                    # The provider answered; a bad request is not an outage
+                    self.breaker.record_success()
+                    raise
+
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+
+                delay = _retry_after(exc) or min(
+                    self.backoff_max, self.backoff_base * 2**attempt
+                )
+                delay *= random.uniform(0.8, 1.2)
+                logger.info("Retrying LLM call in %.1fs after %r", delay, exc)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled, e.g. by a client disconnect; don't hold the trial
+                if is_trial:
+                    self.breaker.release_trial()
+                raise
+
+            self.breaker.record_success()
+
+            # Settle the token estimate against what the call actually used
+            usage = getattr(result, "usage", None)
+            if usage is not None and usage.total_tokens:
+                self.tokens.consume(usage.total_tokens - estimated_tokens)
+            return result
+
+    async def _acquire(self, priority: Priority, tokens: int) -> None:
+        ticket = (int(priority), next(self._sequence))
+        async with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self._waiters[0] == ticket:
+                        timeout = max(
+                            self.requests.wait_time(1), self.tokens.wait_time(tokens)
+                        )
+                        if timeout <= 0:
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            return
+
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout)
+                    except TimeoutError:
+                        pass
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+
+def estimate_tokens(messages: list[dict[str, str]], completions: int = 1) -> int:
+    """Rough prompt-plus-completion token estimate used for admission."""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + settings.llm_completion_token_estimate * completions
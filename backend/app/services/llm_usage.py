@@ -0,0 +1,242 @@
+"""LLM token ledger and per-repository budgets.
+
+Every call that reaches the provider is recorded with its token usage, latency
+and model, attributed to the repository and endpoint found in the current
+context. Rows are buffered in memory and written in batches. Budgets are
+monthly token limits per repository; once a repository is over its limit its
+calls switch to the budget's fallback model, or fail with
+``LLMBudgetExceededError`` so callers can fall back to local processing.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from anyio import to_thread
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..models.llm_usage import LLMBudget, LLMUsage
+
+logger = logging.getLogger(__name__)
+
+_repo_id: ContextVar[str | None] = ContextVar("llm_usage_repo_id", default=None)
+_endpoint: ContextVar[str | None] = ContextVar("llm_usage_endpoint", default=None)
+
+
+def set_usage_repo(repo_id: Any) -> None:
+    """Attribute LLM calls made from the current context to a repository.
+
+    Raises ``ValueError`` if ``repo_id`` is not a UUID.
+    """
+    _repo_id.set(str(uuid.UUID(str(repo_id))) if repo_id is not None else None)
+
+
+def set_usage_endpoint(endpoint: str | None) -> None:
+    """Attribute LLM calls made from the current context to an endpoint."""
+    _endpoint.set(endpoint)
+
+
+def current_usage_repo() -> str | None:
+    return _repo_id.get()
+
+
+class LLMBudgetExceededError(Exception):
+    """Raised for a repository over its budget that has no fallback model."""
+
+    def __init__(self, repo_id: str, retry_after: float):
+        super().__init__(f"LLM token budget exceeded for repository {repo_id}")
+        self.repo_id = repo_id
+        self.retry_after = retry_after
+
+
+def month_start(now: datetime) -> datetime:
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def seconds_until_next_month(now: datetime) -> float:
+    start = month_start(now)
+    if start.month == 12:
+        next_start = start.replace(year=start.year + 1, month=1)
+    else:
+        next_start = start.replace(month=start.month + 1)
+    return (next_start - now).total_seconds()
+
+
+def token_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float | None:
+    """Cost in USD from ``settings.llm_prices_per_million_tokens``, if priced."""
+    prices = settings.llm_prices_per_million_tokens.get(model)
+    if prices is None:
+        return None
+    prompt_price, completion_price = prices
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+def _insert_rows(rows: list[dict[str, Any]]) -> None:
+    with SessionLocal() as db:
+        db.execute(insert(LLMUsage), rows)
+        db.commit()
+
+
+class UsageLedger:
+    """Buffers usage rows in memory and writes them in batches.
+
+    A batch is written once ``flush_size`` rows are buffered, and at least
+    every ``flush_interval`` seconds. A failed write is logged and dropped so
+    accounting never breaks a request.
+    """
+
+    def __init__(
+        self,
+        flush_size: int = settings.llm_usage_flush_size,
+        flush_interval: float = settings.llm_usage_flush_interval_seconds,
+    ):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer: list[dict[str, Any]] = []
+        self._timer: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency_ms: int,
+    ) -> None:
+        """Buffer one call, attributed to the current repository and endpoint."""
+        self._buffer.append(
+            {
+                "id": uuid.uuid4(),
+                "repo_id": _repo_id.get(),
+                "endpoint": _endpoint.get(),
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "latency_ms": latency_ms,
+                "created_at": datetime.now(UTC),
+            }
+        )
+
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically())
+        if len(self._buffer) >= self.flush_size:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        """Write all buffered rows in one batch."""
+        rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+
+        try:
+            await to_thread.run_sync(_insert_rows, rows)
+        except SQLAlchemyError:
+            logger.exception("Failed to write %d LLM usage rows", len(rows))
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def aclose(self) -> None:
+        """Stop the flush timer and write whatever is still buffered."""
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+
+@dataclass
+class _BudgetState:
+    limit: int | None
+    fallback_model: str | None
+    spent: int
+    loaded_at: float
+
+
+def month_to_date_tokens(db: Session, repo_id: str) -> int:
+    """Tokens a repository has used since the start of the month (UTC)."""
+    spent = db.execute(
+        select(
+            func.coalesce(
+                func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens), 0
+            )
+        ).where(
+            LLMUsage.repo_id == repo_id,
+            LLMUsage.created_at >= month_start(datetime.now(UTC)),
+        )
+    ).scalar_one()
+    return int(spent)
+
+
+def _load_budget_state(repo_id: str) -> _BudgetState:
+    with SessionLocal() as db:
+        budget = db.get(LLMBudget, repo_id)
+        if budget is None:
+            return _BudgetState(None, None, 0, time.monotonic())
+
+        return _BudgetState(
+            budget.monthly_token_limit,
+            budget.fallback_model,
+            month_to_date_tokens(db, repo_id),
+            time.monotonic(),
+        )
+
+
+class BudgetGuard:
+    """Chooses the model for a repository's calls according to its budget.
+
+    Budgets and month-to-date spend are cached per repository for
+    ``refresh_seconds`` and topped up with tokens used since, so budget checks
+    add no query to most calls. Enforcement is soft: concurrent calls and
+    other processes can overshoot a limit by a few calls.
+    """
+
+    def __init__(self, refresh_seconds: float = settings.llm_budget_refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._states: dict[str, _BudgetState] = {}
+
+    async def model_for(self, repo_id: str | None) -> str:
+        """Return the model to use, raising if the budget allows none."""
+        if repo_id is None:
+            return settings.openai_model
+
+        state = self._states.get(repo_id)
+        if state is None or time.monotonic() - state.loaded_at > self.refresh_seconds:
+            try:
+                state = await to_thread.run_sync(_load_budget_state, repo_id)
+            except SQLAlchemyError:
+                logger.exception("Failed to load LLM budget for %s", repo_id)
+                return settings.openai_model
+            self._states[repo_id] = state
+
+        if state.limit is None or state.spent < state.limit:
+            return settings.openai_model
+        if state.fallback_model:
+            return state.fallback_model
+        raise LLMBudgetExceededError(
+            repo_id, retry_after=seconds_until_next_month(datetime.now(UTC))
+        )
+
+    def add(self, repo_id: str | None, tokens: int) -> None:
+        """Count tokens just spent towards the cached month-to-date total."""
+        state = self._states.get(repo_id) if repo_id else None
+        if state is not None:
+            state.spent += tokens
+
+    def invalidate(self, repo_id: str) -> None:
+        """Drop the cached budget so the next call reloads it."""
+        self._states.pop(repo_id, None)
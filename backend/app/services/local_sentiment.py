@@ -0,0 +1,260 @@
+"""Local lexicon-based sentiment scorer.
+
+Scores are computed offline with NumPy over token arrays, so a whole batch of
+versions is scored with a handful of vectorized operations instead of one LLM
+round-trip each.
+"""
+
+import re
+
+import numpy as np
+
+# Valence per word on a -4..4 scale, tuned towards narrative prose.
+LEXICON: dict[str, float] = {
+    # Positive
+    "adore": 3.0,
+    "alive": 1.6,
+    "amazing": 2.8,
+    "beautiful": 2.9,
+    "best": 3.0,
+    "bliss": 3.0,
+    "bright": 1.9,
+    "brave": 2.4,
+    "calm": 1.3,
+    "celebrate": 2.7,
+    "charming": 2.3,
+    "cheer": 2.3,
+    "comfort": 1.5,
+    "confident": 2.2,
+    "courage": 2.2,
+    "delight": 2.9,
+    "delighted": 3.0,
+    "eager": 1.5,
+    "embrace": 1.8,
+    "excited": 2.2,
+    "fond": 1.9,
+    "free": 2.3,
+    "friend": 2.2,
+    "gentle": 1.9,
+    "glad": 2.0,
+    "glow": 1.6,
+    "good": 1.9,
+    "grace": 1.8,
+    "grateful": 2.0,
+    "great": 3.1,
+    "happy": 2.7,
+    "heal": 1.4,
+    "hope": 1.9,
+    "hopeful": 2.3,
+    "joy": 2.8,
+    "kind": 2.4,
+    "kiss": 1.8,
+    "laugh": 2.6,
+    "laughter": 2.2,
+    "love": 3.2,
+    "lovely": 2.8,
+    "loyal": 2.1,
+    "peace": 2.5,
+    "peaceful": 2.2,
+    "pleasure": 2.7,
+    "proud": 2.1,
+    "relief": 2.1,
+    "relieved": 1.9,
+    "safe": 1.9,
+    "smile": 2.1,
+    "smiles": 2.1,
+    "soft": 1.1,
+    "strong": 2.3,
+    "success": 2.7,
+    "sweet": 2.0,
+    "thank": 1.5,
+    "tender": 1.5,
+    "triumph": 2.4,
+    "trust": 2.3,
+    "warm": 1.7,
+    "welcome": 2.0,
+    "win": 2.8,
+    "wonder": 1.9,
+    "wonderful": 2.7,
+    # Negative
+    "afraid": -2.2,
+    "agony": -2.9,
+    "alone": -1.0,
+    "anger": -2.7,
+    "angry": -2.3,
+    "anxious": -1.0,
+    "ashamed": -2.1,
+    "awful": -2.0,
+    "bad": -2.5,
+    "betray": -3.0,
+    "bitter": -1.8,
+    "bleak": -1.9,
+    "blood": -1.4,
+    "broken": -2.1,
+    "cold": -0.9,
+    "cruel": -2.8,
+    "cry": -2.1,
+    "dark": -1.3,
+    "dead": -3.3,
+    "death": -2.9,
+    "despair": -3.1,
+    "die": -2.9,
+    "dread": -2.0,
+    "enemy": -2.5,
+    "evil": -3.4,
+    "fail": -2.5,
+    "fear": -2.2,
+    "fight": -1.6,
+    "grief": -2.2,
+    "guilt": -1.8,
+    "hate": -2.7,
+    "hopeless": -2.0,
+    "horror": -2.7,
+    "hurt": -2.4,
+    "kill": -3.7,
+    "lonely": -1.9,
+    "lose": -1.3,
+    "lost": -1.3,
+    "misery": -2.7,
+    "pain": -2.3,
+    "panic": -2.3,
+    "rage": -2.6,
+    "regret": -1.9,
+    "sad": -2.1,
+    "scared": -1.9,
+    "scream": -1.7,
+    "shame": -2.1,
+    "sick": -2.3,
+    "sorrow": -2.4,
+    "suffer": -2.1,
+    "terrible": -2.1,
+    "terror": -2.4,
+    "threat": -2.4,
+    "tired": -1.9,
+    "trap": -1.3,
+    "ugly": -2.3,
+    "violent": -2.9,
+    "war": -2.9,
+    "weak": -1.9,
+    "weep": -1.9,
+    "worried": -1.2,
+    "worst": -3.1,
+    "wound": -2.2,
+    "wrong": -2.1,
+}
+
+NEGATIONS = frozenset(
+    {
+        "no",
+        "not",
+        "never",
+        "none",
+        "nobody",
+        "nothing",
+        "neither",
+        "nor",
+        "without",
+        "cannot",
+        "can't",
+        "don't",
+        "doesn't",
+        "didn't",
+        "isn't",
+        "wasn't",
+        "aren't",
+        "weren't",
+        "won't",
+        "wouldn't",
+        "couldn't",
+        "shouldn't",
+        "hardly",
+    }
+)
+
+# How many tokens after a negation it applies to, and how strongly it flips.
+NEGATION_WINDOW = 3
+NEGATION_SCALAR = -0.74
+
+# Normalization constant mapping a sentence's raw sum into (-1, 1), as used
+# by VADER.
+NORMALIZATION_ALPHA = 15.0
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?|[.!?;:]")
+_CLAUSE_BREAKS = frozenset({".", "!", "?", ";", ":"})
+_SENTENCE_ENDS = frozenset({".", "!", "?"})
+
+# One sorted vocabulary with aligned per-word attributes, so a single binary
+# search classifies every token.
+_VOCAB = np.array(sorted(set(LEXICON) | NEGATIONS | _CLAUSE_BREAKS))
+_VALENCE = np.array([LEXICON.get(word, 0.0) for word in _VOCAB])
+_IS_NEGATION = np.array([word in NEGATIONS for word in _VOCAB])
+_IS_BREAK = np.array([word in _CLAUSE_BREAKS for word in _VOCAB])
+_IS_END = np.array([word in _SENTENCE_ENDS for word in _VOCAB])
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(_TAG_RE.sub(" ", text).lower())
+
+
+def score_texts(texts: list[str]) -> list[float]:
+    """Score many texts at once, returning valences in [-1, 1].
+
+    All tokens are concatenated into one array tagged with their document
+    index; lexicon lookup, negation and per-sentence sums are then computed
+    with vectorized operations over that array. Each sentence's sum is
+    normalized on its own and a document scores the mean over its
+    sentences, so long texts don't saturate towards -1 or 1.
+    """
+    if not texts:
+        return []
+
+    token_lists = [_tokenize(text) for text in texts]
+    lengths = np.fromiter((len(t) for t in token_lists), dtype=np.int64)
+    if lengths.sum() == 0:
+        return [0.0] * len(texts)
+
+    tokens = np.array([token for t in token_lists for token in t])
+    doc_ids = np.repeat(np.arange(len(texts)), lengths)
+
+    # Vocabulary lookup by binary search over the sorted word array
+    positions = np.minimum(np.searchsorted(_VOCAB, tokens), len(_VOCAB) - 1)
+    known = _VOCAB[positions] == tokens
+    valences = np.where(known, _VALENCE[positions], 0.0)
+    is_negation = known & _IS_NEGATION[positions]
+    is_break = known & _IS_BREAK[positions]
+    is_end = known & _IS_END[positions]
+
+    # Negation applies within the same document and clause only
+    clause_ids = np.cumsum(is_break) + doc_ids * (len(tokens) + 1)
+
+    negated = np.zeros(len(tokens), dtype=bool)
+    for lag in range(1, NEGATION_WINDOW + 1):
+        negated[lag:] |= is_negation[:-lag] & (clause_ids[lag:] == clause_ids[:-lag])
+
+    valences = np.where(negated, valences * NEGATION_SCALAR, valences)
+
+    # A sentence runs up to and including its closing punctuation
+    sentence_keys = np.cumsum(is_end) - is_end + doc_ids * (len(tokens) + 1)
+    _, sentence_ids = np.unique(sentence_keys, return_inverse=True)
+    sentence_docs = np.zeros(sentence_ids.max() + 1, dtype=np.int64)
+    sentence_docs[sentence_ids] = doc_ids
+
+    sums = np.bincount(sentence_ids, weights=valences)
+    sentence_scores = sums / np.sqrt(sums * sums + NORMALIZATION_ALPHA)
+
+    # Sentences that are only punctuation don't count towards the mean
+    has_words = np.bincount(sentence_ids, weights=~is_break) > 0
+    totals = np.bincount(
+        sentence_docs[has_words],
+        weights=sentence_scores[has_words],
+        minlength=len(texts),
+    )
+    counts = np.bincount(sentence_docs[has_words], minlength=len(texts))
+    scores = np.divide(totals, counts, out=np.zeros(len(texts)), where=counts > 0)
+    return [round(float(score), 4) for score in scores]
+
+
+def score_text(text: str) -> float:
+    """Score a single text, returning a valence in [-1, 1]."""
+    return score_texts([text])[0]
@@ -0,0 +1,268 @@
+"""In-process index of entity names for finding mentions in scene text.
+
+Every entity name and alias is a pattern in an Aho-Corasick automaton, so all
+known-entity mentions in a scene are found in a single pass over its text,
+independent of how many entities exist. Offsets are exact, unlike those
+reported by the LLM.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.entity import Entity
+
+
+def fold_case(text: str) -> str:
+    """Lowercase ``text`` without changing its length, so offsets still hold."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # A few characters (e.g. 'İ') lowercase to more than one code point
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def normalize_name(name: str) -> str:
+    """Collapse whitespace and fold case, as names are matched."""
+    return fold_case(" ".join(name.split()))
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton that supports adding and removing patterns.
+
+    Added patterns extend the trie in place and removed ones are only
+    unmarked; failure links are recomputed lazily before the next search.
+    ``compact`` rebuilds the trie once enough removed patterns pile up.
+    """
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._terminal: list[str | None] = [None]  # pattern ending at node
+        self._fail: list[int] = [0]
+        self._output: list[int] = [-1]  # nearest terminal node via failure links
+        self._nodes_by_pattern: dict[str, int] = {}
+        self._live_chars = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._nodes_by_pattern)
+
+    @property
+    def dead_nodes(self) -> int:
+        """Lower bound on trie nodes no live pattern passes through."""
+        return len(self._goto) - 1 - self._live_chars
+
+    def add(self, pattern: str) -> None:
+        if pattern in self._nodes_by_pattern:
+            return
+
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._terminal.append(None)
+                self._fail.append(0)
+                self._output.append(-1)
+            node = next_node
+
+        self._terminal[node] = pattern
+        self._nodes_by_pattern[pattern] = node
+        self._live_chars += len(pattern)
+        self._dirty = True
+
+    def remove(self, pattern: str) -> None:
+        node = self._nodes_by_pattern.pop(pattern, None)
+        if node is not None:
+            self._terminal[node] = None
+            self._live_chars -= len(pattern)
+            self._dirty = True
+
+    def compact(self) -> None:
+        """Rebuild the trie from the live patterns only."""
+        patterns = list(self._nodes_by_pattern)
+        self.__init__()
+        for pattern in patterns:
+            self.add(pattern)
+
+    def _build(self) -> None:
+        # Breadth-first, so a node's failure target is final before its children
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._output[child] = -1
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._output[child] = (
+                    fail if self._terminal[fail] is not None else self._output[fail]
+                )
+                queue.append(child)
+
+        self._dirty = False
+
+    def search(self, text: str) -> list[tuple[int, int, str]]:
+        """Return ``(start, end, pattern)`` for every occurrence in ``text``."""
+        if self._dirty:
+            self._build()
+
+        goto, fail, terminal, output = (
+            self._goto,
+            self._fail,
+            self._terminal,
+            self._output,
+        )
+        matches = []
+        node = 0
+        for end, char in enumerate(text, start=1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            match = node if terminal[node] is not None else output[node]
+            while match != -1:
+                pattern = terminal[match]
+                matches.append((end - len(pattern), end, pattern))
+                match = output[match]
+        return matches
+
+
+class Mention(NamedTuple):
+    entity_ids: tuple[str, ...]  # more than one when a name is ambiguous
+    start: int
+    end: int
+    text: str
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class MentionIndex:
+    """Entity name/alias index kept in step with entity changes.
+
+    The index is loaded from the database on first use and reloaded after
+    ``reload_seconds`` to pick up changes made by other processes; changes
+    made through this process's entity endpoints are applied immediately.
+    """
+
+    def __init__(
+        self,
+        reload_seconds: float = settings.mention_index_reload_seconds,
+        min_length: int = settings.mention_min_length,
+    ):
+        self.reload_seconds = reload_seconds
+        self.min_length = min_length
+        self._lock = threading.Lock()
+        self._automaton = AhoCorasick()
+        self._patterns_by_entity: dict[str, set[str]] = {}
+        self._entities_by_pattern: dict[str, set[str]] = {}
+        self._entities: dict[str, tuple[str, str]] = {}  # id -> (type, name)
+        self._loaded_at: float | None = None
+
+    def _patterns(self, name: str, aliases: list[str] | None) -> set[str]:
+        patterns = {normalize_name(n) for n in [name, *(aliases or [])] if n}
+        return {p for p in patterns if len(p) >= self.min_length}
+
+    def _add(
+        self, entity_id: str, type: str, name: str, aliases: list[str] | None
+    ) -> None:
+        patterns = self._patterns(name, aliases)
+        self._entities[entity_id] = (type, name)
+        self._patterns_by_entity[entity_id] = patterns
+        for pattern in patterns:
+            self._entities_by_pattern.setdefault(pattern, set()).add(entity_id)
+            self._automaton.add(pattern)
+
+    def _remove(self, entity_id: str) -> None:
+        self._entities.pop(entity_id, None)
+        for pattern in self._patterns_by_entity.pop(entity_id, ()):
+            entity_ids = self._entities_by_pattern[pattern]
+            entity_ids.discard(entity_id)
+            if not entity_ids:
+                del self._entities_by_pattern[pattern]
+                self._automaton.remove(pattern)
+
+        # Removed patterns leave dead trie nodes behind; drop them in bulk
+        if self._automaton.dead_nodes > max(1024, len(self._automaton)):
+            self._automaton.compact()
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Load all entities if the index is empty or stale."""
+        with self._lock:
+            if (
+                self._loaded_at is not None
+                and time.monotonic() - self._loaded_at < self.reload_seconds
+            ):
+                return
+
+            rows = db.query(Entity.id, Entity.type, Entity.name, Entity.aliases)
+            self._automaton = AhoCorasick()
+            self._patterns_by_entity = {}
+            self._entities_by_pattern = {}
+            self._entities = {}
+            for entity_id, type, name, aliases in rows:
+                self._add(str(entity_id), type, name, aliases)
+            self._loaded_at = time.monotonic()
+
+    def upsert_entity(
+        self, entity_id: str, type: str, name: str, aliases: list[str] | None
+    ) -> None:
+        """Add an entity, or replace the names of an existing one."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # picked up by the initial load
+            self._remove(str(entity_id))
+            self._add(str(entity_id), type, name, aliases)
+
+    def remove_entity(self, entity_id: str) -> None:
+        with self._lock:
+            self._remove(str(entity_id))
+
+    def entity(self, entity_id: str) -> tuple[str, str] | None:
+        """Return the ``(type, name)`` of an indexed entity."""
+        return self._entities.get(entity_id)
+
+    def find(self, text: str) -> list[Mention]:
+        """Find whole-word entity mentions in ``text``, case-insensitively.
+
+        Where mentions overlap the leftmost, then longest, wins, so "Anna
+        Karenina" is one mention rather than also containing "Anna".
+        """
+        with self._lock:
+            matches = self._automaton.search(fold_case(text))
+            entities_by_pattern = {
+                pattern: tuple(sorted(self._entities_by_pattern[pattern]))
+                for _, _, pattern in matches
+            }
+
+        mentions = []
+        last_end = 0
+        for start, end, pattern in sorted(matches, key=lambda m: (m[0], -m[1])):
+            if start < last_end:
+                continue
+            if (start > 0 and _is_word_char(text[start - 1])) or (
+                end < len(text) and _is_word_char(text[end])
+            ):
+                continue
+            mentions.append(
+                Mention(entities_by_pattern[pattern], start, end, text[start:end])
+            )
+            last_end = end
+        return mentions
+
+
+mention_index = MentionIndex()
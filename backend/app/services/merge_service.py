@@ -0,0 +1,342 @@
+"""Three-way merges of pull requests, paragraph by paragraph."""
+
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from multiprocessing import get_context
+from typing import Any
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.repository import Commit, CommitItem, PullRequest, SceneVersion
+from ..models.story import SceneBranchLatest
+from .branch_heads import set_branch_heads
+from .diff_service import enqueue_semantic_diffs
+from .job_queue import enqueue
+from .sentiment_service import SENTIMENT_JOB, initial_sentiment_meta
+from .version_ancestry import merge_bases
+from .version_store import load_version_texts, split_chunks
+
+
+class PullRequestNotFoundError(Exception):
+    """Raised when a pull request does not exist."""
+
+
+class PullRequestNotOpenError(Exception):
+    """Raised when merging a pull request that is merged or closed."""
+
+
+class MergeConflictError(Exception):
+    """Raised when a pull request's scenes can't all be merged cleanly."""
+
+    def __init__(self, scenes: list[dict[str, Any]]):
+        conflicted = [s for s in scenes if s["status"] == "conflict"]
+        super().__init__(f"{len(conflicted)} scenes have merge conflicts")
+        self.scenes = scenes
+
+
+def _sync_regions(
+    base: list[str], target: list[str], source: list[str]
+) -> list[tuple[int, int, int, int, int, int]]:
+    """Ranges of ``base`` unchanged on both sides, with where they went."""
+    target_blocks = SequenceMatcher(
+        None, base, target, autojunk=False
+    ).get_matching_blocks()
+    source_blocks = SequenceMatcher(
+        None, base, source, autojunk=False
+    ).get_matching_blocks()
+
+    regions = []
+    t = s = 0
+    while t < len(target_blocks) and s < len(source_blocks):
+        t_base, t_start, t_len = target_blocks[t]
+        s_base, s_start, s_len = source_blocks[s]
+        start = max(t_base, s_base)
+        end = min(t_base + t_len, s_base + s_len)
+        if start < end:
+            regions.append(
+                (
+                    start,
+                    end,
+                    t_start + start - t_base,
+                    t_start + end - t_base,
+                    s_start + start - s_base,
+                    s_start + end - s_base,
+                )
+            )
+        if t_base + t_len < s_base + s_len:
+            t += 1
+        else:
+            s += 1
+    n = (len(base), len(target), len(source))
+    regions.append((n[0], n[0], n[1], n[1], n[2], n[2]))
+    return regions
+
+
+def merge_paragraphs(
+    base: list[str], target: list[str], source: list[str]
+) -> tuple[list[str], list[dict[str, list[str]]]]:
+    """Merge two edits of ``base``, diff3 style.
+
+    A region changed on one side only takes that side; changed the same way
+    on both, either. Regions changed differently on both sides are
+    conflicts: they are returned, and the merged list keeps the target's
+    side for them.
+    """
+    merged: list[str] = []
+    conflicts = []
+    b = t = s = 0
+    for b_start, b_end, t_start, t_end, s_start, s_end in _sync_regions(
+        base, target, source
+    ):
+        base_part, target_part, source_part = (
+            base[b:b_start],
+            target[t:t_start],
+            source[s:s_start],
+        )
+        if target_part == source_part or source_part == base_part:
+            merged += target_part
+        elif target_part == base_part:
+            merged += source_part
+        else:
+            merged += target_part
+            conflicts.append(
+                {"base": base_part, "target": target_part, "source": source_part}
+            )
+        merged += base[b_start:b_end]
+        b, t, s = b_end, t_end, s_end
+    return merged, conflicts
+
+
+def merge_texts(
+    base_html: str, target_html: str, source_html: str
+) -> tuple[str, list[dict[str, list[str]]]]:
+    """Merge two edits of a scene's HTML by paragraph."""
+    merged, conflicts = merge_paragraphs(
+        split_chunks(base_html), split_chunks(target_html), split_chunks(source_html)
+    )
+    return "".join(merged), conflicts
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _merge_all(
+    tasks: list[tuple[str, str, str]],
+) -> list[tuple[str, list[dict[str, list[str]]]]]:
+    """Run ``merge_texts`` over many scenes, in worker processes if many."""
+    global _pool
+    if settings.merge_workers <= 1 or len(tasks) < settings.merge_parallel_min_scenes:
+        return [merge_texts(*task) for task in tasks]
+
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, as forking a threaded server can deadlock the child
+            _pool = ProcessPoolExecutor(
+                settings.merge_workers, mp_context=get_context("spawn")
+            )
+    chunksize = max(1, len(tasks) // (settings.merge_workers * 4))
+    return list(_pool.map(merge_texts, *zip(*tasks, strict=True), chunksize=chunksize))
+
+
+def shutdown_pool() -> None:
+    """Stop the merge worker processes, if any were started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def plan_merge(
+    db: Session, pull_request: PullRequest
+) -> tuple[list[dict[str, Any]], dict[uuid.UUID, str]]:
+    """Work out how each scene changed on the source branch merges.
+
+    Returns a summary per scene whose head differs between the branches,
+    except scenes whose source head the target already contains, and the
+    merged content of scenes needing a new version. A scene's status is
+    ``added`` if the target branch lacks it, ``fast_forward`` if the
+    target's head is an ancestor of the source's, else ``merged`` or
+    ``conflict``. Merge bases follow earlier merges' second parents, so
+    merging a branch again only replays what changed since. Heads, merge
+    bases and contents are each loaded with a fixed number of queries for
+    all scenes.
+    """
+    heads: dict[uuid.UUID, dict[uuid.UUID, uuid.UUID]] = {
+        pull_request.source_branch_id: {},
+        pull_request.target_branch_id: {},
+    }
+    for scene_id, branch_id, version_id in db.execute(
+        select(
+            SceneBranchLatest.scene_id,
+            SceneBranchLatest.branch_id,
+            SceneBranchLatest.version_id,
+        ).where(SceneBranchLatest.branch_id.in_(list(heads)))
+    ):
+        heads[branch_id][scene_id] = version_id
+    source_heads = heads[pull_request.source_branch_id]
+    target_heads = heads[pull_request.target_branch_id]
+
+    changed = [
+        scene_id
+        for scene_id, version_id in source_heads.items()
+        if target_heads.get(scene_id) != version_id
+    ]
+    ancestors = merge_bases(
+        db,
+        [
+            (target_heads[scene_id], source_heads[scene_id])
+            for scene_id in changed
+            if scene_id in target_heads
+        ],
+    )
+
+    scenes = []
+    to_merge = []
+    for scene_id in changed:
+        source_id, target_id = source_heads[scene_id], target_heads.get(scene_id)
+        base_id = ancestors.get((target_id, source_id))
+        if target_id is not None and base_id == source_id:
+            continue  # already merged
+        scene = {
+            "scene_id": scene_id,
+            "status": "fast_forward" if base_id == target_id else "merged",
+            "base_version_id": base_id,
+            "target_version_id": target_id,
+            "source_version_id": source_id,
+            "merged_version_id": None,
+            "conflicts": [],
+        }
+        if target_id is None:
+            scene["status"] = "added"
+        elif base_id != target_id:
+            to_merge.append(scene)
+        scenes.append(scene)
+
+    texts = load_version_texts(
+        db,
+        {
+            version_id
+            for scene in to_merge
+            for version_id in (
+                scene["base_version_id"],
+                scene["target_version_id"],
+                scene["source_version_id"],
+            )
+            if version_id is not None
+        },
+    )
+    # Scenes without a common ancestor merge against an empty base
+    results = _merge_all(
+        [
+            (
+                texts.get(scene["base_version_id"], ""),
+                texts[scene["target_version_id"]],
+                texts[scene["source_version_id"]],
+            )
+            for scene in to_merge
+        ]
+    )
+    merged_html = {}
+    for scene, (html, conflicts) in zip(to_merge, results, strict=True):
+        if conflicts:
+            scene["status"] = "conflict"
+            scene["conflicts"] = conflicts
+        else:
+            merged_html[scene["scene_id"]] = html
+    return scenes, merged_html
+
+
+def merge_pull_request(db: Session, pull_request_id: str) -> dict[str, Any]:
+    """Merge a pull request's source branch into its target branch.
+
+    Merged scenes get a new version on the target branch, parented on the
+    target's head with the source's head as its merge parent; added and
+    fast-forwarded scenes share the source's version. The versions, head
+    pointers and one merge commit are written in bulk and committed together
+    with the pull request's ``merged`` status.
+
+    Raises ``PullRequestNotFoundError``, ``PullRequestNotOpenError``, or
+    ``MergeConflictError`` with every scene's summary if any conflict, in
+    which case nothing is written.
+    """
+    # Locked so the same pull request can't be merged twice at once
+    pull_request = db.scalar(
+        select(PullRequest).where(PullRequest.id == pull_request_id).with_for_update()
+    )
+    if pull_request is None:
+        raise PullRequestNotFoundError(pull_request_id)
+    if pull_request.status != "open":
+        db.rollback()
+        raise PullRequestNotOpenError(pull_request.status)
+
+    scenes, merged_html = plan_merge(db, pull_request)
+    if any(scene["status"] == "conflict" for scene in scenes):
+        db.rollback()
+        raise MergeConflictError(scenes)
+
+    new_versions = {}
+    sentiment_ids = []
+    for scene in scenes:
+        html = merged_html.get(scene["scene_id"])
+        if html is None:
+            continue
+        meta, needs_sentiment_job = initial_sentiment_meta(html)
+        version = SceneVersion(
+            id=uuid.uuid4(),
+            scene_id=scene["scene_id"],
+            branch_id=pull_request.target_branch_id,
+            parent_version_id=scene["target_version_id"],
+            content_html=html,
+            merge_parent_version_id=scene["source_version_id"],
+            meta=meta,
+        )
+        new_versions[scene["scene_id"]] = version
+        scene["merged_version_id"] = version.id
+        if needs_sentiment_job:
+            sentiment_ids.append(version.id)
+    db.add_all(new_versions.values())
+    db.flush()
+
+    heads = {
+        scene["scene_id"]: scene["merged_version_id"] or scene["source_version_id"]
+        for scene in scenes
+    }
+    set_branch_heads(db, pull_request.target_branch_id, heads)
+
+    commit_id = None
+    if heads:
+        commit = Commit(
+            repo_id=pull_request.repo_id,
+            branch_id=pull_request.target_branch_id,
+            message=(
+                f"Merge {pull_request.source_branch.name} "
+                f"into {pull_request.target_branch.name}"
+            ),
+            author="You",
+        )
+        db.add(commit)
+        db.flush()  # Get the commit ID
+        db.execute(
+            insert(CommitItem),
+            [
+                {"commit_id": commit.id, "scene_version_id": version_id}
+                for version_id in heads.values()
+            ],
+        )
+        commit_id = commit.id
+
+    for version_id in sentiment_ids:
+        enqueue(db, SENTIMENT_JOB, {"version_id": str(version_id)})
+    enqueue_semantic_diffs(db, list(new_versions.values()))
+
+    pull_request.status = "merged"
+    db.commit()
+    db.refresh(pull_request)
+
+    return {"pull_request": pull_request, "commit_id": commit_id, "scenes": scenes}
@@ -0,0 +1,136 @@
+"""Scene sentiment analysis service."""
+
+from typing import Any
+
+from anyio import to_thread
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..models.repository import SceneVersion
+from .job_queue import register_handler
+from .llm_client import get_llm_client
+from .llm_scheduler import Priority
+from .llm_usage import LLMBudgetExceededError, set_usage_repo
+from .local_sentiment import score_text
+
+SENTIMENT_JOB = "sentiment"
+
+
+def html_to_sentiment_text(content_html: str) -> str:
+    """Pad tags with spaces so adjacent words do not run together."""
+    return content_html.replace("<", " <").replace(">", "> ")
+
+
+def initial_sentiment_meta(content_html: str) -> tuple[dict[str, Any], bool]:
+    """Return the sentiment meta to store on save, and whether to enqueue a job.
+
+    In ``local`` mode the lexicon score is final. In ``hybrid`` mode it is
+    stored as provisional and refined by the LLM job. In ``llm`` mode the
+    score stays pending until the job runs.
+    """
+    if settings.sentiment_mode == "llm":
+        return {"sentiment": None, "sentiment_status": "pending"}, True
+
+    meta = {
+        "sentiment": score_text(content_html),
+        "sentiment_source": "local",
+        "sentiment_status": "done",
+    }
+    if settings.sentiment_mode == "hybrid":
+        meta["sentiment_status"] = "provisional"
+        return meta, True
+
+    return meta, False
+
+
+async def analyze_sentiment(text: str) -> float:
+    """Analyze sentiment of text using OpenAI."""
+    prompt = f"Return a single float between -1 and 1 representing the emotional valence of this passage. -1 is very negative, 0 is neutral, 1 is very positive.\n\nText: {text}"
+
+    result = await get_llm_client().respond_json(
+        [{"role": "user", "content": prompt}],
+        {
+            "type": "object",
+            "properties": {
+                "sentiment": {"type": "number", "minimum": -1, "maximum": 1}
+            },
+            "required": ["sentiment"],
+            "additionalProperties": False,
+        },
+        priority=Priority.BACKGROUND,
+    )
+
+    return float(result["sentiment"])
+
+
+def _load_version_text(version_id: str) -> tuple[str, str] | None:
+    with SessionLocal() as db:
+        version = db.get(SceneVersion, version_id)
+        if version is None:
+            return None
+        return html_to_sentiment_text(version.content_html), version.branch.repo_id
+
+
+def _update_version_meta(version_id: str, **values: Any) -> None:
+    with SessionLocal() as db:
+        # Locked so concurrent writers of other meta keys aren't overwritten
+        version = db.get(SceneVersion, version_id, with_for_update=True)
+        if version is None:
+            return
+
+        meta = version.meta or {}
+        if values.get("sentiment_status") == "failed" and (
+            meta.get("sentiment") is not None
+        ):
+            # Keep a provisional local score rather than discarding it
+            values["sentiment_status"] = "done"
+
+        # Reassign rather than mutate so the JSON column is marked dirty
+        version.meta = {**meta, **values}
+        db.commit()
+
+
+async def run_sentiment_job(payload: dict[str, Any]) -> dict[str, Any]:
+    """Score a saved version and store the result in its meta."""
+    version_id = payload["version_id"]
+
+    loaded = await to_thread.run_sync(_load_version_text, version_id)
+    if loaded is None:
+        return {"skipped": "version not found"}
+
+    text, repo_id = loaded
+    set_usage_repo(repo_id)
+    try:
+        score = await analyze_sentiment(text)
+    except LLMBudgetExceededError:
+        # Over budget: settle for the local score
+        score = score_text(text)
+        await to_thread.run_sync(
+            lambda: _update_version_meta(
+                version_id,
+                sentiment=score,
+                sentiment_source="local",
+                sentiment_status="done",
+            )
+        )
+        return {"sentiment": score, "fallback": "local"}
+
+    await to_thread.run_sync(
+        lambda: _update_version_meta(
+            version_id,
+            sentiment=score,
+            sentiment_source="llm",
+            sentiment_status="done",
+        )
+    )
+    return {"sentiment": score}
+
+
+async def give_up_sentiment_job(payload: dict[str, Any], error: str) -> None:
+    """Record that sentiment could not be computed instead of faking a score."""
+    await to_thread.run_sync(
+        lambda: _update_version_meta(payload["version_id"], sentiment_status="failed")
+    )
+
+
+register_handler(SENTIMENT_JOB, run_sentiment_job, on_give_up=give_up_sentiment_job)
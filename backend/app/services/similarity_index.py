@@ -0,0 +1,443 @@
+"""In-process near-duplicate index of entity names.
+
+Names are compared by the Jaccard similarity of their trigram sets, as
+pg_trgm does. Every distinct name gets a MinHash signature, split into LSH
+bands; names that share a band are candidates, and only candidates are
+compared exactly. Band keys are kept sorted per band, so a lookup costs a
+binary search per band rather than a scan of every entity.
+"""
+
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.entity import Entity
+from .mention_index import fold_case, normalize_name
+
+_SEED = 0x5EED
+_CHUNK_NAMES = 4096  # names hashed per numpy batch, bounding memory
+# Candidate pairs are taken between slots at most this far apart in a band's
+# sorted order, so a huge bucket costs linear rather than quadratic work;
+# its members are still chained into one cluster
+_MAX_RUN_OFFSET = 64
+# Candidates estimated this far below the threshold are not compared exactly;
+# about 2 standard deviations of the estimate at the default 96 minhashes
+_ESTIMATE_MARGIN = 0.1
+
+
+@lru_cache(maxsize=65536)
+def _word_trigrams(word: str) -> frozenset[str]:
+    padded = f"  {word} "
+    # Interned, as names share most of their trigrams
+    return frozenset(sys.intern(padded[i : i + 3]) for i in range(len(padded) - 2))
+
+
+def trigrams(name: str) -> frozenset[str]:
+    """pg_trgm-style trigrams: each word padded with two spaces before, one after."""
+    words = re.findall(r"\w+", fold_case(name))
+    if len(words) == 1:
+        return _word_trigrams(words[0])
+    return frozenset().union(*map(_word_trigrams, words))
+
+
+def jaccard(left: frozenset[str], right: frozenset[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def _hash32(value: str) -> int:
+    # str hashes are salted per process, which is fine for an in-process index
+    return hash(value) & 0xFFFFFFFF
+
+
+class MinHasher:
+    """Computes banded MinHash keys for trigram sets.
+
+    Each permutation is a multiply-shift hash of the trigram's hash. The
+    ``rows`` minhashes of a band, salted with the band and the entity type,
+    are folded into one 64-bit key, so two names share a band key when they
+    (almost certainly) agree on all of that band's minhashes.
+    """
+
+    def __init__(self, bands: int, rows: int):
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(_SEED)
+        permutations = bands * rows
+        high = np.iinfo(np.uint64).max
+        self._a = rng.integers(1, high, permutations, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, high, permutations, dtype=np.uint64)
+        self._row_mix = rng.integers(1, high, rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salt = rng.integers(0, high, bands, dtype=np.uint64)
+
+    @property
+    def permutations(self) -> int:
+        return self.bands * self.rows
+
+    def signatures(self, grams: list[frozenset[str]]) -> np.ndarray:
+        """MinHash signatures, shape ``(len(grams), permutations)``."""
+        signatures = np.empty((len(grams), self.permutations), dtype=np.uint32)
+        for start in range(0, len(grams), _CHUNK_NAMES):
+            chunk = grams[start : start + _CHUNK_NAMES]
+            sizes = np.fromiter((len(g) for g in chunk), np.int64, len(chunk))
+            hashes = np.fromiter(
+                (_hash32(gram) for name_grams in chunk for gram in name_grams),
+                np.uint64,
+                int(sizes.sum()),
+            )
+            offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            with np.errstate(over="ignore"):
+                # Multiply-shift: the top 32 bits of a*h + b are a universal hash
+                values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> 32
+            signatures[start : start + len(chunk)] = np.minimum.reduceat(
+                values, offsets, axis=1
+            ).T
+        return signatures
+
+    def band_keys(self, type: str, signatures: np.ndarray) -> np.ndarray:
+        """Band keys, shape ``(len(signatures), bands)``, for names of ``type``."""
+        type_salt = np.uint64(_hash32(type) * 0x9E3779B97F4A7C15 % 2**64)
+        bands = signatures.astype(np.uint64).reshape(-1, self.bands, self.rows)
+        with np.errstate(over="ignore"):
+            return (bands * self._row_mix).sum(axis=2) + self._band_salt + type_salt
+
+
+class SimilarEntity(NamedTuple):
+    entity_id: str
+    name: str  # the entity's name or alias that matched
+    similarity: float
+
+
+class DuplicateCluster(NamedTuple):
+    entity_ids: list[str]
+    similarity: float  # lowest similarity among the matches that joined it
+
+
+class SimilarityIndex:
+    """Entity name/alias index for finding near-duplicate entities.
+
+    Only entities of the same type are compared. Like the mention index it
+    is loaded on first use, reloaded after ``reload_seconds`` and updated in
+    place by this process's entity changes. Sorted band keys are rebuilt
+    lazily before the next lookup after a change.
+    """
+
+    def __init__(
+        self,
+        bands: int = settings.entity_dedup_bands,
+        rows: int = settings.entity_dedup_rows,
+        reload_seconds: float = settings.mention_index_reload_seconds,
+    ):
+        self.reload_seconds = reload_seconds
+        self._hasher = MinHasher(bands, rows)
+        self._lock = threading.Lock()
+        self._loaded_at: float | None = None
+        self._version = 0  # bumped on every change, for the cluster cache
+        self._clusters: tuple[tuple, list[DuplicateCluster]] | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        # One slot per distinct (type, normalized name); removed slots are None
+        self._slot_by_name: dict[tuple[str, str], int] = {}
+        self._slot_names: list[tuple[str, str] | None] = []
+        self._slot_grams: list[frozenset[str]] = []
+        self._slot_entities: list[set[str]] = []
+        self._slots_by_entity: dict[str, set[int]] = {}
+        self._signatures = np.empty((0, self._hasher.permutations), dtype=np.uint32)
+        self._keys = np.empty((0, self._hasher.bands), dtype=np.uint64)
+        # Signatures and band keys of slots added since the last build
+        self._pending: list[tuple[np.ndarray, np.ndarray]] = []
+        self._dead = 0
+        self._sorted_keys: np.ndarray | None = None
+        self._sorted_slots: np.ndarray | None = None
+
+    def _add(self, rows) -> None:
+        """Index ``(entity_id, type, name, aliases)`` rows."""
+        first_new = len(self._slot_names)
+        new_slots: dict[str, list[int]] = {}
+        for entity_id, type, name, aliases in rows:
+            entity_id = str(entity_id)
+            slots = set()
+            for normalized in {
+                normalize_name(n) for n in [name, *(aliases or [])] if n
+            }:
+                key = (type, normalized)
+                slot = self._slot_by_name.get(key)
+                if slot is None:
+                    grams = trigrams(normalized)
+                    if not grams:
+                        continue
+                    slot = len(self._slot_names)
+                    self._slot_by_name[key] = slot
+                    self._slot_names.append(key)
+                    self._slot_grams.append(grams)
+                    self._slot_entities.append(set())
+                    new_slots.setdefault(type, []).append(slot)
+                self._slot_entities[slot].add(entity_id)
+                slots.add(slot)
+            self._slots_by_entity[entity_id] = slots
+
+        if not new_slots:
+            return
+        added = len(self._slot_names) - first_new
+        signatures = np.empty((added, self._hasher.permutations), dtype=np.uint32)
+        keys = np.empty((added, self._hasher.bands), dtype=np.uint64)
+        for type, slots in new_slots.items():
+            positions = np.array(slots) - first_new
+            signatures[positions] = self._hasher.signatures(
+                [self._slot_grams[slot] for slot in slots]
+            )
+            keys[positions] = self._hasher.band_keys(type, signatures[positions])
+        self._pending.append((signatures, keys))
+        self._sorted_keys = None
+
+    def _changed(self) -> None:
+        self._version += 1
+        self._clusters = None
+
+    def _remove(self, entity_id: str) -> None:
+        for slot in self._slots_by_entity.pop(entity_id, ()):
+            entity_ids = self._slot_entities[slot]
+            entity_ids.discard(entity_id)
+            if not entity_ids:
+                del self._slot_by_name[self._slot_names[slot]]
+                self._slot_names[slot] = None
+                self._dead += 1
+
+        # Removed slots keep their band keys; rebuild once enough pile up
+        if self._dead > max(1024, len(self._slot_by_name)):
+            rows = []
+            for entity_id, slots in self._slots_by_entity.items():
+                names = [self._slot_names[slot] for slot in slots]
+                if names:
+                    type, name = names[0]
+                    rows.append((entity_id, type, name, [n for _, n in names[1:]]))
+            self._reset()
+            self._add(rows)
+
+    def _build(self) -> None:
+        if self._pending:
+            signatures, keys = zip(*self._pending, strict=True)
+            self._signatures = np.vstack([self._signatures, *signatures])
+            self._keys = np.vstack([self._keys, *keys])
+            self._pending = []
+        order = np.argsort(self._keys, axis=0, kind="stable").astype(np.int32)
+        self._sorted_slots = order
+        self._sorted_keys = np.take_along_axis(self._keys, order, axis=0)
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Load all entities if the index is empty or stale."""
+        with self._lock:
+            if (
+                self._loaded_at is not None
+                and time.monotonic() - self._loaded_at < self.reload_seconds
+            ):
+                return
+
+            self._reset()
+            self._add(db.query(Entity.id, Entity.type, Entity.name, Entity.aliases))
+            self._changed()
+            self._loaded_at = time.monotonic()
+
+    def upsert_entity(
+        self, entity_id: str, type: str, name: str, aliases: list[str] | None
+    ) -> None:
+        """Add an entity, or replace the names of an existing one."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # picked up by the initial load
+            self._remove(str(entity_id))
+            self._add([(entity_id, type, name, aliases)])
+            self._changed()
+
+    def remove_entity(self, entity_id: str) -> None:
+        with self._lock:
+            self._remove(str(entity_id))
+            self._changed()
+
+    def similar(
+        self, type: str, name: str, threshold: float = settings.entity_dedup_threshold
+    ) -> list[SimilarEntity]:
+        """Entities of ``type`` with a name or alias similar to ``name``.
+
+        Sorted by similarity, best first; an entity appears once, with its
+        best-matching name.
+        """
+        grams = trigrams(name)
+        if not grams:
+            return []
+
+        keys = self._hasher.band_keys(type, self._hasher.signatures([grams]))[0]
+        best: dict[str, SimilarEntity] = {}
+        with self._lock:
+            if self._sorted_keys is None:
+                self._build()
+            candidates = set()
+            for band, key in enumerate(keys):
+                column = self._sorted_keys[:, band]
+                low = int(np.searchsorted(column, key, side="left"))
+                high = int(np.searchsorted(column, key, side="right"))
+                candidates.update(self._sorted_slots[low:high, band].tolist())
+
+            for slot in candidates:
+                slot_name = self._slot_names[slot]
+                if slot_name is None or slot_name[0] != type:
+                    continue
+                similarity = jaccard(grams, self._slot_grams[slot])
+                if similarity < threshold:
+                    continue
+                for entity_id in self._slot_entities[slot]:
+                    current = best.get(entity_id)
+                    if current is None or similarity > current.similarity:
+                        best[entity_id] = SimilarEntity(
+                            entity_id, slot_name[1], similarity
+                        )
+
+        return sorted(best.values(), key=lambda m: (-m.similarity, m.entity_id))
+
+    def best_match(self, type: str, name: str, threshold: float) -> str | None:
+        """The single most similar entity above ``threshold``, if unambiguous."""
+        matches = self.similar(type, name, threshold)
+        if not matches:
+            return None
+        if len(matches) > 1 and matches[1].similarity == matches[0].similarity:
+            return None
+        return matches[0].entity_id
+
+    def _candidate_pairs(self, min_estimate: float) -> np.ndarray:
+        """Slot pairs sharing a band key, shape ``(n, 2)``.
+
+        Pairs whose signatures estimate their similarity below
+        ``min_estimate`` are dropped, so fewer need comparing exactly.
+        """
+        pairs = []
+        count = len(self._keys)
+        for band in range(self._hasher.bands):
+            column = self._sorted_keys[:, band]
+            slots = self._sorted_slots[:, band]
+            # Equal keys are adjacent: pair each slot in a run with the ones
+            # ``offset`` places after it, for as long as the run lasts
+            starts = np.flatnonzero(column[1:] == column[:-1])
+            offset = 1
+            while starts.size and offset <= _MAX_RUN_OFFSET:
+                pairs.append(np.stack([slots[starts], slots[starts + offset]], axis=1))
+                offset += 1
+                starts = starts[starts + offset < count]
+                starts = starts[column[starts + offset] == column[starts]]
+
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        pairs = np.sort(np.concatenate(pairs).astype(np.int64), axis=1)
+        encoded = np.sort(pairs[:, 0] * count + pairs[:, 1])
+        encoded = encoded[np.concatenate([[True], encoded[1:] != encoded[:-1]])]
+        pairs = np.stack([encoded // count, encoded % count], axis=1)
+
+        # The fraction of equal minhashes estimates the Jaccard similarity
+        estimated = np.concatenate(
+            [
+                (self._signatures[chunk[:, 0]] == self._signatures[chunk[:, 1]]).mean(
+                    axis=1
+                )
+                for chunk in np.array_split(pairs, max(1, len(pairs) // 65536))
+            ]
+        )
+        return pairs[estimated >= min_estimate]
+
+    def duplicate_clusters(
+        self,
+        threshold: float = settings.entity_dedup_threshold,
+        type: str | None = None,
+    ) -> list[DuplicateCluster]:
+        """Group entities whose names or aliases are similar, transitively.
+
+        Entities sharing a normalized name are always grouped. Clusters are
+        sorted by similarity, then size. The result is cached until the index
+        changes.
+        """
+        with self._lock:
+            cache_key = (self._version, threshold, type)
+            if self._clusters is not None and self._clusters[0] == cache_key:
+                return self._clusters[1]
+            if self._sorted_keys is None:
+                self._build()
+
+            edges: list[tuple[str, str, float]] = []
+            for slot, slot_name in enumerate(self._slot_names):
+                if slot_name is None or (type is not None and slot_name[0] != type):
+                    continue
+                first, *rest = self._slot_entities[slot]
+                edges.extend((first, other, 1.0) for other in rest)
+
+            pairs = self._candidate_pairs(threshold - _ESTIMATE_MARGIN)
+            # Removed slots can't match, nor can trigram sets too different
+            # in size for their Jaccard similarity to reach the threshold
+            live = np.array([name is not None for name in self._slot_names])
+            sizes = np.array([len(grams) for grams in self._slot_grams])
+            left_sizes, right_sizes = sizes[pairs[:, 0]], sizes[pairs[:, 1]]
+            pairs = pairs[
+                live[pairs[:, 0]]
+                & live[pairs[:, 1]]
+                & (
+                    np.minimum(left_sizes, right_sizes)
+                    >= threshold * np.maximum(left_sizes, right_sizes)
+                )
+            ]
+
+            for left, right in pairs.tolist():
+                left_name, right_name = self._slot_names[left], self._slot_names[right]
+                if left_name[0] != right_name[0] or (
+                    type is not None and left_name[0] != type
+                ):
+                    continue
+                similarity = jaccard(self._slot_grams[left], self._slot_grams[right])
+                if similarity < threshold:
+                    continue
+                left_entity = next(iter(self._slot_entities[left]))
+                right_entity = next(iter(self._slot_entities[right]))
+                if left_entity != right_entity:
+                    edges.append((left_entity, right_entity, similarity))
+
+        parent: dict[str, str] = {}
+
+        def find(entity_id: str) -> str:
+            root = parent.setdefault(entity_id, entity_id)
+            while root != parent[root]:
+                root = parent[root]
+            while parent[entity_id] != root:
+                parent[entity_id], entity_id = root, parent[entity_id]
+            return root
+
+        for left, right, _ in edges:
+            left_root, right_root = find(left), find(right)
+            if left_root != right_root:
+                parent[right_root] = left_root
+
+        members: dict[str, list[str]] = {}
+        for entity_id in parent:
+            members.setdefault(find(entity_id), []).append(entity_id)
+        similarity: dict[str, float] = {}
+        for left, _, edge_similarity in edges:
+            root = find(left)
+            similarity[root] = min(similarity.get(root, 1.0), edge_similarity)
+
+        clusters = [
+            DuplicateCluster(sorted(entity_ids), similarity.get(root, 1.0))
+            for root, entity_ids in members.items()
+            if len(entity_ids) > 1
+        ]
+        clusters.sort(key=lambda c: (-c.similarity, -len(c.entity_ids)))
+        with self._lock:
+            if self._version == cache_key[0]:
+                self._clusters = (cache_key, clusters)
+        return clusters
+
+
+similarity_index = SimilarityIndex()
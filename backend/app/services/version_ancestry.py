@@ -0,0 +1,273 @@
+"""Ancestry queries over scene version history.
+
+Every version stores its ``generation`` (distance from its root version)
+and a skip pointer, ``jump_version_id``, set when it is flushed. For a
+version with parent ``p`` the pointer is ``jump(jump(p))`` when ``p`` and
+its two jumps are evenly spaced, else ``p``; roots point at themselves.
+Jump lengths then follow a skew-binary pattern, so reaching any ancestor,
+or the lowest common ancestor of two versions, takes O(log n) hops. Each
+query below is a single recursive statement whose steps are primary key
+lookups, however deep the history.
+"""
+
+import uuid
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from ..models.repository import SceneVersion
+
+_ANCESTOR_AT = text("""
+    WITH RECURSIVE walk(id, generation) AS (
+        SELECT id, generation FROM scene_versions WHERE id = :version_id
+        UNION ALL
+        SELECT next.id, next.generation
+        FROM walk
+        JOIN scene_versions v ON v.id = walk.id
+        JOIN scene_versions j ON j.id = v.jump_version_id
+        JOIN scene_versions next ON next.id = CASE
+            WHEN j.generation >= :generation THEN v.jump_version_id
+            ELSE v.parent_version_id
+        END
+        WHERE walk.generation > :generation
+    )
+    SELECT id FROM walk WHERE generation = :generation
+    """)
+
+_COMMON_ANCESTORS = text("""
+    WITH RECURSIVE walk(left_id, right_id, x, y) AS (
+        SELECT pair.left_id, pair.right_id, pair.left_id, pair.right_id
+        FROM unnest(CAST(:left_ids AS uuid[]), CAST(:right_ids AS uuid[]))
+            AS pair(left_id, right_id)
+        UNION ALL
+        SELECT
+            walk.left_id,
+            walk.right_id,
+            CASE
+                WHEN xv.generation < yv.generation THEN xv.id
+                WHEN xv.generation > yv.generation
+                    AND xj.generation < yv.generation THEN xv.parent_version_id
+                WHEN xv.generation = yv.generation
+                    AND (xv.generation = 0
+                        OR xv.jump_version_id = yv.jump_version_id)
+                    THEN xv.parent_version_id
+                ELSE xv.jump_version_id
+            END,
+            CASE
+                WHEN yv.generation < xv.generation THEN yv.id
+                WHEN yv.generation > xv.generation
+                    AND yj.generation < xv.generation THEN yv.parent_version_id
+                WHEN yv.generation = xv.generation
+                    AND (yv.generation = 0
+                        OR yv.jump_version_id = xv.jump_version_id)
+                    THEN yv.parent_version_id
+                ELSE yv.jump_version_id
+            END
+        FROM walk
+        JOIN scene_versions xv ON xv.id = walk.x
+        JOIN scene_versions yv ON yv.id = walk.y
+        JOIN scene_versions xj ON xj.id = xv.jump_version_id
+        JOIN scene_versions yj ON yj.id = yv.jump_version_id
+        WHERE walk.x <> walk.y
+    )
+    SELECT left_id, right_id, x FROM walk WHERE x = y
+    """)
+
+_HISTORY = text("""
+    WITH RECURSIVE history(id, parent_version_id, n) AS (
+        SELECT id, parent_version_id, 1 FROM scene_versions WHERE id = :version_id
+        UNION ALL
+        SELECT v.id, v.parent_version_id, history.n + 1
+        FROM history
+        JOIN scene_versions v ON v.id = history.parent_version_id
+        WHERE history.n < :limit
+    )
+    SELECT id FROM history ORDER BY n
+    """)
+
+
+def ancestor_at(
+    db: Session, version_id: uuid.UUID | str, generation: int
+) -> uuid.UUID | None:
+    """The ancestor of a version at ``generation``, or the version itself."""
+    if generation < 0:
+        return None
+    return db.scalar(
+        _ANCESTOR_AT, {"version_id": str(version_id), "generation": generation}
+    )
+
+
+def is_ancestor(db: Session, ancestor: SceneVersion, version: SceneVersion) -> bool:
+    """Whether ``ancestor`` is ``version`` or one of its ancestors."""
+    if ancestor.generation > version.generation:
+        return False
+    return ancestor_at(db, version.id, ancestor.generation) == ancestor.id
+
+
+def common_ancestors(
+    db: Session, pairs: list[tuple[uuid.UUID, uuid.UUID]]
+) -> dict[tuple[uuid.UUID, uuid.UUID], uuid.UUID]:
+    """The lowest common ancestor of each pair of versions, in one query.
+
+    Pairs whose versions share no root are left out.
+    """
+    if not pairs:
+        return {}
+    rows = db.execute(
+        _COMMON_ANCESTORS,
+        {
+            "left_ids": [str(left_id) for left_id, _ in pairs],
+            "right_ids": [str(right_id) for _, right_id in pairs],
+        },
+    )
+    return {(left_id, right_id): x for left_id, right_id, x in rows}
+
+
+def common_ancestor(
+    db: Session, left_id: uuid.UUID | str, right_id: uuid.UUID | str
+) -> uuid.UUID | None:
+    """The merge base of two versions, if they share a root."""
+    left_id, right_id = uuid.UUID(str(left_id)), uuid.UUID(str(right_id))
+    return merge_bases(db, [(left_id, right_id)]).get((left_id, right_id))
+
+
+def merge_bases(
+    db: Session, pairs: list[tuple[uuid.UUID, uuid.UUID]]
+) -> dict[tuple[uuid.UUID, uuid.UUID], uuid.UUID]:
+    """The best common ancestor of each pair of versions, counting merges.
+
+    Skip pointers follow first parents only. A merge version on one side's
+    first-parent chain also makes its merge parent's common ancestor with
+    the other side a candidate, so the base moves forward with each merge;
+    the most recent candidate wins. Merge parents are followed one level
+    deep. The number of queries doesn't grow with the number of pairs.
+    """
+    bases = common_ancestors(db, pairs)
+    if not pairs:
+        return bases
+
+    # Merge versions of the scenes involved
+    pair_ids = {version_id for pair in pairs for version_id in pair}
+    scene_ids = dict(
+        db.execute(
+            select(SceneVersion.id, SceneVersion.scene_id).where(
+                SceneVersion.id.in_(pair_ids)
+            )
+        ).all()
+    )
+    edges = db.execute(
+        select(
+            SceneVersion.id,
+            SceneVersion.merge_parent_version_id,
+            SceneVersion.scene_id,
+        ).where(
+            SceneVersion.merge_parent_version_id.is_not(None),
+            SceneVersion.scene_id.in_(set(scene_ids.values())),
+        )
+    ).all()
+    if not edges:
+        return bases
+
+    # Which merges lie on either side's first-parent chain
+    contains = common_ancestors(
+        db,
+        [
+            (merge_id, version_id)
+            for merge_id, _, scene_id in edges
+            for version_id in pair_ids
+            if scene_ids.get(version_id) == scene_id
+        ],
+    )
+    candidate_pairs = {}
+    for left_id, right_id in pairs:
+        for merge_id, merge_parent_id, _ in edges:
+            if contains.get((merge_id, left_id)) == merge_id:
+                candidate_pairs.setdefault((merge_parent_id, right_id), []).append(
+                    (left_id, right_id)
+                )
+            if contains.get((merge_id, right_id)) == merge_id:
+                candidate_pairs.setdefault((left_id, merge_parent_id), []).append(
+                    (left_id, right_id)
+                )
+    candidates = common_ancestors(db, list(candidate_pairs))
+    if not candidates:
+        return bases
+
+    # Candidates and bases of a pair lie on one side's chain, so the most
+    # recent is the closest
+    recency = {
+        version_id: (created_at, generation)
+        for version_id, created_at, generation in db.execute(
+            select(
+                SceneVersion.id, SceneVersion.created_at, SceneVersion.generation
+            ).where(SceneVersion.id.in_(set(candidates.values()) | set(bases.values())))
+        )
+    }
+    for candidate_pair, candidate in candidates.items():
+        for pair in candidate_pairs[candidate_pair]:
+            if pair not in bases or recency[candidate] > recency[bases[pair]]:
+                bases[pair] = candidate
+    return bases
+
+
+def version_history(
+    db: Session, version_id: uuid.UUID | str, limit: int = 100, offset: int = 0
+) -> list[SceneVersion]:
+    """A version and its ancestors, newest first.
+
+    ``offset`` skips ancestors through the skip pointers, so a page deep in a
+    long history costs no more than the first one.
+    """
+    version = db.get(SceneVersion, version_id)
+    if version is None or limit <= 0 or offset > version.generation:
+        return []
+    if offset:
+        version_id = ancestor_at(db, version.id, version.generation - offset)
+    ids = list(db.scalars(_HISTORY, {"version_id": str(version_id), "limit": limit}))
+    versions = {
+        v.id: v for v in db.query(SceneVersion).filter(SceneVersion.id.in_(ids))
+    }
+    return [versions[i] for i in ids]
+
+
+def _link(
+    db: Session, version: SceneVersion, new: dict[uuid.UUID, SceneVersion]
+) -> None:
+    def get(version_id: uuid.UUID | None) -> SceneVersion | None:
+        if version_id is None:
+            return None
+        # Versions flushed together aren't in the identity map yet
+        return new.get(version_id) or db.get(SceneVersion, version_id)
+
+    if version.id is None:
+        version.id = uuid.uuid4()
+    parent = get(version.parent_version_id)
+    if parent is None:
+        version.generation = 0
+        version.jump_version_id = version.id
+        return
+
+    if parent.jump_version_id is None:
+        _link(db, parent, new)
+    jump = get(parent.jump_version_id)
+    version.generation = parent.generation + 1
+    if (
+        parent.generation - jump.generation
+        == jump.generation - get(jump.jump_version_id).generation
+    ):
+        version.jump_version_id = jump.jump_version_id
+    else:
+        version.jump_version_id = parent.id
+
+
+@event.listens_for(Session, "before_flush")
+def _link_new_versions(db: Session, flush_context, instances) -> None:
+    with db.no_autoflush:
+        new = {
+            obj.id: obj
+            for obj in db.new
+            if isinstance(obj, SceneVersion) and obj.id is not None
+        }
+        for obj in list(db.new):
+            if isinstance(obj, SceneVersion) and obj.jump_version_id is None:
+                _link(db, obj, new)
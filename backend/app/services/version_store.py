@@ -0,0 +1,350 @@
+"""Delta-compressed, chunk-deduplicated storage of scene version content.
+
+A version is stored either as a keyframe or as a zlib-compressed delta
+against its parent version. A keyframe is written at least every
+``settings.version_keyframe_interval`` versions along a parent chain, so
+reconstructing a version applies a bounded number of deltas. Keyframes are
+split into paragraph chunks kept once per repository in a content-addressed
+store, so a keyframe shares every unchanged paragraph with other versions,
+branches and scenes; with the chunk store off they hold their full HTML.
+Reconstruction is transparent: ``SceneVersion.content_html`` reads through
+this module, and new versions are encoded when they are flushed.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterable
+from difflib import SequenceMatcher
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, object_session
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..models.content_chunk import ContentChunk
+from ..models.repository import Branch, SceneVersion
+
+# Tags and words with their trailing whitespace, so a token rarely stands
+# alone and deltas stay small; "<" covers an unterminated tag
+_TOKEN_RE = re.compile(r"<[^>]*>\s*|[^<\s]+\s*|\s+|<")
+
+# A chunk ends after a block-level closing tag and the whitespace after it
+_CHUNK_END_RE = re.compile(
+    r"</(?:p|h[1-6]|li|ul|ol|blockquote|pre|div|table|figure)>\s*|<hr\s*/?>\s*",
+    re.IGNORECASE,
+)
+CHUNK_HASH_SIZE = 16
+
+
+def split_chunks(html: str) -> list[str]:
+    """Split HTML into paragraph chunks that join back into it."""
+    chunks = []
+    start = 0
+    for match in _CHUNK_END_RE.finditer(html):
+        chunks.append(html[start : match.end()])
+        start = match.end()
+    if start < len(html):
+        chunks.append(html[start:])
+    return chunks
+
+
+def chunk_hash(chunk: str) -> bytes:
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=CHUNK_HASH_SIZE).digest()
+
+
+def unpack_hashes(packed: bytes) -> list[bytes]:
+    return [
+        packed[i : i + CHUNK_HASH_SIZE] for i in range(0, len(packed), CHUNK_HASH_SIZE)
+    ]
+
+
+def encode_delta(base: str, text: str) -> bytes:
+    """Encode ``text`` as copies of ``base`` ranges and inserted strings.
+
+    The delta is a JSON list of ``[start, length]`` copies and string
+    inserts, zlib-compressed.
+    """
+    base_tokens = _TOKEN_RE.findall(base)
+    text_tokens = _TOKEN_RE.findall(text)
+    offsets = [0]
+    for token in base_tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    ops: list[list[int] | str] = []
+    matcher = SequenceMatcher(None, base_tokens, text_tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            start, length = offsets[i1], offsets[i2] - offsets[i1]
+            if ops and isinstance(ops[-1], list) and sum(ops[-1]) == start:
+                ops[-1][1] += length
+            else:
+                ops.append([start, length])
+        elif j2 > j1:
+            inserted = "".join(text_tokens[j1:j2])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += inserted
+            else:
+                ops.append(inserted)
+
+    payload = json.dumps(ops, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(payload.encode("utf-8"), 9)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """Rebuild a text from its base and ``encode_delta`` output."""
+    parts = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            start, length = op
+            parts.append(base[start : start + length])
+    return "".join(parts)
+
+
+class TextCache:
+    """Thread-safe LRU of texts, keyed by version id or chunk hash."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._texts: OrderedDict[uuid.UUID | bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: uuid.UUID | bytes) -> str | None:
+        with self._lock:
+            text = self._texts.get(key)
+            if text is not None:
+                self._texts.move_to_end(key)
+            return text
+
+    def put(self, key: uuid.UUID | bytes, text: str) -> None:
+        with self._lock:
+            self._texts[key] = text
+            self._texts.move_to_end(key)
+            while len(self._texts) > self.max_entries:
+                self._texts.popitem(last=False)
+
+
+text_cache = TextCache(settings.version_text_cache_size)
+chunk_cache = TextCache(settings.version_chunk_cache_size)
+
+
+def load_chunks(db: Session, hashes: Iterable[bytes]) -> dict[bytes, str]:
+    """Fetch the text of chunks, reading each uncached one once."""
+    chunks = {}
+    missing = set()
+    for digest in hashes:
+        text = chunk_cache.get(digest)
+        if text is not None:
+            chunks[digest] = text
+        else:
+            missing.add(digest)
+    if missing:
+        rows = db.execute(
+            select(ContentChunk.hash, ContentChunk.data).where(
+                ContentChunk.hash.in_(missing)
+            )
+        )
+        for digest, data in rows:
+            if digest not in chunks:
+                chunks[digest] = zlib.decompress(data).decode("utf-8")
+                chunk_cache.put(digest, chunks[digest])
+    return chunks
+
+
+def store_chunks(db: Session, repo_id: uuid.UUID, html: str) -> bytes:
+    """Write the chunks of ``html`` the repository lacks; return packed hashes."""
+    hashed = [(chunk_hash(chunk), chunk) for chunk in split_chunks(html)]
+    chunks = dict(hashed)
+    existing = (
+        set(
+            db.scalars(
+                select(ContentChunk.hash).where(
+                    ContentChunk.repo_id == repo_id, ContentChunk.hash.in_(chunks)
+                )
+            )
+        )
+        if chunks
+        else set()
+    )
+    new_chunks = [
+        {
+            "hash": digest,
+            "repo_id": repo_id,
+            "data": zlib.compress(chunk.encode("utf-8"), 9),
+        }
+        for digest, chunk in chunks.items()
+        if digest not in existing
+    ]
+    if new_chunks:
+        db.execute(insert(ContentChunk).values(new_chunks).on_conflict_do_nothing())
+    for digest, chunk in chunks.items():
+        chunk_cache.put(digest, chunk)
+    return b"".join(digest for digest, _ in hashed)
+
+
+def _as_uuid(version_id) -> uuid.UUID:
+    return version_id if isinstance(version_id, uuid.UUID) else uuid.UUID(version_id)
+
+
+def load_version_texts(
+    db: Session, version_ids: Iterable[uuid.UUID | str]
+) -> dict[uuid.UUID, str]:
+    """Reconstruct the content of many versions.
+
+    The delta chains of every uncached version are fetched with one
+    recursive query and replayed in memory; each text rebuilt on the way is
+    cached.
+    """
+    version_ids = {_as_uuid(version_id) for version_id in version_ids}
+    texts = {}
+    for version_id in version_ids:
+        text = text_cache.get(version_id)
+        if text is not None:
+            texts[version_id] = text
+    missing = version_ids - texts.keys()
+    if not missing:
+        return texts
+
+    table = SceneVersion.__table__
+    columns = (
+        table.c.id,
+        table.c.parent_version_id,
+        table.c.content_html,
+        table.c.content_delta,
+        table.c.chunk_hashes,
+    )
+    chain = select(*columns).where(table.c.id.in_(missing)).cte(recursive=True)
+    parent = table.alias()
+    chain = chain.union(
+        select(*(parent.c[column.name] for column in columns))
+        .join(chain, parent.c.id == chain.c.parent_version_id)
+        .where(chain.c.content_delta.is_not(None))
+    )
+    rows = {row.id: row for row in db.execute(select(chain))}
+    chunks = load_chunks(
+        db,
+        {
+            digest
+            for row in rows.values()
+            if row.content_delta is None and row.chunk_hashes
+            for digest in unpack_hashes(row.chunk_hashes)
+        },
+    )
+
+    def rebuild(version_id: uuid.UUID) -> str:
+        # Walk up to a keyframe or a cached ancestor, then replay forwards
+        path = []
+        while True:
+            text = texts.get(version_id)
+            if text is None:
+                text = text_cache.get(version_id)
+            if text is not None:
+                break
+            row = rows[version_id]
+            if row.content_delta is None:
+                text = row.content_html
+                if text is None:
+                    text = "".join(
+                        chunks[digest] for digest in unpack_hashes(row.chunk_hashes)
+                    )
+                texts[version_id] = text
+                text_cache.put(version_id, text)
+                break
+            path.append(row)
+            version_id = row.parent_version_id
+
+        for row in reversed(path):
+            text = apply_delta(text, row.content_delta)
+            texts[row.id] = text
+            text_cache.put(row.id, text)
+        return text
+
+    for version_id in missing:
+        if version_id in rows:
+            rebuild(version_id)
+    return {
+        version_id: texts[version_id]
+        for version_id in version_ids
+        if version_id in texts
+    }
+
+
+def version_text(version: SceneVersion) -> str:
+    """The content of a stored version, reconstructed if it is a delta."""
+    text = text_cache.get(version.id)
+    if text is not None:
+        return text
+
+    db = object_session(version)
+    if db is not None:
+        return load_version_texts(db, [version.id])[version.id]
+    with SessionLocal() as db:
+        return load_version_texts(db, [version.id])[version.id]
+
+
+def preload_version_texts(db: Session, versions: Iterable[SceneVersion]) -> None:
+    """Reconstruct many versions' content at once ahead of reading it."""
+    load_version_texts(
+        db, [version.id for version in versions if version.keyframe_html is None]
+    )
+
+
+def version_chunks(db: Session, version: SceneVersion) -> list[tuple[bytes, str]]:
+    """A version's paragraph chunks as ``(hash, text)`` pairs.
+
+    Stored keyframes' chunks are read from the chunk store; other versions
+    are split and hashed.
+    """
+    if version.chunk_hashes and version.keyframe_html is None:
+        hashes = unpack_hashes(version.chunk_hashes)
+        chunks = load_chunks(db, set(hashes))
+        return [(digest, chunks[digest]) for digest in hashes]
+    return [(chunk_hash(chunk), chunk) for chunk in split_chunks(version.content_html)]
+
+
+def _delta_from_parent(db: Session, version: SceneVersion, text: str) -> bool:
+    if version.parent_version_id is None or settings.version_keyframe_interval <= 1:
+        return False
+    parent = db.get(SceneVersion, version.parent_version_id)
+    if parent is None:
+        return False
+    depth = (parent.delta_depth or 0) + 1
+    if depth >= settings.version_keyframe_interval:
+        return False
+
+    delta = encode_delta(parent.content_html, text)
+    # Not worth a delta when the text mostly changed
+    if len(delta) * 2 > len(text.encode("utf-8")):
+        return False
+    version.content_delta = delta
+    version.delta_depth = depth
+    return True
+
+
+def _encode_new_version(db: Session, version: SceneVersion) -> None:
+    text = version.keyframe_html
+    if version.id is None:
+        version.id = uuid.uuid4()
+    text_cache.put(version.id, text)
+
+    if _delta_from_parent(db, version, text):
+        version.keyframe_html = None
+    elif settings.version_chunk_store:
+        branch = db.get(Branch, version.branch_id)
+        version.chunk_hashes = store_chunks(db, branch.repo_id, text)
+        version.keyframe_html = None
+
+
+@event.listens_for(Session, "before_flush")
+def _encode_new_versions(db: Session, flush_context, instances) -> None:
+    with db.no_autoflush:
+        for obj in list(db.new):
+            if isinstance(obj, SceneVersion) and obj.keyframe_html is not None:
+                _encode_new_version(db, obj)
@@ -0,0 +1,88 @@
+from app.services.extraction_service import make_windows, merge_results, shift_spans
+
+
+def _span(start, end):
+    return {"start_idx": start, "end_idx": end}
+
+
+def test_short_text_is_one_window():
+    text = "one\ntwo\nthree"
+    assert make_windows(text, 100, 1) == [(0, len(text))]
+
+
+def test_windows_cover_every_paragraph_with_overlap():
+    text = "\n".join(f"paragraph {i}" for i in range(10))
+    windows = make_windows(text, 40, 1)
+    assert len(windows) > 1
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(text)
+    for (_, end), (start, _) in zip(windows, windows[1:], strict=False):
+        assert start < end
+    assert all(end - start <= 40 for start, end in windows)
+
+
+def test_long_paragraph_gets_its_own_window():
+    text = "short\n" + "x" * 50 + "\nshort"
+    assert make_windows(text, 20, 1) == [(0, 5), (6, 56), (57, 62)]
+
+
+def test_windows_of_blank_text_are_empty():
+    assert make_windows("\n\n", 10, 1) == []
+
+
+def test_shift_spans_moves_and_drops_spans():
+    result = {
+        "characters": [
+            {"name": "Ann", "spans": [_span(0, 3), _span(8, 12), _span(2, 2)]}
+        ],
+        "places": [{"name": "Rome", "spans": [{"start_idx": None, "end_idx": 4}]}],
+    }
+    shifted = shift_spans(result, 100, 10)
+    assert shifted["characters"][0]["spans"] == [_span(100, 103)]
+    assert shifted["places"][0]["spans"] == []
+
+
+def test_merge_results_combines_entities_by_name():
+    first = {
+        "characters": [
+            {
+                "name": "Ann  Lee",
+                "confidence": 0.6,
+                "description": "A sailor.",
+                "spans": [_span(0, 7)],
+            }
+        ],
+    }
+    second = {
+        "characters": [
+            {
+                "name": "ann lee",
+                "confidence": 0.9,
+                "description": "A sailor from Rome.",
+                "entity_id": "e1",
+                "spans": [_span(0, 7), _span(20, 27)],
+            }
+        ],
+        "places": [{"name": "Rome", "spans": [_span(40, 44)]}],
+    }
+    merged = merge_results([first, second])
+    (ann,) = merged["characters"]
+    assert ann["name"] == "Ann  Lee"
+    assert ann["confidence"] == 0.9
+    assert ann["description"] == "A sailor from Rome."
+    assert ann["entity_id"] == "e1"
+    assert ann["spans"] == [_span(0, 7), _span(20, 27)]
+    assert [place["name"] for place in merged["places"]] == ["Rome"]
+    assert merged["events"] == [] and merged["objects"] == []
+
+
+def test_merge_results_keeps_most_confident_relationship():
+    low = {"source": "Ann", "target": "Rome", "relation_type": "visits"}
+    high = {"source": "ann", "target": "rome", "relation_type": "Visits"}
+    merged = merge_results(
+        [
+            {"relationships": [{**low, "confidence": 0.4}]},
+            {"relationships": [{**high, "confidence": 0.8}]},
+        ]
+    )
+    assert merged["relationships"] == [{**high, "confidence": 0.8}]
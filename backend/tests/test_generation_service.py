@@ -0,0 +1,36 @@
+import pytest
+
+from app.services.generation_service import lexical_diversity, rank_by_diversity
+
+STORM = "The storm broke over the harbour and the boats strained at their ropes."
+STORM_AGAIN = "The storm broke over the harbour and the boats strained at their lines."
+MARKET = "In the morning market she bargained for figs, salt and a copper lamp."
+DULL = "It was dull, it was dull, it was dull, it was dull."
+
+
+def test_lexical_diversity():
+    assert lexical_diversity([]) == 0.0
+    assert lexical_diversity(["a", "a", "b", "b"]) == 0.5
+    varied = [f"word{i}" for i in range(200)]
+    repeated = ["word"] * 200
+    assert lexical_diversity(varied) == 1.0
+    assert lexical_diversity(repeated) == pytest.approx(1 / 50)
+
+
+def test_most_diverse_candidate_comes_first():
+    assert rank_by_diversity([DULL, MARKET], 1) == [MARKET]
+
+
+def test_near_duplicates_are_passed_over():
+    ranked = rank_by_diversity([STORM, STORM_AGAIN, MARKET], 2)
+    assert len(ranked) == 2
+    assert MARKET in ranked
+
+
+def test_near_duplicates_fill_up_the_result():
+    ranked = rank_by_diversity([STORM, STORM_AGAIN], 2)
+    assert sorted(ranked) == sorted([STORM, STORM_AGAIN])
+
+
+def test_empty_candidates_are_dropped():
+    assert rank_by_diversity(["", "  ", STORM], 3) == [STORM]
@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+from app.services import llm_scheduler
+from app.services.llm_scheduler import (
+    CircuitBreaker,
+    LLMScheduler,
+    LLMUnavailableError,
+    Priority,
+    TokenBucket,
+    is_retryable,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class _ServerError(Exception):
+    status_code = 500
+
+
+class _BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_scheduler, "time", clock)
+    return clock
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(1) == 1.0
+    clock.now += 0.5
+    assert bucket.wait_time(1) == 0.5
+    clock.now += 3600
+    assert bucket.level == 0.5
+    assert bucket.wait_time(1) == 0.0
+    assert bucket.level == bucket.capacity
+
+
+def test_bucket_waits_for_at_most_its_capacity(clock):
+    bucket = TokenBucket(60)
+    bucket.consume(60)
+    assert bucket.wait_time(600) == 60.0
+
+
+def test_bucket_refunds_up_to_its_capacity(clock):
+    bucket = TokenBucket(60)
+    bucket.consume(50)
+    bucket.consume(-20)
+    assert bucket.level == 30
+    bucket.consume(-100)
+    assert bucket.level == bucket.capacity
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    assert breaker.before_call() is False
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.opened_at is None
+    breaker.record_failure()
+    assert breaker.opened_at == clock.now
+    with pytest.raises(LLMUnavailableError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 30
+
+
+def test_breaker_admits_one_trial_after_reset(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.before_call() is True
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.opened_at is None
+    assert breaker.before_call() is False
+
+
+def test_failed_trial_reopens_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.before_call() is True
+    breaker.record_failure()
+    assert breaker.opened_at == clock.now
+    assert breaker.trial_in_flight is False
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+
+def test_released_trial_lets_another_call_try(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.before_call() is True
+    breaker.release_trial()
+    assert breaker.before_call() is True
+
+
+def test_is_retryable():
+    assert is_retryable(_ServerError())
+    assert not is_retryable(_BadRequest())
+    assert not is_retryable(ValueError())
+
+
+def _scheduler(**kwargs) -> LLMScheduler:
+    return LLMScheduler(
+        requests_per_minute=kwargs.pop("requests_per_minute", 6000),
+        tokens_per_minute=100_000,
+        max_retries=kwargs.pop("max_retries", 2),
+        backoff_base=0.001,
+        backoff_max=0.01,
+        breaker=kwargs.pop("breaker", CircuitBreaker(5, 30)),
+    )
+
+
+def test_waiting_calls_are_served_by_priority_then_order():
+    async def main():
+        scheduler = _scheduler(requests_per_minute=1200)
+        scheduler.requests.consume(scheduler.requests.capacity)
+        served = []
+
+        def call(name):
+            async def record():
+                served.append(name)
+
+            return record
+
+        await asyncio.gather(
+            scheduler.run(call("background"), Priority.BACKGROUND),
+            scheduler.run(call("first"), Priority.INTERACTIVE),
+            scheduler.run(call("second"), Priority.INTERACTIVE),
+        )
+        return served
+
+    assert asyncio.run(main()) == ["first", "second", "background"]
+
+
+def test_retryable_failures_are_retried():
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _ServerError()
+        return "done"
+
+    assert asyncio.run(_scheduler().run(call)) == "done"
+    assert len(attempts) == 3
+
+
+def test_other_failures_are_raised_at_once():
+    attempts = []
+    breaker = CircuitBreaker(1, 30)
+
+    async def call():
+        attempts.append(1)
+        raise _BadRequest()
+
+    with pytest.raises(_BadRequest):
+        asyncio.run(_scheduler(breaker=breaker).run(call))
+    assert len(attempts) == 1
+    assert breaker.opened_at is None
+
+
+def test_open_breaker_rejects_calls_without_calling():
+    attempts = []
+    breaker = CircuitBreaker(2, 30)
+
+    async def call():
+        attempts.append(1)
+        raise _ServerError()
+
+    scheduler = _scheduler(breaker=breaker, max_retries=5)
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(scheduler.run(call))
+    assert len(attempts) == 2
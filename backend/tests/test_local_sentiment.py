@@ -0,0 +1,38 @@
+from app.services.local_sentiment import score_text, score_texts
+
+
+def test_empty_batch_scores_nothing():
+    assert score_texts([]) == []
+
+
+def test_texts_without_words_score_zero():
+    assert score_texts(["", "<p></p>", "..."]) == [0.0, 0.0, 0.0]
+
+
+def test_scores_have_the_sign_of_their_words():
+    happy, sad, neutral = score_texts(
+        ["<p>She was happy.</p>", "<p>He felt sad and lonely.</p>", "A door."]
+    )
+    assert 0 < happy <= 1
+    assert -1 <= sad < 0
+    assert neutral == 0.0
+
+
+def test_negation_flips_the_following_words():
+    assert score_text("She was happy.") > 0
+    assert score_text("She was not happy.") < 0
+
+
+def test_negation_stops_at_the_clause():
+    assert score_text("Not now; she was happy.") == score_text("She was happy.")
+
+
+def test_batch_scores_match_single_scores():
+    texts = ["They laugh.", "", "War and death.", "Not bad at all."]
+    assert score_texts(texts) == [score_text(text) for text in texts]
+
+
+def test_long_texts_do_not_saturate():
+    sentence = "She smiled with joy and love. "
+    assert score_text(sentence * 50) == score_text(sentence)
+    assert score_text(sentence * 50) < 1
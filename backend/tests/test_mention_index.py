@@ -0,0 +1,85 @@
+from app.services.mention_index import AhoCorasick, Mention, MentionIndex
+
+
+class _FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, *columns):
+        return self.rows
+
+
+def _index(rows, min_length=2):
+    index = MentionIndex(reload_seconds=3600, min_length=min_length)
+    index.ensure_loaded(_FakeSession(rows))
+    return index
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick()
+    for pattern in ("he", "she", "his", "hers"):
+        automaton.add(pattern)
+    assert sorted(automaton.search("ushers")) == [
+        (1, 4, "she"),
+        (2, 4, "he"),
+        (2, 6, "hers"),
+    ]
+
+
+def test_automaton_forgets_removed_patterns():
+    automaton = AhoCorasick()
+    automaton.add("ann")
+    automaton.add("anna")
+    automaton.search("anna")
+    automaton.remove("anna")
+    assert len(automaton) == 1
+    assert automaton.search("anna") == [(0, 3, "ann")]
+    automaton.compact()
+    assert automaton.dead_nodes == 0
+    assert automaton.search("anna") == [(0, 3, "ann")]
+
+
+def test_find_matches_whole_words_case_insensitively():
+    index = _index([("e1", "character", "Anna", ["Annie"])])
+    assert index.find("ANNA met annie, not Annabel.") == [
+        Mention(("e1",), 0, 4, "ANNA"),
+        Mention(("e1",), 9, 14, "annie"),
+    ]
+
+
+def test_find_prefers_leftmost_longest_mention():
+    index = _index(
+        [
+            ("e1", "character", "Anna", []),
+            ("e2", "character", "Anna Karenina", []),
+            ("e3", "place", "Karenina Street", []),
+        ]
+    )
+    mentions = index.find("Anna Karenina Street")
+    assert [m.entity_ids for m in mentions] == [("e2",)]
+
+
+def test_find_reports_every_entity_of_an_ambiguous_name():
+    index = _index([("e2", "character", "Rome", None), ("e1", "place", "rome", None)])
+    assert index.find("In Rome.") == [Mention(("e1", "e2"), 3, 7, "Rome")]
+
+
+def test_short_names_are_not_indexed():
+    index = _index([("e1", "character", "Al", ["Alfred"])], min_length=3)
+    assert [m.text for m in index.find("Al, or Alfred")] == ["Alfred"]
+
+
+def test_upsert_and_remove_entity():
+    index = _index([("e1", "character", "Anna", [])])
+    index.upsert_entity("e1", "character", "Anya", [])
+    assert [m.text for m in index.find("Anna and Anya")] == ["Anya"]
+    assert index.entity("e1") == ("character", "Anya")
+    index.remove_entity("e1")
+    assert index.find("Anna and Anya") == []
+    assert index.entity("e1") is None
+
+
+def test_upsert_before_load_is_left_to_the_load():
+    index = MentionIndex(reload_seconds=3600, min_length=2)
+    index.upsert_entity("e1", "character", "Anna", [])
+    assert index.find("Anna") == []
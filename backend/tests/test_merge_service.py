@@ -0,0 +1,53 @@
+from app.services.merge_service import merge_paragraphs, merge_texts
+
+
+def test_unchanged_sides_merge_to_base():
+    base = ["a", "b", "c"]
+    assert merge_paragraphs(base, base, base) == (base, [])
+
+
+def test_change_on_one_side_is_taken():
+    base = ["a", "b", "c"]
+    assert merge_paragraphs(base, base, ["a", "B", "c"]) == (["a", "B", "c"], [])
+    assert merge_paragraphs(base, ["a", "B", "c"], base) == (["a", "B", "c"], [])
+
+
+def test_changes_to_different_paragraphs_combine():
+    base = ["a", "b", "c", "d"]
+    target = ["A", "b", "c", "d"]
+    source = ["a", "b", "c", "D", "e"]
+    assert merge_paragraphs(base, target, source) == (["A", "b", "c", "D", "e"], [])
+
+
+def test_same_change_on_both_sides_is_not_a_conflict():
+    base = ["a", "b", "c"]
+    both = ["a", "x", "c"]
+    assert merge_paragraphs(base, both, both) == (both, [])
+
+
+def test_deletion_on_one_side_is_taken():
+    base = ["a", "b", "c"]
+    assert merge_paragraphs(base, ["a", "c"], base) == (["a", "c"], [])
+
+
+def test_different_changes_to_one_paragraph_conflict_and_keep_target():
+    base = ["a", "b", "c"]
+    merged, conflicts = merge_paragraphs(base, ["a", "T", "c"], ["a", "S", "c"])
+    assert merged == ["a", "T", "c"]
+    assert conflicts == [{"base": ["b"], "target": ["T"], "source": ["S"]}]
+
+
+def test_empty_base_merges_additions():
+    merged, conflicts = merge_paragraphs([], ["t"], ["s"])
+    assert merged == ["t"]
+    assert conflicts == [{"base": [], "target": ["t"], "source": ["s"]}]
+
+
+def test_merge_texts_splits_html_by_paragraph():
+    base = "<p>one</p><p>two</p><p>three</p>"
+    target = "<p>ONE</p><p>two</p><p>three</p>"
+    source = "<p>one</p><p>two</p><p>THREE</p>"
+    assert merge_texts(base, target, source) == (
+        "<p>ONE</p><p>two</p><p>THREE</p>",
+        [],
+    )
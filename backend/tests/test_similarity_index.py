@@ -0,0 +1,86 @@
+from app.services.similarity_index import (
+    DuplicateCluster,
+    SimilarityIndex,
+    jaccard,
+    trigrams,
+)
+
+
+class _FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, *columns):
+        return self.rows
+
+
+def _index(rows):
+    index = SimilarityIndex(bands=32, rows=3, reload_seconds=3600)
+    index.ensure_loaded(_FakeSession(rows))
+    return index
+
+
+def test_trigrams_match_pg_trgm():
+    assert trigrams("Ann") == {"  a", " an", "ann", "nn "}
+    assert jaccard(trigrams("Ann"), trigrams("ANN")) == 1.0
+    assert jaccard(trigrams("Ann"), frozenset()) == 0.0
+
+
+def test_entities_sharing_a_name_are_clustered():
+    index = _index(
+        [
+            ("e1", "character", "Mina Murray", []),
+            ("e2", "character", "mina  murray", []),
+            ("e3", "character", "Lucy", ["Mina Murray"]),
+            ("e4", "character", "Arthur", []),
+        ]
+    )
+    assert index.duplicate_clusters() == [DuplicateCluster(["e1", "e2", "e3"], 1.0)]
+
+
+def test_similar_names_are_clustered_transitively():
+    index = _index(
+        [
+            ("e1", "character", "Count Dracula", []),
+            ("e2", "character", "Count Draculaa", []),
+            ("e3", "character", "Count Draculaaa", []),
+            ("e4", "character", "Lucy Westenra", []),
+        ]
+    )
+    (cluster,) = index.duplicate_clusters(threshold=0.7)
+    assert cluster.entity_ids == ["e1", "e2", "e3"]
+    assert 0.7 <= cluster.similarity < 1.0
+
+
+def test_only_entities_of_one_type_are_compared():
+    index = _index(
+        [
+            ("e1", "character", "Dracula", []),
+            ("e2", "place", "Dracula", []),
+            ("e3", "place", "dracula", []),
+        ]
+    )
+    assert index.duplicate_clusters() == [DuplicateCluster(["e2", "e3"], 1.0)]
+    assert index.duplicate_clusters(type="character") == []
+
+
+def test_clusters_follow_entity_changes():
+    index = _index([("e1", "place", "Whitby", []), ("e2", "place", "Whitby", [])])
+    assert index.duplicate_clusters() == [DuplicateCluster(["e1", "e2"], 1.0)]
+    index.remove_entity("e2")
+    assert index.duplicate_clusters() == []
+    index.upsert_entity("e3", "place", "whitby", None)
+    assert index.duplicate_clusters() == [DuplicateCluster(["e1", "e3"], 1.0)]
+
+
+def test_similar_returns_best_name_per_entity():
+    index = _index(
+        [
+            ("e1", "character", "Jonathan Harker", ["Jonathan"]),
+            ("e2", "character", "Quincey Morris", []),
+        ]
+    )
+    (match,) = index.similar("character", "Jonathon Harker")
+    assert match.entity_id == "e1"
+    assert match.name == "jonathan harker"
+    assert index.similar("place", "Jonathan Harker") == []
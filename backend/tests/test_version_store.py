@@ -0,0 +1,53 @@
+import pytest
+
+from app.services.version_store import (
+    CHUNK_HASH_SIZE,
+    apply_delta,
+    chunk_hash,
+    encode_delta,
+    split_chunks,
+    unpack_hashes,
+)
+
+
+@pytest.mark.parametrize(
+    ("base", "text"),
+    [
+        ("", ""),
+        ("", "<p>New scene.</p>"),
+        ("<p>Old scene.</p>", ""),
+        ("<p>Same.</p>", "<p>Same.</p>"),
+        (
+            "<p>The rain falls on the city.</p><p>She waits.</p>",
+            "<p>The snow falls on the city.</p><p>She waits.</p><p>He comes.</p>",
+        ),
+        ("<p>Café, naïve — “quoted”.</p>", "<p>Café, naïve — “requoted”!</p>"),
+    ],
+)
+def test_delta_round_trips(base, text):
+    assert apply_delta(base, encode_delta(base, text)) == text
+
+
+def test_delta_of_small_edit_is_smaller_than_text():
+    base = "".join(f"<p>Paragraph {i} of a long scene.</p>" for i in range(200))
+    text = base.replace("Paragraph 100 ", "Paragraph one hundred ")
+    assert len(encode_delta(base, text)) < len(text.encode("utf-8")) // 10
+
+
+def test_split_chunks_ends_chunks_after_block_tags():
+    html = "<p>a</p>\n<p>b</p><h2>t</h2><hr/>tail"
+    chunks = split_chunks(html)
+    assert chunks == ["<p>a</p>\n", "<p>b</p>", "<h2>t</h2>", "<hr/>", "tail"]
+    assert "".join(chunks) == html
+
+
+def test_split_chunks_of_empty_text_is_empty():
+    assert split_chunks("") == []
+
+
+def test_equal_chunks_share_a_hash():
+    chunks = split_chunks("<p>same</p><p>other</p><p>same</p>")
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+    assert hashes[0] == hashes[2] != hashes[1]
+    assert all(len(h) == CHUNK_HASH_SIZE for h in hashes)
+    assert unpack_hashes(b"".join(hashes)) == hashes